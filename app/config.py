@@ -0,0 +1,92 @@
+import os
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+def env_int(name: str, default: int) -> int:
+    return int(os.getenv(name, default))
+
+
+def env_bool(name: str, default: bool = False) -> bool:
+    return os.getenv(name, str(default)).lower() in ('1', 'true', 'yes')
+
+
+DB_URI = os.getenv("DB_URI")
+DB_NAME = os.getenv("DB_NAME")
+
+# connection pool and timeouts of the MongoClient
+DB_MAX_POOL_SIZE = env_int("DB_MAX_POOL_SIZE", 100)
+DB_MIN_POOL_SIZE = env_int("DB_MIN_POOL_SIZE", 10)
+DB_MAX_IDLE_TIME_MS = env_int("DB_MAX_IDLE_TIME_MS", 60000)
+DB_CONNECT_TIMEOUT_MS = env_int("DB_CONNECT_TIMEOUT_MS", 5000)
+DB_SERVER_SELECTION_TIMEOUT_MS = env_int("DB_SERVER_SELECTION_TIMEOUT_MS", 5000)
+DB_SOCKET_TIMEOUT_MS = env_int("DB_SOCKET_TIMEOUT_MS", 10000)
+DB_WAIT_QUEUE_TIMEOUT_MS = env_int("DB_WAIT_QUEUE_TIMEOUT_MS", 2000)
+
+# number of worker threads running the sync route handlers, it should not be lower than DB_MAX_POOL_SIZE
+THREADPOOL_SIZE = env_int("THREADPOOL_SIZE", DB_MAX_POOL_SIZE)
+
+# serve the hot read routes with async handlers on Motor (requires the motor package), the other routes stay sync
+DB_ASYNC = env_bool("DB_ASYNC")
+
+INDEX_ADVISOR_ENABLED = env_bool("INDEX_ADVISOR_ENABLED")
+
+# invalidate the category cache from a change stream, keeps several workers coherent (requires a replica set)
+CATEGORY_CACHE_WATCH = env_bool("CATEGORY_CACHE_WATCH")
+
+# number of parts written by a single insert_many of POST /parts/bulk
+BULK_INSERT_CHUNK_SIZE = env_int("BULK_INSERT_CHUNK_SIZE", 1000)
+
+# 'mongo' uses the text index and falls back to the in-process index when it is missing, 'memory' always uses the latter
+TEXT_SEARCH_BACKEND = os.getenv("TEXT_SEARCH_BACKEND", "mongo")
+TEXT_SEARCH_MAX_TIME_MS = env_int("TEXT_SEARCH_MAX_TIME_MS", 2000)
+
+# read-through cache of GET /parts/{serial_number}, the TTL bounds staleness across workers
+PART_CACHE_SIZE = env_int("PART_CACHE_SIZE", 10000)
+PART_CACHE_TTL_SECONDS = env_int("PART_CACHE_TTL_SECONDS", 5)
+
+# keep per-category stock totals updated on every part write, so GET /analytics/valuation?source=running is O(categories)
+VALUATION_RUNNING_TOTALS = env_bool("VALUATION_RUNNING_TOTALS")
+
+# per-route latency and Mongo command metrics on GET /metrics, in the Prometheus text format
+METRICS_ENABLED = env_bool("METRICS_ENABLED")
+
+# keep the last SLOW_QUERY_LOG_SIZE Mongo queries slower than the threshold, reported on GET /admin/slow-queries
+SLOW_QUERY_LOG_ENABLED = env_bool("SLOW_QUERY_LOG_ENABLED")
+SLOW_QUERY_THRESHOLD_MS = env_int("SLOW_QUERY_THRESHOLD_MS", 100)
+SLOW_QUERY_LOG_SIZE = env_int("SLOW_QUERY_LOG_SIZE", 1000)
+
+# log every part and category write with a sequence number, read back by GET /parts/changes and /categories/changes
+CHANGE_LOG_ENABLED = env_bool("CHANGE_LOG_ENABLED", True)
+# how long a missing sequence number holds back the changes after it, before its writer is considered failed
+CHANGE_LOG_GAP_TIMEOUT_SECONDS = env_int("CHANGE_LOG_GAP_TIMEOUT_SECONDS", 5)
+
+# part events pushed by /parts/events are coalesced per part for this long before they are sent
+PART_EVENTS_COALESCE_MS = env_int("PART_EVENTS_COALESCE_MS", 250)
+# events held for a slow client, beyond that it gets a single overflow event
+PART_EVENTS_MAX_PENDING = env_int("PART_EVENTS_MAX_PENDING", 1000)
+# publish part events from a change stream, seeing the writes of every worker (requires a replica set)
+PART_EVENTS_WATCH = env_bool("PART_EVENTS_WATCH")
+
+# distinct values kept by the in-memory index of every autocompleted field, larger fields are completed by Mongo
+AUTOCOMPLETE_MAX_ENTRIES = env_int("AUTOCOMPLETE_MAX_ENTRIES", 200000)
+
+# synthetic warehouse inserted on the first startup, python -m app.utils.exemplary_data_generator seeds larger ones
+SEED_PARTS = env_int("SEED_PARTS", 100)
+SEED_CATEGORY_DEPTH = env_int("SEED_CATEGORY_DEPTH", 1)
+SEED_CATEGORY_FAN_OUT = env_int("SEED_CATEGORY_FAN_OUT", 2)
+SEED_RANDOM_SEED = env_int("SEED_RANDOM_SEED", 0)
+
+
+def mongo_client_options() -> dict:
+    return {
+        'maxPoolSize': DB_MAX_POOL_SIZE,
+        'minPoolSize': DB_MIN_POOL_SIZE,
+        'maxIdleTimeMS': DB_MAX_IDLE_TIME_MS,
+        'connectTimeoutMS': DB_CONNECT_TIMEOUT_MS,
+        'serverSelectionTimeoutMS': DB_SERVER_SELECTION_TIMEOUT_MS,
+        'socketTimeoutMS': DB_SOCKET_TIMEOUT_MS,
+        'waitQueueTimeoutMS': DB_WAIT_QUEUE_TIMEOUT_MS,
+    }
@@ -1,30 +1,93 @@
-import os
+from contextlib import asynccontextmanager
+from typing import List
 
-from dotenv import load_dotenv
+from anyio import to_thread
 from fastapi import FastAPI
 from pymongo import MongoClient
 
+from app import config
+from app.routes.admin_route import router as admin_route
+from app.routes.analytics_route import router as analytics_route
+from app.routes.async_read_route import router as async_read_route
+from app.routes.autocomplete_route import router as autocomplete_route
 from app.routes.category_route import router as category_route
+from app.routes.event_route import router as event_route
+from app.routes.export_route import router as export_route
+from app.routes.health_route import router as health_route
+from app.routes.location_route import router as location_route
+from app.routes.metrics_route import router as metrics_route
 from app.routes.part_route import router as part_route
+from app.service.autocomplete_service import autocomplete_index
+from app.service.category_cache import category_cache
+from app.service.category_service import backfill_category_ancestors
+from app.service.part_events import part_event_broker
+from app.service.text_search_service import part_text_index
+from app.utils.async_db import create_async_client, replace_routes
 from app.utils.exemplary_data_generator import init_db_with_exemplary_data_if_not_exists
+from app.utils.indexes import ensure_indexes, index_advisor
+from app.utils.metrics import MetricsMiddleware, metrics, mongo_command_metrics
+from app.utils.slow_queries import slow_query_log
+from app.utils.startup import StartupStep, startup_state, warm_up_connection_pool
 
-load_dotenv()
 
-app = FastAPI()
+def database_startup_steps(client, db) -> List[StartupStep]:
+    steps = [
+        ('warm_up_connection_pool', lambda: warm_up_connection_pool(client, config.DB_MIN_POOL_SIZE)),
+        ('ensure_indexes', lambda: ensure_indexes(db)),
+        ('seed_exemplary_data', lambda: init_db_with_exemplary_data_if_not_exists(db)),
+        ('backfill_category_ancestors', lambda: backfill_category_ancestors(db)),
+        ('rebuild_category_cache', lambda: category_cache.rebuild(db)),
+        ('build_autocomplete_index', lambda: autocomplete_index.build(db)),
+    ]
+    if config.TEXT_SEARCH_BACKEND == 'memory':
+        steps.append(('build_part_text_index', lambda: part_text_index.get(db)))
+    if config.CATEGORY_CACHE_WATCH:
+        steps.append(('watch_category_cache', lambda: category_cache.watch(db)))
+    if config.PART_EVENTS_WATCH:
+        steps.append(('watch_part_events', lambda: part_event_broker.watch(db)))
+    return steps
 
 
-# TODO: on_event can be replaced with newer approach i.e. lifespan
-# https://fastapi.tiangolo.com/advanced/events/#lifespan
-@app.on_event("startup")
-def startup_db_client():
-    app.mongodb_client = MongoClient(os.getenv("DB_URI"))
-    app.database = app.mongodb_client[os.getenv("DB_NAME")]
-    init_db_with_exemplary_data_if_not_exists(app.database)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # sync handlers and their blocking pymongo calls run in this threadpool, size it to the connection pool
+    to_thread.current_default_thread_limiter().total_tokens = config.THREADPOOL_SIZE
 
-@app.on_event("shutdown")
-def shutdown_db_client():
+    metrics.enabled = config.METRICS_ENABLED
+    slow_query_log.configure(config.SLOW_QUERY_LOG_ENABLED, config.SLOW_QUERY_THRESHOLD_MS, config.SLOW_QUERY_LOG_SIZE)
+    index_advisor.enabled = config.INDEX_ADVISOR_ENABLED
+    # pymongo builds an event for every command once a listener is registered, so they are only added when enabled
+    event_listeners = [listener for listener, enabled in ((mongo_command_metrics, config.METRICS_ENABLED),
+                                                          (slow_query_log, config.SLOW_QUERY_LOG_ENABLED)) if enabled]
+    # the client connects in the background, the remaining startup runs in a thread and is reported by /health/ready
+    app.mongodb_client = MongoClient(config.DB_URI, event_listeners=event_listeners, **config.mongo_client_options())
+    app.database = app.mongodb_client[config.DB_NAME]
+    startup_state.start(database_startup_steps(app.mongodb_client, app.database))
+
+    replaced_routes = []
+    if config.DB_ASYNC:
+        app.async_mongodb_client = create_async_client(event_listeners)
+        app.async_database = app.async_mongodb_client[config.DB_NAME]
+        replaced_routes = replace_routes(app.router, async_read_route.routes)
+
+    yield
+
+    if config.DB_ASYNC:
+        replace_routes(app.router, replaced_routes)
+        app.async_mongodb_client.close()
     app.mongodb_client.close()
 
 
+app = FastAPI(lifespan=lifespan)
+app.add_middleware(MetricsMiddleware, metrics=metrics)
+
 app.include_router(part_route)
 app.include_router(category_route)
+app.include_router(event_route)
+app.include_router(location_route)
+app.include_router(analytics_route)
+app.include_router(autocomplete_route)
+app.include_router(export_route)
+app.include_router(admin_route)
+app.include_router(metrics_route)
+app.include_router(health_route)
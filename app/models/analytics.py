@@ -0,0 +1,24 @@
+from typing import List
+
+from pydantic import BaseModel
+
+
+class CategoryValuation(BaseModel):
+    name: str
+    parent_name: str
+    # parts directly in the category
+    parts: int = 0
+    units: int = 0
+    value: float = 0.0
+    # parts in the category and all its descendants
+    total_parts: int = 0
+    total_units: int = 0
+    total_value: float = 0.0
+
+
+class ValuationReport(BaseModel):
+    source: str
+    parts: int
+    units: int
+    value: float
+    categories: List[CategoryValuation]
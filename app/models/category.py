@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import List, Optional
 
 
 class Category(BaseModel):
@@ -11,3 +11,9 @@ class UpdateCategory(BaseModel):
     name: Optional[str] = None
     parent_name: Optional[str] = None
 
+
+
+class CategoryTree(BaseModel):
+    name: str
+    parent_name: str
+    children: List['CategoryTree'] = []
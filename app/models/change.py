@@ -0,0 +1,19 @@
+from typing import List, Optional
+
+from pydantic import BaseModel
+
+
+class Change(BaseModel):
+    seq: int
+    # serial number of a part or name of a category
+    key: str
+    deleted: bool
+    # the document after the change, None when it was deleted
+    document: Optional[dict] = None
+
+
+class ChangeFeed(BaseModel):
+    changes: List[Change]
+    # passed as since to the next request
+    next_since: int
+    has_more: bool
@@ -0,0 +1,42 @@
+from typing import List, Optional
+
+from pydantic import BaseModel, Field
+
+
+class LocationPrefix(BaseModel):
+    room: Optional[str] = None
+    bookcase: Optional[str] = None
+    shelf: Optional[str] = None
+    cuvette: Optional[str] = None
+    column: Optional[int] = None
+    row: Optional[int] = None
+    limit: int = Field(100, gt=0, le=1000)
+
+
+# largest number of columns and rows of a cuvette grid, it bounds the memory of one grid to 4MB
+MAX_GRID_SIZE = 1000
+
+
+class CuvetteLocation(BaseModel):
+    room: str = Field(...)
+    bookcase: str = Field(...)
+    shelf: str = Field(...)
+    cuvette: str = Field(...)
+    # size of the cuvette, cells are numbered from 1; by default the highest occupied column and row
+    columns: Optional[int] = Field(None, gt=0, le=MAX_GRID_SIZE)
+    rows: Optional[int] = Field(None, gt=0, le=MAX_GRID_SIZE)
+
+
+class CuvetteGrid(BaseModel):
+    columns: int
+    rows: int
+    occupied_cells: int
+    free_cells: int
+    # number of parts in every cell, cells[row - 1][column - 1]
+    cells: List[List[int]]
+
+
+class FreeCell(BaseModel):
+    column: int
+    row: int
+    distance: int
@@ -1,4 +1,4 @@
-from typing import Optional
+from typing import List, Literal, Optional
 
 from pydantic import BaseModel, Field
 
@@ -52,3 +52,81 @@ class SearchPart(BaseModel):
     cuvette: Optional[str] = None
     column: Optional[int] = None
     row: Optional[int] = None
+    include_descendants: bool = False
+    price_min: Optional[float] = None
+    price_max: Optional[float] = None
+    quantity_min: Optional[int] = None
+    quantity_max: Optional[int] = None
+    column_min: Optional[int] = None
+    column_max: Optional[int] = None
+    row_min: Optional[int] = None
+    row_max: Optional[int] = None
+    sort_by: Optional[Literal['serial_number', 'name', 'category', 'quantity', 'price',
+                              'room', 'bookcase', 'shelf', 'cuvette', 'column', 'row']] = None
+    sort_order: Literal['asc', 'desc'] = 'asc'
+    limit: Optional[int] = Field(None, gt=0, le=1000)
+    # comma separated names of returned fields, i.e. 'serial_number,quantity,location.room'
+    fields: Optional[str] = None
+
+
+class BulkItemResult(BaseModel):
+    index: int
+    serial_number: Optional[str] = None
+    status_code: int
+    detail: Optional[str] = None
+
+
+class BatchGetParts(BaseModel):
+    serial_numbers: List[str] = Field(..., min_length=1, max_length=1000)
+    # comma separated names of returned fields, i.e. 'serial_number,quantity,location.room'
+    fields: Optional[str] = None
+
+
+class BatchGetResult(BaseModel):
+    serial_number: str
+    found: bool
+    part: Optional[dict] = None
+
+
+class PartImportReport(BaseModel):
+    import_id: str
+    dry_run: bool
+    rows: int = 0
+    valid: int = 0
+    inserted: int = 0
+    updated: int = 0
+    failed: int = 0
+    # CSV of the rejected rows, only set when there are some
+    error_report: Optional[str] = None
+
+
+class TextSearchPart(BaseModel):
+    q: str = Field(..., min_length=1)
+    category: Optional[str] = None
+    room: Optional[str] = None
+    bookcase: Optional[str] = None
+    shelf: Optional[str] = None
+    cuvette: Optional[str] = None
+    fuzzy: bool = False
+    skip: int = Field(0, ge=0)
+    limit: int = Field(20, gt=0, le=100)
+
+
+class ScoredPart(Part):
+    score: float
+
+
+class StockMovement(BaseModel):
+    # negative for picks, positive for restocks
+    delta: int = Field(...)
+
+
+class BatchStockMovement(StockMovement):
+    serial_number: str = Field(...)
+
+
+class StockMovementResult(BaseModel):
+    serial_number: str
+    quantity: Optional[int] = None
+    status_code: int = 200
+    detail: Optional[str] = None
@@ -0,0 +1,66 @@
+from fastapi import APIRouter, Request, Query
+
+from app.service.autocomplete_service import autocomplete_index
+from app.service.category_cache import category_cache
+from app.service.part_cache import part_cache
+from app.utils.indexes import index_advisor
+from app.utils.slow_queries import slow_query_log
+
+router = APIRouter()
+
+
+@router.get("/admin/index-advisor")
+def get_index_advisor_report() -> dict:
+    return {'enabled': index_advisor.enabled, 'shapes': index_advisor.report()}
+
+
+@router.delete("/admin/index-advisor", status_code=204)
+def reset_index_advisor():
+    index_advisor.reset()
+
+
+@router.get("/admin/category-cache")
+def get_category_cache_stats() -> dict:
+    return category_cache.stats()
+
+
+@router.post("/admin/category-cache/rebuild")
+def rebuild_category_cache(request: Request) -> dict:
+    category_cache.rebuild(request.app.database)
+    return category_cache.stats()
+
+
+@router.get("/admin/autocomplete")
+def get_autocomplete_stats() -> dict:
+    return autocomplete_index.stats()
+
+
+@router.post("/admin/autocomplete/rebuild")
+def rebuild_autocomplete_index(request: Request) -> dict:
+    autocomplete_index.invalidate()
+    autocomplete_index.build(request.app.database)
+    return autocomplete_index.stats()
+
+
+@router.get("/admin/part-cache")
+def get_part_cache_stats() -> dict:
+    return part_cache.stats()
+
+
+@router.delete("/admin/part-cache", status_code=204)
+def clear_part_cache():
+    part_cache.clear()
+
+
+@router.get("/admin/slow-queries")
+def get_slow_queries(request: Request, limit: int = Query(20, gt=0, le=100)) -> dict:
+    return {
+        'enabled': slow_query_log.enabled,
+        'threshold_ms': slow_query_log.threshold_ms,
+        'shapes': slow_query_log.report(request.app.mongodb_client, limit),
+    }
+
+
+@router.delete("/admin/slow-queries", status_code=204)
+def reset_slow_queries():
+    slow_query_log.reset()
@@ -0,0 +1,31 @@
+from typing import Literal
+
+from fastapi import APIRouter, HTTPException, Request
+
+from app import config
+from app.models.analytics import ValuationReport
+from app.service.analytics_service import (
+    aggregate_category_totals,
+    read_running_category_totals,
+    roll_up_category_totals,
+    rebuild_running_category_totals
+)
+
+router = APIRouter()
+
+
+@router.get("/analytics/valuation")
+def get_valuation(request: Request, source: Literal['aggregate', 'running'] = 'aggregate') -> ValuationReport:
+    db = request.app.database
+    if source == 'aggregate':
+        category_totals = aggregate_category_totals(db)
+    elif config.VALUATION_RUNNING_TOTALS:
+        category_totals = read_running_category_totals(db)
+    else:
+        raise HTTPException(status_code=400, detail="Running totals are disabled")
+    return roll_up_category_totals(db, category_totals, source)
+
+
+@router.post("/analytics/valuation/rebuild", status_code=204)
+def rebuild_valuation(request: Request):
+    rebuild_running_category_totals(request.app.database)
@@ -0,0 +1,72 @@
+from typing import List, Optional
+
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+
+from app.models.category import Category
+from app.models.part import BatchGetParts, BatchGetResult, Part
+from app.service.part_cache import find_cached_part_or_throw_not_found_async, find_cached_parts_async
+from app.service.part_service import build_part_projection, project_part
+from app.utils.responses import CATEGORY_PROJECTION, PART_PROJECTION, FastJSONResponse, etag_matches
+from app.utils.streaming import MAX_PAGE_SIZE, wants_ndjson, keyset_page, set_next_page_header, ndjson_response_async
+
+# With DB_ASYNC the hot read routes are served by these handlers on the Motor database app.async_database, so
+# waiting on Mongo doesn't hold a threadpool slot. They replace the sync handlers of the same routes at startup.
+router = APIRouter()
+
+
+@router.get("/parts/{serial_number}", responses={304: {'description': "Not Modified"}})
+async def get_part(serial_number: str, request: Request) -> Part:
+    db = request.app.async_database
+    cached_part = await find_cached_part_or_throw_not_found_async(db, serial_number)
+    headers = {'ETag': cached_part.etag}
+    if etag_matches(request.headers.get('if-none-match'), cached_part.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(cached_part.body, media_type='application/json', headers=headers)
+
+
+@router.get("/parts/", response_class=FastJSONResponse)
+async def get_parts(request: Request, after: Optional[str] = None,
+                    limit: Optional[int] = Query(None, gt=0, le=MAX_PAGE_SIZE)) -> List[Part]:
+    db = request.app.async_database
+    found_parts = keyset_page(db.parts, 'serial_number', after, limit, PART_PROJECTION)
+    if wants_ndjson(request):
+        return ndjson_response_async(found_parts)
+
+    found_parts = await found_parts.to_list(length=None)
+    response = FastJSONResponse(found_parts)
+    set_next_page_header(response, found_parts, 'serial_number', limit)
+    return response
+
+
+@router.post("/parts/batch-get", response_class=FastJSONResponse)
+async def batch_get_parts(request: Request, batch: BatchGetParts) -> List[BatchGetResult]:
+    db = request.app.async_database
+    projection = build_part_projection(batch.fields)
+    parts = await find_cached_parts_async(db, batch.serial_numbers)
+    return FastJSONResponse([
+        {'serial_number': serial_number, 'found': True, 'part': project_part(parts[serial_number], projection)}
+        if serial_number in parts else {'serial_number': serial_number, 'found': False, 'part': None}
+        for serial_number in batch.serial_numbers])
+
+
+@router.get("/categories/{category}")
+async def get_category(category: str, request: Request) -> Category:
+    db = request.app.async_database
+    found_category = await db.categories.find_one({'name': category}, CATEGORY_PROJECTION)
+    if not found_category:
+        raise HTTPException(status_code=404, detail="Category not found")
+    return found_category
+
+
+@router.get("/categories/", response_class=FastJSONResponse)
+async def get_all_categories(request: Request, after: Optional[str] = None,
+                             limit: Optional[int] = Query(None, gt=0, le=MAX_PAGE_SIZE)) -> List[Category]:
+    db = request.app.async_database
+    found_categories = keyset_page(db.categories, 'name', after, limit, CATEGORY_PROJECTION)
+    if wants_ndjson(request):
+        return ndjson_response_async(found_categories)
+
+    found_categories = await found_categories.to_list(length=None)
+    response = FastJSONResponse(found_categories)
+    set_next_page_header(response, found_categories, 'name', limit)
+    return response
@@ -0,0 +1,14 @@
+from typing import List, Literal
+
+from fastapi import APIRouter, Query, Request
+
+from app.service.autocomplete_service import autocomplete
+
+router = APIRouter()
+
+
+@router.get("/autocomplete")
+def get_autocomplete(request: Request, field: Literal['serial_number', 'name', 'category'], prefix: str = '',
+                     limit: int = Query(10, gt=0, le=100)) -> List[str]:
+    """Distinct serial numbers, part names or category names starting with the prefix, in alphabetical order."""
+    return autocomplete(request.app.database, field, prefix, limit)
@@ -1,10 +1,16 @@
-from typing import List
+from typing import List, Optional
 
-from fastapi import HTTPException, APIRouter, Request
+from fastapi import HTTPException, APIRouter, Request, Query
 from fastapi.encoders import jsonable_encoder
 from pymongo.database import Database
-
-from app.models.category import Category, UpdateCategory
+from pymongo.errors import DuplicateKeyError
+
+from app import config
+from app.models.category import Category, UpdateCategory, CategoryTree
+from app.models.change import ChangeFeed
+from app.service.analytics_service import rename_running_category_totals
+from app.service.autocomplete_service import autocomplete_index
+from app.service.category_cache import category_cache
 from app.service.category_service import (
     ensure_that_parent_category_exist,
     ensure_that_category_does_not_exist,
@@ -14,8 +20,21 @@ from app.service.category_service import (
     update_child_category_parent_name,
     extract_parent_name,
     prevent_category_delete_if_part_associated_child_category,
-    prevent_category_delete_if_part_associated
+    prevent_category_delete_if_part_associated,
+    rename_category_in_parts,
+    category_path,
+    ensure_parent_is_not_in_subtree,
+    rename_category_in_ancestors,
+    move_category_subtree,
+    remove_category_from_ancestors,
+    find_category_subtree,
+    find_child_category_names
 )
+from app.service.change_log_service import CATEGORY_CHANGES, record_category_changes, find_changes
+from app.service.part_change_service import notify_category_renamed
+from app.utils.responses import CATEGORY_PROJECTION, FastJSONResponse
+from app.utils.streaming import MAX_PAGE_SIZE, wants_ndjson, keyset_page, set_next_page_header, ndjson_response
+from app.utils.transactions import run_in_transaction
 
 router = APIRouter()
 
@@ -28,7 +47,15 @@ def add_category(request: Request, category_dto: Category) -> Category:
 
     ensure_that_parent_category_exist(db, category_dto.parent_name)
 
-    db.categories.insert_one(category_dto.model_dump())
+    ancestors = category_path(db, category_dto.parent_name) if category_dto.parent_name != '' else []
+    try:
+        db.categories.insert_one({**category_dto.model_dump(), 'ancestors': ancestors})
+    except DuplicateKeyError:
+        # a concurrent request inserted the same name after the check
+        raise HTTPException(status_code=409, detail="Category with this name already exists")
+    category_cache.add(category_dto.name, category_dto.parent_name)
+    autocomplete_index.add_category(category_dto.name)
+    record_category_changes(db, [category_dto.name])
     return jsonable_encoder(category_dto, exclude=['_id'])
 
 
@@ -40,25 +67,59 @@ def update_category(category: str, request: Request, update_category_dto: Update
 
     fields_to_update = {field: value for field, value in update_category_dto.model_dump(exclude_unset=True).items() if
                         value is not None}
-
-    # if there is category to update, update all parent_name in child_categories and update category
-    if 'name' in fields_to_update:
-        update_child_categories_parent_name(db, category, fields_to_update)
-        db.categories.update_one({'name': category}, {'$set': {'name': fields_to_update['name']}})
+    new_name = fields_to_update.get('name', category)
+    if new_name != category:
+        ensure_that_category_does_not_exist(db, new_name)
 
     if 'parent_name' in fields_to_update:
         # if category is not base category
         if fields_to_update['parent_name'] != '':
-            db.categories.update_one({'name': category}, {'$set': {'parent_name': fields_to_update['parent_name']}})
+            ensure_that_parent_category_exist(db, fields_to_update['parent_name'])
+            ensure_parent_is_not_in_subtree(db, category, fields_to_update['parent_name'])
         else:
             # check if there are parts with this category because if true then this category can not be base category
             ensure_category_not_base_if_parts_exist(db, category)
-            db.categories.update_one({'name': category}, {'$set': {'parent_name': ''}})
 
-    updated_category = db.categories.find_one({'name': fields_to_update['name']})
+    # all writes of the cascade are applied together, or not at all when the deployment supports transactions
+    def apply_update(session):
+        # if there is category to update, update all parent_name in child_categories, ancestors and parts
+        if 'name' in fields_to_update:
+            update_child_categories_parent_name(db, category, fields_to_update, session=session)
+            db.categories.update_one({'name': category}, {'$set': {'name': new_name}}, session=session)
+            rename_category_in_ancestors(db, category, new_name, session=session)
+            rename_category_in_parts(db, category, new_name, session=session)
+            if config.VALUATION_RUNNING_TOTALS:
+                rename_running_category_totals(db, category, new_name, session=session)
+
+        if 'parent_name' in fields_to_update:
+            move_category_subtree(db, new_name, fields_to_update['parent_name'], session=session)
+
+        return db.categories.find_one({'name': new_name}, session=session)
+
+    updated_category = run_in_transaction(db, apply_update)
+
+    if 'name' in fields_to_update:
+        category_cache.rename(category, new_name)
+        autocomplete_index.remove_category(category)
+        autocomplete_index.add_category(new_name)
+        notify_category_renamed(db, category, new_name)
+    if 'parent_name' in fields_to_update:
+        category_cache.set_parent(new_name, fields_to_update['parent_name'])
+    # a renamed category is deleted under its old name, and its children get a new parent_name
+    renamed = [category] + find_child_category_names(db, new_name) if new_name != category else []
+    record_category_changes(db, [new_name] + renamed)
+
     return jsonable_encoder(updated_category, exclude=['_id'])
 
 
+@router.get("/categories/changes", response_class=FastJSONResponse)
+def get_category_changes(request: Request, since: int = Query(0, ge=0),
+                         limit: int = Query(MAX_PAGE_SIZE, gt=0, le=MAX_PAGE_SIZE)) -> ChangeFeed:
+    db = request.app.database
+    changes, next_since, has_more = find_changes(db, CATEGORY_CHANGES, since, limit)
+    return FastJSONResponse({'changes': changes, 'next_since': next_since, 'has_more': has_more})
+
+
 @router.get("/categories/{category}")
 def get_category(category: str, request: Request) -> Category:
     db = request.app.database
@@ -68,12 +129,34 @@ def get_category(category: str, request: Request) -> Category:
     return jsonable_encoder(found_category, exclude=['_id'])
 
 
-@router.get("/categories/")
-def get_all_categories(request: Request) -> List[Category]:
+@router.get("/categories/{category}/tree")
+def get_category_tree(category: str, request: Request) -> CategoryTree:
+    db = request.app.database
+    # the whole subtree is found with one query on the materialized 'ancestors' path
+    subtree = find_category_subtree(db, category)
+    nodes = {found['name']: CategoryTree(name=found['name'], parent_name=found['parent_name']) for found in subtree}
+    if category not in nodes:
+        raise HTTPException(status_code=404, detail="Category not found")
+
+    for node in sorted(nodes.values(), key=lambda node: node.name):
+        if node.name != category and node.parent_name in nodes:
+            nodes[node.parent_name].children.append(node)
+    return nodes[category]
+
+
+@router.get("/categories/", response_class=FastJSONResponse)
+def get_all_categories(request: Request, after: Optional[str] = None,
+                       limit: Optional[int] = Query(None, gt=0, le=MAX_PAGE_SIZE)) -> List[Category]:
     db = request.app.database
-    found_categories = db.categories.find({})
-    category_list = [Category(**category) for category in found_categories]
-    return jsonable_encoder(category_list, exclude=['_id'])
+    found_categories = keyset_page(db.categories, 'name', after, limit, CATEGORY_PROJECTION)
+    if wants_ndjson(request):
+        return ndjson_response(found_categories)
+
+    # categories were validated on write, so the documents are encoded as they are
+    found_categories = list(found_categories)
+    response = FastJSONResponse(found_categories)
+    set_next_page_header(response, found_categories, 'name', limit)
+    return response
 
 
 @router.delete("/categories/{category}", status_code=204)
@@ -83,19 +166,23 @@ def delete_category(category: str, request: Request):
     prevent_category_delete_if_part_associated(db, category)
 
     # check if child category has parts if true -> error
-    child_categories = list(db.categories.find({'parent_name': category}))
-    prevent_category_delete_if_part_associated_child_category(db, child_categories)
+    child_category_names = find_child_category_names(db, category)
+    prevent_category_delete_if_part_associated_child_category(db, child_category_names)
 
     # extract parent_name to use it while assigning child_category
     category_to_delete_parent_name = extract_parent_name(db, category)
 
-    # delete category
-    delete_result = db.categories.delete_one({'name': category})
-    if delete_result.deleted_count == 0:
-        raise HTTPException(status_code=404, detail="Part not found")
+    def apply_delete(session):
+        # delete category
+        delete_result = db.categories.delete_one({'name': category}, session=session)
+        if delete_result.deleted_count == 0:
+            raise HTTPException(status_code=404, detail="Category not found")
+
+        # assign child_category['parent_name'] to the parent_name of deleted category, or make them base categories
+        update_child_category_parent_name(db, category_to_delete_parent_name, child_category_names, session=session)
+        remove_category_from_ancestors(db, category, session=session)
 
-    # assign child_category['parent_name'] to new parent_name
-    if category_to_delete_parent_name != "":
-        update_child_category_parent_name(db, category_to_delete_parent_name, child_categories)
-    else:
-        update_child_category_parent_name(db, "", child_categories)
+    run_in_transaction(db, apply_delete)
+    category_cache.remove(category)
+    autocomplete_index.remove_category(category)
+    record_category_changes(db, [category] + child_category_names)
@@ -0,0 +1,47 @@
+import asyncio
+from typing import List, Optional
+
+import anyio
+from fastapi import APIRouter, Depends, HTTPException, Query, WebSocket, WebSocketException, status
+
+from app import config
+from app.models.location import LocationPrefix
+from app.service.location_service import build_location_prefix_query
+from app.service.part_events import Subscription, part_event_broker
+from app.utils.responses import FastJSONResponse
+
+router = APIRouter()
+
+
+@router.websocket("/parts/events")
+async def part_events(websocket: WebSocket, category: Optional[str] = None,
+                      serial_number: List[str] = Query([]), location_prefix: LocationPrefix = Depends()):
+    """Pushes changes of the parts in a category, under a location prefix or with the given serial numbers.
+
+    Every message is a JSON list of the events coalesced within PART_EVENTS_COALESCE_MS, one per part.
+    """
+    location = None
+    if location_prefix.model_dump(exclude={'limit'}, exclude_none=True):
+        try:
+            location = build_location_prefix_query(location_prefix)
+        except HTTPException as error:
+            raise WebSocketException(code=status.WS_1008_POLICY_VIOLATION, reason=error.detail)
+
+    await websocket.accept()
+    subscription = part_event_broker.subscribe(Subscription(
+        asyncio.get_running_loop(), category, location, set(serial_number), config.PART_EVENTS_MAX_PENDING))
+
+    async def send_events():
+        while True:
+            events = await subscription.next_events(config.PART_EVENTS_COALESCE_MS / 1000)
+            await websocket.send_text(FastJSONResponse(events).body.decode())
+
+    try:
+        async with anyio.create_task_group() as tasks:
+            tasks.start_soon(send_events)
+            # messages of the client are ignored, receiving only notices that it disconnected
+            while (await websocket.receive())['type'] != 'websocket.disconnect':
+                pass
+            tasks.cancel_scope.cancel()
+    finally:
+        part_event_broker.unsubscribe(subscription)
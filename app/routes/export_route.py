@@ -0,0 +1,34 @@
+from typing import Literal
+
+from fastapi import APIRouter, Request
+
+from app.service.change_log_service import last_sequence_number
+from app.utils.export import CATEGORY_COLUMNS, PART_COLUMNS, export_response
+from app.utils.responses import CATEGORY_PROJECTION, PART_PROJECTION
+
+router = APIRouter()
+
+ExportFormat = Literal['csv', 'ndjson', 'parquet']
+Compression = Literal['none', 'gzip', 'zstd']
+
+
+@router.get("/export/parts")
+def export_parts(request: Request, format: ExportFormat = 'csv', compression: Compression = 'gzip'):
+    db = request.app.database
+    # read before the documents, so GET /parts/changes from it replays every write the export might miss
+    last_change = last_sequence_number(db)
+    # ordered by the unique index, so consecutive exports can be diffed
+    cursor = db.parts.find({}, PART_PROJECTION).sort('serial_number', 1)
+    response = export_response(cursor, PART_COLUMNS, format, compression, 'parts')
+    response.headers['X-Change-Seq'] = str(last_change)
+    return response
+
+
+@router.get("/export/categories")
+def export_categories(request: Request, format: ExportFormat = 'csv', compression: Compression = 'gzip'):
+    db = request.app.database
+    last_change = last_sequence_number(db)
+    cursor = db.categories.find({}, CATEGORY_PROJECTION).sort('name', 1)
+    response = export_response(cursor, CATEGORY_COLUMNS, format, compression, 'categories')
+    response.headers['X-Change-Seq'] = str(last_change)
+    return response
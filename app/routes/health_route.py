@@ -0,0 +1,17 @@
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+
+from app.utils.startup import startup_state
+
+router = APIRouter()
+
+
+@router.get("/health/live")
+def get_liveness() -> dict:
+    return {'status': 'alive'}
+
+
+@router.get("/health/ready", responses={503: {'description': "Startup is not finished or failed"}})
+def get_readiness():
+    report = startup_state.report()
+    return JSONResponse(report, status_code=200 if startup_state.ready else 503)
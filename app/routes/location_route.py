@@ -0,0 +1,40 @@
+from typing import List
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+
+from app.models.location import CuvetteGrid, CuvetteLocation, FreeCell, LocationPrefix
+from app.models.part import Part
+from app.service.location_service import build_location_prefix_query, load_occupancy_grid
+from app.utils.indexes import LOCATION_FIELDS
+from app.utils.responses import PART_PROJECTION, FastJSONResponse
+
+router = APIRouter()
+
+
+@router.get("/locations/contents", response_class=FastJSONResponse)
+def get_location_contents(request: Request, location_prefix: LocationPrefix = Depends()) -> List[Part]:
+    db = request.app.database
+    query = build_location_prefix_query(location_prefix)
+    # sorted in the order of the location index, so matching parts are read straight from it
+    found_parts = (db.parts.find(query, PART_PROJECTION)
+                   .sort([(field, 1) for field in LOCATION_FIELDS])
+                   .limit(location_prefix.limit))
+    return FastJSONResponse(list(found_parts))
+
+
+@router.get("/locations/grid")
+def get_cuvette_grid(request: Request, cuvette: CuvetteLocation = Depends()) -> CuvetteGrid:
+    grid = load_occupancy_grid(request.app.database, cuvette)
+    occupied_cells = grid.occupied_cells()
+    return CuvetteGrid(columns=grid.columns, rows=grid.rows, occupied_cells=occupied_cells,
+                       free_cells=grid.columns * grid.rows - occupied_cells, cells=grid.to_rows())
+
+
+@router.get("/locations/free-cell")
+def get_nearest_free_cell(request: Request, cuvette: CuvetteLocation = Depends(),
+                          column: int = Query(1, gt=0), row: int = Query(1, gt=0)) -> FreeCell:
+    grid = load_occupancy_grid(request.app.database, cuvette)
+    free_cell = grid.nearest_free_cell(min(column, grid.columns), min(row, grid.rows))
+    if free_cell is None:
+        raise HTTPException(status_code=404, detail="There is no free cell in this cuvette")
+    return FreeCell(column=free_cell[0], row=free_cell[1], distance=free_cell[2])
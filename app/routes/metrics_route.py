@@ -0,0 +1,12 @@
+from fastapi import APIRouter, HTTPException, Response
+
+from app.utils.metrics import PROMETHEUS_MEDIA_TYPE, metrics
+
+router = APIRouter()
+
+
+@router.get("/metrics", include_in_schema=False)
+def get_metrics():
+    if not metrics.enabled:
+        raise HTTPException(status_code=404, detail="Metrics are disabled")
+    return Response(metrics.render(), media_type=PROMETHEUS_MEDIA_TYPE)
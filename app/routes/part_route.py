@@ -1,16 +1,55 @@
-from typing import List
+from typing import Any, Dict, List, Optional
 
-from fastapi import HTTPException, APIRouter, Request, Depends
+from fastapi import HTTPException, APIRouter, Request, Depends, Query, Response, UploadFile
 from fastapi.encoders import jsonable_encoder
-from app.models.part import Part, UpdatePart, SearchPart
+from pydantic import ValidationError
+from pymongo import ASCENDING, DESCENDING
+from pymongo.errors import DuplicateKeyError
+
+from app import config
+from app.models.part import (
+    Part,
+    UpdatePart,
+    SearchPart,
+    BulkItemResult,
+    TextSearchPart,
+    ScoredPart,
+    StockMovement,
+    BatchStockMovement,
+    StockMovementResult,
+    PartImportReport,
+    BatchGetParts,
+    BatchGetResult
+)
+from app.models.change import ChangeFeed
 from app.service.part_service import (
     ensure_that_part_does_not_exist,
     handle_no_parent_category,
-    find_part_or_throw_not_found
+    find_part_or_throw_not_found,
+    find_categories_accepting_parts,
+    find_existing_serial_numbers,
+    insert_parts_in_chunks,
+    add_range_condition,
+    build_part_projection,
+    project_part,
+    part_field_path,
+    apply_stock_movement
 )
+from app.service.category_service import find_category_with_descendants_names
+from app.service.change_log_service import PART_CHANGES, find_changes
+from app.service.part_cache import find_cached_part_or_throw_not_found, find_cached_parts
+from app.service.part_change_service import notify_part_changed, notify_parts_changed
+from app.service.part_import_service import IMPORT_ERROR_FIELDS, import_parts_from_csv, find_import_errors
+from app.service.text_search_service import search_parts_by_text
+from app.utils.export import export_response
+from app.utils.indexes import index_advisor
+from app.utils.responses import PART_PROJECTION, FastJSONResponse, etag_matches
+from app.utils.streaming import MAX_PAGE_SIZE, wants_ndjson, keyset_page, set_next_page_header, ndjson_response
 
 router = APIRouter()
 
+DUPLICATE_KEY_ERROR = 11000
+
 
 @router.post("/parts/", status_code=201)
 def add_part(request: Request, part_dto: Part) -> Part:
@@ -20,10 +59,127 @@ def add_part(request: Request, part_dto: Part) -> Part:
 
     handle_no_parent_category(db, part_dto.category)
 
-    db.parts.insert_one(part_dto.model_dump())
+    part = part_dto.model_dump()
+    try:
+        db.parts.insert_one(part)
+    except DuplicateKeyError:
+        # a concurrent request inserted the same serial number after the check
+        raise HTTPException(status_code=409, detail="Part with this serial number already exists")
+    notify_part_changed(db, None, part)
     return jsonable_encoder(part_dto, exclude=['_id'])
 
 
+@router.post("/parts/bulk")
+def add_parts_bulk(request: Request, parts_data: List[Dict[str, Any]]) -> List[BulkItemResult]:
+    db = request.app.database
+    # rows are not validated yet, a serial number of another type is left out instead of failing the whole batch
+    results = [BulkItemResult(index=index, status_code=201,
+                              serial_number=part_data.get('serial_number')
+                              if isinstance(part_data.get('serial_number'), str) else None)
+               for index, part_data in enumerate(parts_data)]
+
+    # validate every row on its own, so one bad row doesn't fail the whole batch
+    valid_parts = {}
+    for index, part_data in enumerate(parts_data):
+        try:
+            valid_parts[index] = Part(**part_data)
+        except ValidationError as error:
+            results[index].status_code = 422
+            results[index].detail = str(error)
+
+    categories = find_categories_accepting_parts(db, {part.category for part in valid_parts.values()})
+    existing_serial_numbers = find_existing_serial_numbers(db, [part.serial_number for part in valid_parts.values()])
+
+    to_insert_indexes = []
+    for index, part in valid_parts.items():
+        if part.serial_number in existing_serial_numbers:
+            results[index].status_code = 409
+            results[index].detail = "Part with this serial number already exists"
+        elif part.category not in categories:
+            results[index].status_code = 400
+            results[index].detail = "Incorrect category, part can't be created"
+        else:
+            # later duplicates within the same batch are rejected as well
+            existing_serial_numbers.add(part.serial_number)
+            to_insert_indexes.append(index)
+
+    parts_to_insert = [valid_parts[index].model_dump() for index in to_insert_indexes]
+    insert_errors = insert_parts_in_chunks(db, parts_to_insert, config.BULK_INSERT_CHUNK_SIZE)
+    for position, write_error in insert_errors.items():
+        # duplicate key errors come from a concurrent insert of the same serial number
+        results[to_insert_indexes[position]].status_code = 409 if write_error['code'] == DUPLICATE_KEY_ERROR else 400
+        results[to_insert_indexes[position]].detail = write_error['errmsg']
+
+    notify_parts_changed(db, [(None, part) for position, part in enumerate(parts_to_insert)
+                              if position not in insert_errors])
+
+    return results
+
+
+@router.post("/parts/batch-get", response_class=FastJSONResponse)
+def batch_get_parts(request: Request, batch: BatchGetParts) -> List[BatchGetResult]:
+    """Parts in the order of the requested serial numbers, found is false for the ones that don't exist."""
+    db = request.app.database
+    projection = build_part_projection(batch.fields)
+    parts = find_cached_parts(db, batch.serial_numbers)
+    return FastJSONResponse([
+        {'serial_number': serial_number, 'found': True, 'part': project_part(parts[serial_number], projection)}
+        if serial_number in parts else {'serial_number': serial_number, 'found': False, 'part': None}
+        for serial_number in batch.serial_numbers])
+
+
+@router.post("/parts/import")
+def import_parts(request: Request, file: UploadFile, dry_run: bool = False) -> PartImportReport:
+    db = request.app.database
+    # the upload is spooled to a temporary file, rows are parsed from it chunk by chunk
+    report = import_parts_from_csv(db, file.file, config.BULK_INSERT_CHUNK_SIZE, dry_run)
+    if report.failed:
+        report.error_report = request.url_for('get_import_errors', import_id=report.import_id).path
+    return report
+
+
+@router.get("/parts/import/{import_id}/errors")
+def get_import_errors(import_id: str, request: Request):
+    db = request.app.database
+    return export_response(find_import_errors(db, import_id), [(field, 'string') for field in IMPORT_ERROR_FIELDS],
+                           'csv', 'none', f'import-{import_id}-errors')
+
+
+# registered before GET /parts/{serial_number}, which would match 'changes' as a serial number
+@router.get("/parts/changes", response_class=FastJSONResponse)
+def get_part_changes(request: Request, since: int = Query(0, ge=0),
+                     limit: int = Query(MAX_PAGE_SIZE, gt=0, le=MAX_PAGE_SIZE)) -> ChangeFeed:
+    """Part writes after the since sequence number, deleted parts are returned as tombstones."""
+    db = request.app.database
+    changes, next_since, has_more = find_changes(db, PART_CHANGES, since, limit)
+    return FastJSONResponse({'changes': changes, 'next_since': next_since, 'has_more': has_more})
+
+
+@router.post("/parts/movements")
+def add_stock_movements(request: Request, movements: List[BatchStockMovement]) -> List[StockMovementResult]:
+    db = request.app.database
+    results = []
+    # every movement is applied on its own in request order, so a rejected one doesn't affect the others
+    for movement in movements:
+        try:
+            updated_part = apply_stock_movement(db, movement.serial_number, movement.delta)
+        except HTTPException as error:
+            results.append(StockMovementResult(serial_number=movement.serial_number, status_code=error.status_code,
+                                               detail=error.detail))
+            continue
+        notify_part_changed(db, {**updated_part, 'quantity': updated_part['quantity'] - movement.delta}, updated_part)
+        results.append(StockMovementResult(serial_number=movement.serial_number, quantity=updated_part['quantity']))
+    return results
+
+
+@router.post("/parts/{serial_number}/movements")
+def add_stock_movement(serial_number: str, request: Request, movement: StockMovement) -> StockMovementResult:
+    db = request.app.database
+    updated_part = apply_stock_movement(db, serial_number, movement.delta)
+    notify_part_changed(db, {**updated_part, 'quantity': updated_part['quantity'] - movement.delta}, updated_part)
+    return StockMovementResult(serial_number=serial_number, quantity=updated_part['quantity'])
+
+
 @router.put("/parts/{serial_number}")
 def update_part(serial_number: str, request: Request, update_part_dto: UpdatePart) -> Part:
     db = request.app.database
@@ -44,33 +200,51 @@ def update_part(serial_number: str, request: Request, update_part_dto: UpdatePar
     db.parts.update_one({'serial_number': serial_number}, {'$set': fields_to_update})
 
     updated_part = db.parts.find_one({'serial_number': serial_number})
+    notify_part_changed(db, original_part, updated_part)
     return jsonable_encoder(updated_part, exclude=['_id'])
 
 
-@router.get("/parts/{serial_number}")
+@router.get("/parts/{serial_number}", responses={304: {'description': "Not Modified"}})
 def get_part(serial_number: str, request: Request) -> Part:
     db = request.app.database
-    found_part = db.parts.find_one({'serial_number': serial_number})
-    return jsonable_encoder(found_part, exclude=['_id'])
+    cached_part = find_cached_part_or_throw_not_found(db, serial_number)
+    headers = {'ETag': cached_part.etag}
+    if etag_matches(request.headers.get('if-none-match'), cached_part.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(cached_part.body, media_type='application/json', headers=headers)
 
 
-@router.get("/parts/")
-def get_parts(request: Request) -> List[Part]:
+@router.get("/parts/", response_class=FastJSONResponse)
+def get_parts(request: Request, after: Optional[str] = None,
+              limit: Optional[int] = Query(None, gt=0, le=MAX_PAGE_SIZE)) -> List[Part]:
     db = request.app.database
-    found_parts = db.parts.find({})
-    parts_list = [Part(**part) for part in found_parts]
-    return jsonable_encoder(parts_list, exclude=['_id'])
+    found_parts = keyset_page(db.parts, 'serial_number', after, limit, PART_PROJECTION)
+    if wants_ndjson(request):
+        return ndjson_response(found_parts)
+
+    # parts were validated on write, so the documents are encoded as they are
+    found_parts = list(found_parts)
+    response = FastJSONResponse(found_parts)
+    set_next_page_header(response, found_parts, 'serial_number', limit)
+    return response
 
 
 @router.delete("/parts/{serial_number}", status_code=204)
 def delete_part(serial_number: str, request: Request):
     db = request.app.database
-    delete_result = db.parts.delete_one({'serial_number': serial_number})
-    if delete_result.deleted_count == 0:
+    deleted_part = db.parts.find_one_and_delete({'serial_number': serial_number})
+    if deleted_part is None:
         raise HTTPException(status_code=404, detail="Part not found")
+    notify_part_changed(db, deleted_part, None)
 
 
-@router.get("/parts/search/")
+@router.get("/parts/search/text")
+def search_part_by_text(request: Request, searched_parameters: TextSearchPart = Depends()) -> List[ScoredPart]:
+    db = request.app.database
+    return search_parts_by_text(db, searched_parameters)
+
+
+@router.get("/parts/search/", response_class=FastJSONResponse)
 def search_part(request: Request, searched_parameters: SearchPart = Depends()) -> List[Part]:
     db = request.app.database
     query = {}
@@ -79,7 +253,9 @@ def search_part(request: Request, searched_parameters: SearchPart = Depends()) -
         query['name'] = searched_parameters.name
     if searched_parameters.description is not None:
         query['description'] = searched_parameters.description
-    if searched_parameters.category is not None:
+    if searched_parameters.category is not None and searched_parameters.include_descendants:
+        query['category'] = {'$in': find_category_with_descendants_names(db, searched_parameters.category)}
+    elif searched_parameters.category is not None:
         query['category'] = searched_parameters.category
     if searched_parameters.quantity is not None:
         query['quantity'] = searched_parameters.quantity
@@ -98,5 +274,21 @@ def search_part(request: Request, searched_parameters: SearchPart = Depends()) -
     if searched_parameters.row is not None:
         query['location.row'] = searched_parameters.row
 
-    searched_parts = db.parts.find(query)
-    return [Part(**part) for part in searched_parts]
+    add_range_condition(query, 'price', searched_parameters.price_min, searched_parameters.price_max)
+    add_range_condition(query, 'quantity', searched_parameters.quantity_min, searched_parameters.quantity_max)
+    add_range_condition(query, 'location.column', searched_parameters.column_min, searched_parameters.column_max)
+    add_range_condition(query, 'location.row', searched_parameters.row_min, searched_parameters.row_max)
+
+    # projection, sort and limit are pushed down to the database, so only returned documents are transferred
+    projection = build_part_projection(searched_parameters.fields)
+
+    index_advisor.record('parts', query)
+    searched_parts = db.parts.find(query, projection or PART_PROJECTION)
+    if searched_parameters.sort_by is not None:
+        direction = ASCENDING if searched_parameters.sort_order == 'asc' else DESCENDING
+        searched_parts = searched_parts.sort(part_field_path(searched_parameters.sort_by), direction)
+    if searched_parameters.limit is not None:
+        searched_parts = searched_parts.limit(searched_parameters.limit)
+
+    # parts were validated on write, so the documents are encoded as they are
+    return FastJSONResponse(list(searched_parts))
@@ -0,0 +1,90 @@
+from collections import defaultdict
+from typing import Dict
+
+from pymongo import UpdateOne
+
+from app.models.analytics import CategoryValuation, ValuationReport
+
+TOTALS_FIELDS = ('parts', 'units', 'value')
+
+
+def aggregate_category_totals(db) -> Dict[str, dict]:
+    pipeline = [{'$group': {
+        '_id': '$category',
+        'parts': {'$sum': 1},
+        'units': {'$sum': '$quantity'},
+        'value': {'$sum': {'$multiply': ['$quantity', '$price']}},
+    }}]
+    return {totals['_id']: totals for totals in db.parts.aggregate(pipeline)}
+
+
+def read_running_category_totals(db) -> Dict[str, dict]:
+    return {totals['category']: totals for totals in db.category_totals.find({}, {'_id': 0})}
+
+
+def roll_up_category_totals(db, category_totals: Dict[str, dict], source: str) -> ValuationReport:
+    """Adds totals of every category to itself and all its ancestors, read from the materialized path."""
+    categories = list(db.categories.find({}, {'_id': 0, 'name': 1, 'parent_name': 1, 'ancestors': 1}))
+    valuations = {category['name']: CategoryValuation(name=category['name'], parent_name=category['parent_name'])
+                  for category in categories}
+
+    for category in categories:
+        totals = category_totals.get(category['name'])
+        if totals is None:
+            continue
+        valuation = valuations[category['name']]
+        valuation.parts, valuation.units, valuation.value = (totals[field] for field in TOTALS_FIELDS)
+        for name in [category['name']] + category.get('ancestors', []):
+            if name in valuations:
+                valuations[name].total_parts += totals['parts']
+                valuations[name].total_units += totals['units']
+                valuations[name].total_value += totals['value']
+
+    for valuation in valuations.values():
+        valuation.value = round(valuation.value, 2)
+        valuation.total_value = round(valuation.total_value, 2)
+
+    return ValuationReport(
+        source=source,
+        parts=sum(totals['parts'] for totals in category_totals.values()),
+        units=sum(totals['units'] for totals in category_totals.values()),
+        value=round(sum(totals['value'] for totals in category_totals.values()), 2),
+        categories=sorted(valuations.values(), key=lambda valuation: valuation.name),
+    )
+
+
+def part_totals_deltas(changes: list) -> Dict[str, dict]:
+    deltas: Dict[str, dict] = defaultdict(lambda: dict.fromkeys(TOTALS_FIELDS, 0))
+    for before, after in changes:
+        for part, sign in ((before, -1), (after, 1)):
+            if part is not None:
+                delta = deltas[part['category']]
+                delta['parts'] += sign
+                delta['units'] += sign * part['quantity']
+                delta['value'] += sign * part['quantity'] * part['price']
+    return {category: delta for category, delta in deltas.items() if any(delta.values())}
+
+
+def apply_running_category_totals(db, changes: list):
+    # one bulk write per batch of part changes keeps the per-category totals current
+    updates = [UpdateOne({'category': category}, {'$inc': delta}, upsert=True)
+               for category, delta in part_totals_deltas(changes).items()]
+    if updates:
+        db.category_totals.bulk_write(updates, ordered=False)
+
+
+def rename_running_category_totals(db, category: str, new_name: str, session=None):
+    # merged into the totals of the new name, a deleted category of that name may have left its (zeroed) row behind
+    totals = db.category_totals.find_one_and_delete({'category': category}, session=session)
+    if totals is not None:
+        db.category_totals.update_one({'category': new_name},
+                                      {'$inc': {field: totals[field] for field in TOTALS_FIELDS}},
+                                      upsert=True, session=session)
+
+
+def rebuild_running_category_totals(db):
+    category_totals = aggregate_category_totals(db)
+    db.category_totals.delete_many({})
+    if category_totals:
+        db.category_totals.insert_many([{'category': category, **{field: totals[field] for field in TOTALS_FIELDS}}
+                                        for category, totals in category_totals.items()])
@@ -0,0 +1,131 @@
+import re
+from threading import Lock
+from typing import Dict, List
+
+from app import config
+from app.utils.prefix_index import PrefixIndex
+
+# autocompleted field -> (collection, document field)
+AUTOCOMPLETE_FIELDS = {
+    'serial_number': ('parts', 'serial_number'),
+    'name': ('parts', 'name'),
+    'category': ('categories', 'name'),
+}
+# fields with a unique ascending index, completed from it case-sensitively when they are too large for memory
+INDEXED_AUTOCOMPLETE_FIELDS = {'serial_number', 'category'}
+PART_AUTOCOMPLETE_FIELDS = [field for field, (collection, _) in AUTOCOMPLETE_FIELDS.items() if collection == 'parts']
+
+
+class AutocompleteIndex:
+    """In-process prefix indexes of the autocompleted fields, built on first use and kept current by the write
+    handlers.
+
+    A write to a field counts up its generation. A build that overlapped such a write may have missed it, so the
+    field is scanned again until a scan sees no write.
+    """
+
+    def __init__(self):
+        self._indexes: Dict[str, PrefixIndex] = {}
+        self._generations: Dict[str, int] = dict.fromkeys(AUTOCOMPLETE_FIELDS, 0)
+        self._lock = Lock()
+        # concurrent first requests wait for one scan instead of starting their own
+        self._build_locks = {field: Lock() for field in AUTOCOMPLETE_FIELDS}
+
+    def get(self, db, field: str) -> PrefixIndex:
+        index = self._indexes.get(field)
+        if index is not None:
+            return index
+        with self._build_locks[field]:
+            while True:
+                with self._lock:
+                    index = self._indexes.get(field)
+                    if index is not None:
+                        return index
+                    generation = self._generations[field]
+                collection, document_field = AUTOCOMPLETE_FIELDS[field]
+                index = PrefixIndex(config.AUTOCOMPLETE_MAX_ENTRIES)
+                index.add_all(document[document_field] for document in
+                              db[collection].find({}, {'_id': 0, document_field: 1}).batch_size(10000))
+                with self._lock:
+                    if self._generations[field] == generation:
+                        self._indexes[field] = index
+                        return index
+
+    def build(self, db):
+        for field in AUTOCOMPLETE_FIELDS:
+            self.get(db, field)
+
+    def apply_part_changes(self, changes: list):
+        for field in PART_AUTOCOMPLETE_FIELDS:
+            changed = [(before, after) for before, after in changes
+                       if before is None or after is None or before[field] != after[field]]
+            if not changed:
+                continue
+            with self._lock:
+                self._generations[field] += 1
+                index = self._indexes.get(field)
+                if index is None:
+                    continue
+                for before, after in changed:
+                    if before is not None:
+                        index.remove(before[field])
+                    if after is not None:
+                        index.add(after[field])
+
+    def add_category(self, name: str):
+        with self._lock:
+            self._generations['category'] += 1
+            index = self._indexes.get('category')
+            if index is not None:
+                index.add(name)
+
+    def remove_category(self, name: str):
+        with self._lock:
+            self._generations['category'] += 1
+            index = self._indexes.get('category')
+            if index is not None:
+                index.remove(name)
+
+    def invalidate(self):
+        with self._lock:
+            self._indexes = {}
+            # a build in progress may have read the data before it changed
+            for field in self._generations:
+                self._generations[field] += 1
+
+    def stats(self) -> dict:
+        return {field: {'entries': len(index), 'overflowed': index.overflowed}
+                for field, index in self._indexes.items()}
+
+
+autocomplete_index = AutocompleteIndex()
+
+
+def complete_from_database(db, field: str, prefix: str, limit: int) -> List[str]:
+    """Completes a field too large to be kept in memory."""
+    collection, document_field = AUTOCOMPLETE_FIELDS[field]
+    if field in INDEXED_AUTOCOMPLETE_FIELDS:
+        # a case-sensitive anchored regex is a range scan of the unique index, which is already sorted and distinct,
+        # so it stops after limit keys
+        cursor = db[collection].find({document_field: {'$regex': '^' + re.escape(prefix)}},
+                                     {'_id': 0, document_field: 1}).sort(document_field, 1).limit(limit)
+        return [document[document_field] for document in cursor]
+
+    # a case-insensitive regex can't seek in an index and scans the whole collection
+    matches = db[collection].aggregate([
+        {'$match': {document_field: {'$regex': '^' + re.escape(prefix), '$options': 'i'}}},
+        {'$group': {'_id': '$' + document_field}},
+        {'$sort': {'_id': 1}},
+        {'$limit': limit},
+    ])
+    return [match['_id'] for match in matches]
+
+
+def autocomplete(db, field: str, prefix: str, limit: int) -> List[str]:
+    """Distinct values of the field starting with the prefix, ignoring case unless the field is completed from its
+    index.
+    """
+    index = autocomplete_index.get(db, field)
+    if index.overflowed:
+        return complete_from_database(db, field, prefix, limit)
+    return index.complete(prefix, limit)
@@ -0,0 +1,160 @@
+import logging
+from dataclasses import dataclass, field
+from threading import RLock, Thread
+from typing import Dict, Iterable, Optional, Set
+
+from pymongo.errors import PyMongoError
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CategoryNode:
+    name: str
+    parent_name: str
+    children: Set[str] = field(default_factory=set)
+
+
+class CategoryTreeCache:
+    """In-memory copy of the category hierarchy, kept current by the category write handlers.
+
+    Names missing from the cache are looked up in the database before being reported as missing,
+    so categories created by another worker are picked up without waiting for a rebuild.
+    """
+
+    def __init__(self):
+        self._nodes: Dict[str, CategoryNode] = {}
+        self._loaded = False
+        self._lock = RLock()
+        self.hits = 0
+        self.misses = 0
+        self.rebuilds = 0
+
+    def rebuild(self, db):
+        nodes = {category['name']: CategoryNode(category['name'], category['parent_name'])
+                 for category in db.categories.find({}, {'_id': 0, 'name': 1, 'parent_name': 1})}
+        for node in nodes.values():
+            if node.parent_name in nodes:
+                nodes[node.parent_name].children.add(node.name)
+
+        with self._lock:
+            self._nodes = nodes
+            self._loaded = True
+            self.rebuilds += 1
+
+    def invalidate(self):
+        with self._lock:
+            self._nodes = {}
+            self._loaded = False
+
+    def get(self, db, name: str) -> Optional[CategoryNode]:
+        with self._lock:
+            if self._loaded and name in self._nodes:
+                self.hits += 1
+                return self._nodes[name]
+            self.misses += 1
+            if not self._loaded:
+                self.rebuild(db)
+                return self._nodes.get(name)
+
+        category = db.categories.find_one({'name': name}, {'_id': 0, 'name': 1, 'parent_name': 1})
+        if category is None:
+            return None
+        self.add(category['name'], category['parent_name'])
+        return self._nodes.get(name) or CategoryNode(category['name'], category['parent_name'])
+
+    def get_many(self, db, names: Iterable[str]) -> Dict[str, CategoryNode]:
+        with self._lock:
+            if not self._loaded:
+                self.misses += 1
+                self.rebuild(db)
+            found = {name: self._nodes[name] for name in names if name in self._nodes}
+            missing = [name for name in names if name not in found]
+            self.hits += len(found)
+            self.misses += len(missing)
+
+        if missing:
+            for category in db.categories.find({'name': {'$in': missing}}, {'_id': 0, 'name': 1, 'parent_name': 1}):
+                self.add(category['name'], category['parent_name'])
+                found[category['name']] = (self._nodes.get(category['name'])
+                                           or CategoryNode(category['name'], category['parent_name']))
+        return found
+
+    def add(self, name: str, parent_name: str):
+        with self._lock:
+            if not self._loaded:
+                return
+            if name in self._nodes:
+                self.set_parent(name, parent_name)
+                return
+            self._nodes[name] = CategoryNode(name, parent_name)
+            if parent_name in self._nodes:
+                self._nodes[parent_name].children.add(name)
+
+    def rename(self, old_name: str, new_name: str):
+        with self._lock:
+            node = self._nodes.pop(old_name, None)
+            if node is None:
+                return
+            node.name = new_name
+            self._nodes[new_name] = node
+            for child_name in node.children:
+                self._nodes[child_name].parent_name = new_name
+            if node.parent_name in self._nodes:
+                self._nodes[node.parent_name].children.discard(old_name)
+                self._nodes[node.parent_name].children.add(new_name)
+
+    def set_parent(self, name: str, parent_name: str):
+        with self._lock:
+            node = self._nodes.get(name)
+            if node is None:
+                return
+            if node.parent_name in self._nodes:
+                self._nodes[node.parent_name].children.discard(name)
+            node.parent_name = parent_name
+            if parent_name in self._nodes:
+                self._nodes[parent_name].children.add(name)
+
+    def remove(self, name: str):
+        # children of a removed category are moved to its parent, as delete_category does
+        with self._lock:
+            node = self._nodes.pop(name, None)
+            if node is None:
+                return
+            if node.parent_name in self._nodes:
+                self._nodes[node.parent_name].children.discard(name)
+            for child_name in node.children:
+                self.set_parent(child_name, node.parent_name)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'loaded': self._loaded,
+                'size': len(self._nodes),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': self.hits / lookups if lookups else 0.0,
+                'rebuilds': self.rebuilds,
+            }
+
+    def watch(self, db) -> Thread:
+        """Invalidates the cache on every change of the categories collection, made by any worker.
+
+        Change streams require a replica set, the watcher stops logging an error otherwise.
+        """
+        def watch_changes():
+            try:
+                with db.categories.watch() as stream:
+                    for _ in stream:
+                        self.invalidate()
+            except PyMongoError as error:
+                logger.error("Category cache change stream stopped: %s", error)
+            self.invalidate()
+
+        watcher = Thread(target=watch_changes, name='category-cache-watcher', daemon=True)
+        watcher.start()
+        return watcher
+
+
+category_cache = CategoryTreeCache()
@@ -1,15 +1,18 @@
+from typing import List
+
 from fastapi import HTTPException
+from pymongo import UpdateOne
+
+from app.service.category_cache import category_cache
 
 
 def ensure_that_parent_category_exist(db, parent_name: str):
-    parent_category = db.categories.find_one({'name': parent_name})
-    if parent_name != '' and parent_category is None:
+    if parent_name != '' and category_cache.get(db, parent_name) is None:
         raise HTTPException(status_code=400, detail="Category with this parent name does not exist")
 
 
 def ensure_that_category_does_not_exist(db, category_name: str):
-    existing_category_with_same_name = db.categories.find_one({'name': category_name})
-    if existing_category_with_same_name:
+    if category_cache.get(db, category_name) is not None:
         raise HTTPException(status_code=409, detail="Category with this name already exists")
 
 
@@ -20,37 +23,48 @@ def ensure_category_not_base_if_parts_exist(db, category: str):
                             detail="This category cannot be a base category because it has associated parts.")
 
 
-def update_child_categories_parent_name(db, category: str, fields_to_update: dict):
-    child_categories = db.categories.find({'parent_name': category})
-    for child_category in child_categories:
-        db.categories.update_one({'name': child_category['name']},
-                                 {'$set': {'parent_name': fields_to_update['name']}})
+def update_child_categories_parent_name(db, category: str, fields_to_update: dict, session=None):
+    db.categories.update_many({'parent_name': category}, {'$set': {'parent_name': fields_to_update['name']}},
+                              session=session)
+
+
+def rename_category_in_parts(db, category: str, new_name: str, session=None):
+    db.parts.update_many({'category': category}, {'$set': {'category': new_name}}, session=session)
 
 
 def ensure_that_category_exist(db, category: str):
-    existing_category = db.categories.find_one({'name': category})
-    if not existing_category:
+    if category_cache.get(db, category) is None:
         raise HTTPException(status_code=404, detail="Category not found")
 
 
-def update_child_category_parent_name(db, category_to_delete_parent_name: str, child_categories: list):
-    for child_category in child_categories:
-        db.categories.update_one({'name': child_category['name']},
-                                 {'$set': {'parent_name': category_to_delete_parent_name}})
+def update_child_category_parent_name(db, category_to_delete_parent_name: str, child_category_names: List[str],
+                                      session=None):
+    db.categories.update_many({'name': {'$in': child_category_names}},
+                              {'$set': {'parent_name': category_to_delete_parent_name}}, session=session)
+
+
+def find_child_category_names(db, category: str) -> List[str]:
+    # read from the database, the category cache doesn't know children written by other workers;
+    # the large batch size fetches them in one round trip, up to the 16MB reply limit
+    return [child['name'] for child in
+            db.categories.find({'parent_name': category}, {'_id': 0, 'name': 1}).sort('name', 1).batch_size(100000)]
 
 
 def extract_parent_name(db, category: str) -> str:
-    category_to_delete = db.categories.find_one({'name': category})
-    category_to_delete_parent_name = category_to_delete['parent_name']
-    return category_to_delete_parent_name
+    category_to_delete = category_cache.get(db, category)
+    if category_to_delete is None:
+        raise HTTPException(status_code=404, detail="Category not found")
+    return category_to_delete.parent_name
 
 
-def prevent_category_delete_if_part_associated_child_category(db, child_categories: list):
-    for child_category in child_categories:
-        if db.parts.find_one({'category': child_category['name']}):
-            raise HTTPException(status_code=400,
-                                detail="You can not delete this category because, "
-                                       "there are parts that belong to child category " + child_category['name'])
+def prevent_category_delete_if_part_associated_child_category(db, child_category_names: List[str]):
+    if not child_category_names:
+        return
+    part_in_child_category = db.parts.find_one({'category': {'$in': child_category_names}}, {'_id': 0, 'category': 1})
+    if part_in_child_category:
+        raise HTTPException(status_code=400,
+                            detail="You can not delete this category because, "
+                                   "there are parts that belong to child category " + part_in_child_category['category'])
 
 
 def prevent_category_delete_if_part_associated(db, category: str):
@@ -59,3 +73,63 @@ def prevent_category_delete_if_part_associated(db, category: str):
         raise HTTPException(status_code=400,
                             detail="You can not delete this category because, "
                                    "there are parts that belong to this category.")
+
+
+def category_path(db, category: str, session=None) -> List[str]:
+    # materialized path stored as 'ancestors' of the children of the category, read from the database and not from
+    # the category cache, which may be stale in a worker that didn't make the latest move
+    found_category = db.categories.find_one({'name': category}, {'_id': 0, 'ancestors': 1}, session=session)
+    return (found_category or {}).get('ancestors', []) + [category]
+
+
+def ensure_parent_is_not_in_subtree(db, category: str, parent_name: str):
+    if parent_name != '' and category in category_path(db, parent_name):
+        raise HTTPException(status_code=400, detail="Category can't be moved under itself or its child category")
+
+
+def rename_category_in_ancestors(db, category: str, new_name: str, session=None):
+    # a name appears at most once in a path, so the positional operator updates the only match
+    db.categories.update_many({'ancestors': category}, {'$set': {'ancestors.$': new_name}}, session=session)
+
+
+def move_category_subtree(db, category: str, parent_name: str, session=None):
+    new_ancestors = category_path(db, parent_name, session=session) if parent_name != '' else []
+    db.categories.update_one({'name': category}, {'$set': {'parent_name': parent_name, 'ancestors': new_ancestors}},
+                             session=session)
+    # descendants keep the part of their path below the moved category
+    db.categories.update_many({'ancestors': category}, [{'$set': {'ancestors': {'$concatArrays': [
+        new_ancestors,
+        {'$slice': ['$ancestors', {'$indexOfArray': ['$ancestors', category]}, {'$size': '$ancestors'}]}
+    ]}}}], session=session)
+
+
+def remove_category_from_ancestors(db, category: str, session=None):
+    db.categories.update_many({'ancestors': category}, {'$pull': {'ancestors': category}}, session=session)
+
+
+def find_category_subtree(db, category: str) -> List[dict]:
+    return list(db.categories.find({'$or': [{'name': category}, {'ancestors': category}]},
+                                   {'_id': 0, 'name': 1, 'parent_name': 1, 'ancestors': 1}))
+
+
+def find_category_with_descendants_names(db, category: str) -> List[str]:
+    return [category] + [descendant['name'] for descendant in
+                         db.categories.find({'ancestors': category}, {'_id': 0, 'name': 1})]
+
+
+def backfill_category_ancestors(db):
+    """Stores the materialized path of categories created before 'ancestors' was introduced."""
+    if db.categories.find_one({'ancestors': {'$exists': False}}) is None:
+        return
+
+    parents = {category['name']: category['parent_name']
+               for category in db.categories.find({}, {'_id': 0, 'name': 1, 'parent_name': 1})}
+    updates = []
+    for name in parents:
+        ancestors = []
+        parent_name = parents[name]
+        while parent_name in parents and parent_name not in ancestors:
+            ancestors.append(parent_name)
+            parent_name = parents[parent_name]
+        updates.append(UpdateOne({'name': name}, {'$set': {'ancestors': ancestors[::-1]}}))
+    db.categories.bulk_write(updates, ordered=False)
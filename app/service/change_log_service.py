@@ -0,0 +1,120 @@
+from datetime import datetime, timedelta, timezone
+from typing import Iterable, List, Optional, Tuple
+
+from fastapi import HTTPException
+from pymongo import ReturnDocument
+
+from app import config
+from app.utils.responses import CATEGORY_PROJECTION, PART_PROJECTION
+
+PART_CHANGES = 'part'
+CATEGORY_CHANGES = 'category'
+
+# key, and the document after the change or None when it was deleted (a tombstone)
+ChangeEntry = Tuple[str, Optional[dict]]
+
+
+def allocate_sequence_numbers(db, count: int) -> int:
+    """Reserves count consecutive sequence numbers with one atomic $inc and returns the first of them."""
+    counter = db.counters.find_one_and_update({'_id': 'changes'}, {'$inc': {'seq': count}}, upsert=True,
+                                              return_document=ReturnDocument.AFTER)
+    return counter['seq'] - count + 1
+
+
+def record_changes(db, kind: str, entries: List[ChangeEntry]):
+    if not config.CHANGE_LOG_ENABLED or not entries:
+        return
+    first_sequence_number = allocate_sequence_numbers(db, len(entries))
+    recorded_at = datetime.now(timezone.utc)
+    db.changes.insert_many([
+        {'seq': first_sequence_number + position, 'kind': kind, 'key': key, 'deleted': document is None,
+         'document': document, 'recorded_at': recorded_at}
+        for position, (key, document) in enumerate(entries)])
+
+
+def record_part_changes(db, changes: List[Tuple[Optional[dict], Optional[dict]]]):
+    entries = []
+    for before, after in changes:
+        if after is None:
+            entries.append((before['serial_number'], None))
+        else:
+            # the stored documents may carry _id, only the public fields are logged
+            entries.append((after['serial_number'], {field: after.get(field) for field in PART_PROJECTION
+                                                     if PART_PROJECTION[field]}))
+    record_changes(db, PART_CHANGES, entries)
+
+
+def record_category_changes(db, names: Iterable[str]):
+    """Logs the current state of the named categories, the ones no longer stored are logged as deleted."""
+    names = list(dict.fromkeys(names))
+    if not config.CHANGE_LOG_ENABLED or not names:
+        return
+    # read in a single batch, a deleted or renamed category may have thousands of children
+    found = {category['name']: category for category in
+             db.categories.find({'name': {'$in': names}}, CATEGORY_PROJECTION).batch_size(len(names))}
+    record_changes(db, CATEGORY_CHANGES, [(name, found.get(name)) for name in names])
+
+
+def record_parts_of_category(db, category: str, batch_size: int):
+    # a renamed category is written to all of its parts with one update_many, so they are logged from the database
+    cursor = db.parts.find({'category': category}, PART_PROJECTION).batch_size(batch_size)
+    batch = []
+    for part in cursor:
+        batch.append((part['serial_number'], part))
+        if len(batch) == batch_size:
+            record_changes(db, PART_CHANGES, batch)
+            batch = []
+    record_changes(db, PART_CHANGES, batch)
+
+
+def last_sequence_number(db) -> int:
+    """The last allocated sequence number, 0 before the first change."""
+    counter = db.counters.find_one({'_id': 'changes'})
+    return counter['seq'] if counter else 0
+
+
+def first_retained_sequence_number(db) -> int:
+    oldest = db.changes.find_one({}, {'_id': 0, 'seq': 1}, sort=[('seq', 1)])
+    if oldest is not None:
+        return oldest['seq']
+    return last_sequence_number(db) + 1
+
+
+def recorded_before(change: dict, deadline: datetime) -> bool:
+    # dates are read back without their UTC timezone
+    return change['recorded_at'].replace(tzinfo=timezone.utc) < deadline
+
+
+def find_changes(db, kind: str, since: int, limit: int) -> Tuple[List[dict], int, bool]:
+    """Changes of one kind after the since sequence number, the sequence number to resume from and whether
+    more changes may follow it.
+
+    Sequence numbers are allocated before their change is inserted, so a concurrent writer may insert a lower
+    number later. Changes are only returned up to the first such gap, unless the change after it is older than
+    CHANGE_LOG_GAP_TIMEOUT_SECONDS, in which case the writer of the missing number failed.
+
+    When the changes after since were pruned, the 410 carries the last allocated sequence number in the
+    X-Change-Seq header. Every write numbered up to it is done, so a client downloading everything afterwards
+    resumes from it without missing a change.
+    """
+    if since < first_retained_sequence_number(db) - 1:
+        raise HTTPException(status_code=410, detail="Changes since this token were pruned, download everything again",
+                            headers={'X-Change-Seq': str(last_sequence_number(db))})
+
+    # changes of all kinds are read, so gaps are found in the whole sequence
+    scan_limit = limit * 10
+    cursor = db.changes.find({'seq': {'$gt': since}}, {'_id': 0}).sort('seq', 1).limit(scan_limit)
+    gap_deadline = datetime.now(timezone.utc) - timedelta(seconds=config.CHANGE_LOG_GAP_TIMEOUT_SECONDS)
+    changes = []
+    resume_from = since
+    scanned = 0
+    for change in cursor:
+        if change['seq'] != resume_from + 1 and not recorded_before(change, gap_deadline):
+            return changes, resume_from, False
+        scanned += 1
+        resume_from = change['seq']
+        if change['kind'] == kind:
+            changes.append({field: change[field] for field in ('seq', 'key', 'deleted', 'document')})
+            if len(changes) == limit:
+                return changes, resume_from, True
+    return changes, resume_from, scanned == scan_limit
@@ -0,0 +1,81 @@
+from array import array
+from typing import Iterator, List, Optional, Tuple
+
+from fastapi import HTTPException
+
+from app.models.location import MAX_GRID_SIZE, CuvetteLocation, LocationPrefix
+from app.utils.indexes import LOCATION_FIELDS
+
+
+def build_location_prefix_query(location_prefix: LocationPrefix) -> dict:
+    # only a contiguous prefix of room > bookcase > shelf > cuvette > column > row can seek in the location index
+    query = {}
+    missing_level = None
+    for field in LOCATION_FIELDS:
+        value = getattr(location_prefix, field.removeprefix('location.'))
+        if value is None:
+            missing_level = missing_level or field
+        elif missing_level is not None:
+            raise HTTPException(status_code=400, detail=f"{field} can't be given without {missing_level}")
+        else:
+            query[field] = value
+    if not query:
+        raise HTTPException(status_code=400, detail="At least room has to be given")
+    return query
+
+
+def build_cuvette_query(cuvette: CuvetteLocation) -> dict:
+    return {'location.room': cuvette.room, 'location.bookcase': cuvette.bookcase,
+            'location.shelf': cuvette.shelf, 'location.cuvette': cuvette.cuvette}
+
+
+class OccupancyGrid:
+    """Part counts of the column x row cells of a cuvette in a flat array, cells are numbered from 1."""
+
+    def __init__(self, columns: int, rows: int):
+        self.columns = columns
+        self.rows = rows
+        self._cells = array('I', bytes(4 * columns * rows))
+
+    def add(self, column: int, row: int):
+        if 1 <= column <= self.columns and 1 <= row <= self.rows:
+            self._cells[(row - 1) * self.columns + column - 1] += 1
+
+    def count(self, column: int, row: int) -> int:
+        return self._cells[(row - 1) * self.columns + column - 1]
+
+    def occupied_cells(self) -> int:
+        return sum(1 for cell in self._cells if cell)
+
+    def to_rows(self) -> List[List[int]]:
+        return [self._cells[row * self.columns:(row + 1) * self.columns].tolist() for row in range(self.rows)]
+
+    def cells_by_distance(self, column: int, row: int) -> Iterator[Tuple[int, int, int]]:
+        # rings of growing manhattan distance around the cell, ordered by row then column within a ring
+        for distance in range(self.columns + self.rows):
+            for ring_row in range(max(1, row - distance), min(self.rows, row + distance) + 1):
+                column_offset = distance - abs(ring_row - row)
+                for ring_column in sorted({column - column_offset, column + column_offset}):
+                    if 1 <= ring_column <= self.columns:
+                        yield ring_column, ring_row, distance
+
+    def nearest_free_cell(self, column: int, row: int) -> Optional[Tuple[int, int, int]]:
+        for candidate in self.cells_by_distance(column, row):
+            if self.count(candidate[0], candidate[1]) == 0:
+                return candidate
+        return None
+
+
+def load_occupancy_grid(db, cuvette: CuvetteLocation) -> OccupancyGrid:
+    # the projection only contains fields of the location index, so the query is covered by it
+    cells = [(part['location']['column'], part['location']['row']) for part in
+             db.parts.find(build_cuvette_query(cuvette), {'_id': 0, 'location.column': 1, 'location.row': 1})]
+    # stored locations aren't bounded, cells outside of 1..MAX_GRID_SIZE are left out of the grid
+    columns = cuvette.columns or min(max((column for column, _ in cells), default=1), MAX_GRID_SIZE)
+    rows = cuvette.rows or min(max((row for _, row in cells), default=1), MAX_GRID_SIZE)
+    columns, rows = max(columns, 1), max(rows, 1)
+
+    grid = OccupancyGrid(columns, rows)
+    for column, row in cells:
+        grid.add(column, row)
+    return grid
@@ -0,0 +1,101 @@
+import hashlib
+import json
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from fastapi import HTTPException
+
+from app import config
+from app.utils.lru_cache import TTLCache
+from app.utils.responses import PART_PROJECTION, FastJSONResponse
+
+
+class CachedPart(NamedTuple):
+    body: bytes
+    etag: str
+
+
+# read-through cache of encoded parts keyed by serial_number, invalidated by the part write handlers
+part_cache = TTLCache(config.PART_CACHE_SIZE, config.PART_CACHE_TTL_SECONDS)
+
+
+def encode_part(part: dict) -> CachedPart:
+    body = FastJSONResponse(part).body
+    return CachedPart(body, '"' + hashlib.sha1(body).hexdigest() + '"')
+
+
+def find_cached_part(db, serial_number: str) -> Optional[CachedPart]:
+    cached_part = part_cache.get(serial_number)
+    if cached_part is None:
+        part = db.parts.find_one({'serial_number': serial_number}, PART_PROJECTION)
+        if part is None:
+            return None
+        cached_part = encode_part(part)
+        part_cache.set(serial_number, cached_part)
+    return cached_part
+
+
+def find_cached_part_or_throw_not_found(db, serial_number: str) -> CachedPart:
+    cached_part = find_cached_part(db, serial_number)
+    if cached_part is None:
+        raise HTTPException(status_code=404, detail="Part not found")
+    return cached_part
+
+
+def split_cached_parts(serial_numbers: List[str]) -> Tuple[Dict[str, dict], List[str]]:
+    parts = {}
+    missing_serial_numbers = []
+    for serial_number in dict.fromkeys(serial_numbers):
+        cached_part = part_cache.get(serial_number)
+        if cached_part is None:
+            missing_serial_numbers.append(serial_number)
+        else:
+            parts[serial_number] = json.loads(cached_part.body)
+    return parts, missing_serial_numbers
+
+
+def find_missing_parts(db, missing_serial_numbers: List[str]):
+    # read in a single batch, the request is limited to a thousand serial numbers
+    return db.parts.find({'serial_number': {'$in': missing_serial_numbers}},
+                         PART_PROJECTION).batch_size(len(missing_serial_numbers))
+
+
+def cache_found_part(parts: Dict[str, dict], part: dict):
+    part_cache.set(part['serial_number'], encode_part(part))
+    parts[part['serial_number']] = part
+
+
+def find_cached_parts(db, serial_numbers: List[str]) -> Dict[str, dict]:
+    """Found parts by serial number, the ones missing from the cache are read with a single $in query and cached."""
+    parts, missing_serial_numbers = split_cached_parts(serial_numbers)
+    if missing_serial_numbers:
+        for part in find_missing_parts(db, missing_serial_numbers):
+            cache_found_part(parts, part)
+    return parts
+
+
+# awaitable variants for the async handlers, db is a Motor database
+
+async def find_cached_part_async(db, serial_number: str) -> Optional[CachedPart]:
+    cached_part = part_cache.get(serial_number)
+    if cached_part is None:
+        part = await db.parts.find_one({'serial_number': serial_number}, PART_PROJECTION)
+        if part is None:
+            return None
+        cached_part = encode_part(part)
+        part_cache.set(serial_number, cached_part)
+    return cached_part
+
+
+async def find_cached_part_or_throw_not_found_async(db, serial_number: str) -> CachedPart:
+    cached_part = await find_cached_part_async(db, serial_number)
+    if cached_part is None:
+        raise HTTPException(status_code=404, detail="Part not found")
+    return cached_part
+
+
+async def find_cached_parts_async(db, serial_numbers: List[str]) -> Dict[str, dict]:
+    parts, missing_serial_numbers = split_cached_parts(serial_numbers)
+    if missing_serial_numbers:
+        async for part in find_missing_parts(db, missing_serial_numbers):
+            cache_found_part(parts, part)
+    return parts
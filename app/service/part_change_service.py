@@ -0,0 +1,40 @@
+from typing import List, Optional, Tuple
+
+from app import config
+from app.service.autocomplete_service import autocomplete_index
+from app.service.analytics_service import apply_running_category_totals
+from app.service.change_log_service import record_part_changes, record_parts_of_category
+from app.service.part_cache import part_cache
+from app.service.part_events import part_event_broker
+from app.service.text_search_service import part_text_index
+
+PartChange = Tuple[Optional[dict], Optional[dict]]
+
+
+def notify_parts_changed(db, changes: List[PartChange]):
+    """Called by the part write handlers with (before, after) documents, None stands for a missing document."""
+    if not changes:
+        return
+    for before, after in changes:
+        for part in (before, after):
+            if part is not None:
+                part_cache.invalidate(part['serial_number'])
+    part_text_index.apply_changes(changes)
+    autocomplete_index.apply_part_changes(changes)
+    if config.VALUATION_RUNNING_TOTALS:
+        apply_running_category_totals(db, changes)
+    record_part_changes(db, changes)
+    if not part_event_broker.watching:
+        part_event_broker.publish_parts(changes)
+
+
+def notify_part_changed(db, before: Optional[dict], after: Optional[dict]):
+    notify_parts_changed(db, [(before, after)])
+
+
+def notify_category_renamed(db, category: str, new_name: str):
+    # parts of a renamed category are updated with a single update_many, so caches and indexes over them are reloaded
+    part_cache.clear()
+    part_text_index.invalidate()
+    record_parts_of_category(db, new_name, config.BULK_INSERT_CHUNK_SIZE)
+    part_event_broker.publish_category_renamed(category, new_name)
@@ -0,0 +1,152 @@
+import asyncio
+import logging
+from threading import Lock, Thread
+from typing import Dict, List, Optional, Set, Tuple
+
+from pymongo.errors import PyMongoError
+
+from app.utils.export import column_value
+
+logger = logging.getLogger(__name__)
+
+PartChange = Tuple[Optional[dict], Optional[dict]]
+
+
+def public_part(part: dict) -> dict:
+    # change stream documents carry _id, which isn't part of the API
+    return {field: value for field, value in part.items() if field != '_id'}
+
+
+class Subscription:
+    """Events of the parts matching a filter, waiting to be sent to one client.
+
+    Only the latest event of every part is kept, so a burst of updates to one part is sent as a single event
+    and a slow client holds at most max_pending events. When more parts change before the client catches up,
+    the pending events are replaced by a single overflow event telling it to reload.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, category: Optional[str] = None,
+                 location: Optional[Dict[str, object]] = None, serial_numbers: Optional[Set[str]] = None,
+                 max_pending: int = 1000):
+        self.category = category
+        # dotted location fields of the prefix, i.e. {'location.room': 'room_A'}
+        self.location = location or {}
+        self.serial_numbers = serial_numbers or set()
+        self.max_pending = max_pending
+        self._pending: Dict[tuple, dict] = {}
+        self._overflowed = False
+        self._lock = Lock()
+        self._loop = loop
+        self._ready = asyncio.Event()
+
+    def matches(self, part: Optional[dict]) -> bool:
+        if part is None:
+            return False
+        if self.category is not None and part.get('category') != self.category:
+            return False
+        if self.serial_numbers and part.get('serial_number') not in self.serial_numbers:
+            return False
+        return all(column_value(part, field) == value for field, value in self.location.items())
+
+    def push(self, key: tuple, event: dict):
+        """Called from any thread, the client is woken up in its event loop."""
+        with self._lock:
+            if self._overflowed:
+                return
+            # the latest event of a key replaces the earlier one and moves to the end
+            self._pending.pop(key, None)
+            self._pending[key] = event
+            if len(self._pending) > self.max_pending:
+                self._pending.clear()
+                self._overflowed = True
+        self._loop.call_soon_threadsafe(self._ready.set)
+
+    async def next_events(self, coalesce_seconds: float) -> List[dict]:
+        """Waits for an event, then for the coalescing window, and returns everything pending."""
+        while True:
+            await self._ready.wait()
+            await asyncio.sleep(coalesce_seconds)
+            with self._lock:
+                self._ready.clear()
+                events = list(self._pending.values())
+                self._pending.clear()
+                if self._overflowed:
+                    events.append({'event': 'overflow'})
+                    self._overflowed = False
+            if events:
+                return events
+
+
+class PartEventBroker:
+    """Fans part and category changes out to the subscriptions whose filter they match.
+
+    Changes come from the write handlers, or from a change stream of the parts collection once watch() is running,
+    which also sees the writes of other workers.
+    """
+
+    def __init__(self):
+        self.watching = False
+        self._subscriptions: List[Subscription] = []
+        self._lock = Lock()
+
+    def subscribe(self, subscription: Subscription) -> Subscription:
+        with self._lock:
+            self._subscriptions = self._subscriptions + [subscription]
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            self._subscriptions = [found for found in self._subscriptions if found is not subscription]
+
+    def subscriptions(self) -> int:
+        return len(self._subscriptions)
+
+    def publish_parts(self, changes: List[PartChange]):
+        # the list is replaced on every (un)subscribe, so it is iterated without the lock
+        subscriptions = self._subscriptions
+        if not subscriptions:
+            return
+        for before, after in changes:
+            part = after if after is not None else before
+            event = {'event': 'part_deleted' if after is None else 'part_changed',
+                     'serial_number': part['serial_number'],
+                     'part': public_part(after) if after is not None else None}
+            for subscription in subscriptions:
+                # a part moved out of the filter is sent once more, so the client can drop it
+                if subscription.matches(before) or subscription.matches(after):
+                    subscription.push(('part', part['serial_number']), event)
+
+    def publish_category_renamed(self, category: str, new_name: str):
+        event = {'event': 'category_renamed', 'category': category, 'new_name': new_name}
+        for subscription in self._subscriptions:
+            if subscription.category == category:
+                # the subscription follows the category under its new name
+                subscription.category = new_name
+                subscription.push(('category', category), event)
+
+    def watch(self, db) -> Thread:
+        """Publishes the changes of the parts collection read from a change stream instead of the write handlers.
+
+        Change streams require a replica set, the write handlers publish again when the stream stops. Deleted parts
+        are only published when pre-images are enabled on the collection (changeStreamPreAndPostImages).
+        """
+        def watch_changes():
+            try:
+                with db.parts.watch(full_document='updateLookup',
+                                    full_document_before_change='whenAvailable') as stream:
+                    self.watching = True
+                    for change in stream:
+                        after = change.get('fullDocument')
+                        before = change.get('fullDocumentBeforeChange')
+                        if after is not None or before is not None:
+                            self.publish_parts([(before, after)])
+            except PyMongoError as error:
+                logger.error("Part events change stream stopped: %s", error)
+            self.watching = False
+
+        watcher = Thread(target=watch_changes, name='part-events-watcher', daemon=True)
+        watcher.start()
+        return watcher
+
+
+part_event_broker = PartEventBroker()
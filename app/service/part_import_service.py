@@ -0,0 +1,151 @@
+import codecs
+import csv
+import uuid
+from datetime import datetime, timezone
+from itertools import islice
+from typing import BinaryIO, Dict, Iterator, List, Tuple
+
+from fastapi import HTTPException
+from pydantic import ValidationError
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+from app.models.part import Part, PartImportReport
+from app.service.part_change_service import notify_parts_changed
+from app.service.part_service import find_categories_accepting_parts, LOCATION_FIELDS
+from app.utils.responses import PART_PROJECTION
+
+PART_IMPORT_FIELDS = ['serial_number', 'name', 'description', 'category', 'quantity', 'price']
+IMPORT_ERROR_FIELDS = ['row', 'serial_number', 'status_code', 'detail']
+
+# (line of the row in the file, cells by column name)
+CsvRow = Tuple[int, Dict[str, str]]
+
+
+def import_column_name(header: str) -> str:
+    # location cells are accepted as 'room' or as 'location.room', as written by GET /export/parts
+    header = header.strip()
+    return header.removeprefix('location.') if header.removeprefix('location.') in LOCATION_FIELDS else header
+
+
+class UnreadableCsvError(Exception):
+    """The file can't be decoded or parsed after the given line, the rows before it were read."""
+
+    def __init__(self, line: int, detail: str):
+        super().__init__(detail)
+        self.line = line
+        self.detail = detail
+
+
+def read_csv_rows(file: BinaryIO) -> Iterator[CsvRow]:
+    """Rows of the uploaded file decoded and parsed one at a time, the file is never read whole."""
+    lines = codecs.getreader('utf-8-sig')(file)
+    reader = csv.reader(lines)
+    try:
+        header = [import_column_name(column) for column in next(reader, [])]
+    except (UnicodeDecodeError, csv.Error) as error:
+        raise HTTPException(status_code=400, detail=f"Unreadable CSV header: {error}")
+    missing_columns = [column for column in PART_IMPORT_FIELDS + sorted(LOCATION_FIELDS) if column not in header]
+    if missing_columns:
+        raise HTTPException(status_code=400, detail=f"Missing CSV columns: {', '.join(missing_columns)}")
+
+    try:
+        for cells in reader:
+            if any(cells):
+                yield reader.line_num, dict(zip(header, cells))
+    except (UnicodeDecodeError, csv.Error) as error:
+        # rows are decoded in blocks, so the error lies somewhere after the last parsed line
+        raise UnreadableCsvError(reader.line_num + 1, f"Unreadable CSV after line {reader.line_num}: {error}")
+
+
+def row_to_part_data(cells: Dict[str, str]) -> dict:
+    part_data = {field: cells.get(field) for field in PART_IMPORT_FIELDS}
+    part_data['location'] = {field: cells.get(field) for field in LOCATION_FIELDS}
+    return part_data
+
+
+def describe_validation_error(error: ValidationError) -> str:
+    return '; '.join(f"{'.'.join(str(location) for location in detail['loc'])}: {detail['msg']}"
+                     for detail in error.errors())
+
+
+def import_parts_chunk(db, rows: List[CsvRow], dry_run: bool, report: PartImportReport) -> List[dict]:
+    """Validates and upserts one chunk of rows, returning the errors of its rejected rows."""
+    errors = []
+    parsed_parts: List[Tuple[int, Part]] = []
+    for line, cells in rows:
+        try:
+            parsed_parts.append((line, Part(**row_to_part_data(cells))))
+        except ValidationError as error:
+            errors.append({'row': line, 'serial_number': cells.get('serial_number'), 'status_code': 422,
+                           'detail': describe_validation_error(error)})
+
+    # categories are resolved once for the whole chunk
+    categories = find_categories_accepting_parts(db, {part.category for _, part in parsed_parts})
+    valid_parts: Dict[str, Tuple[int, Part]] = {}
+    for line, part in parsed_parts:
+        if part.category not in categories:
+            errors.append({'row': line, 'serial_number': part.serial_number, 'status_code': 400,
+                           'detail': "Incorrect category, part can't be created"})
+            continue
+        report.valid += 1
+        # a later row of the same part replaces the earlier one, as it would in a later chunk
+        valid_parts.pop(part.serial_number, None)
+        valid_parts[part.serial_number] = (line, part)
+
+    report.rows += len(rows)
+    if dry_run or not valid_parts:
+        return errors
+
+    existing_parts = {part['serial_number']: part for part in
+                      db.parts.find({'serial_number': {'$in': list(valid_parts)}}, PART_PROJECTION)}
+    upserts = list(valid_parts.values())
+    failed_positions = set()
+    try:
+        db.parts.bulk_write([UpdateOne({'serial_number': part.serial_number}, {'$set': part.model_dump()}, upsert=True)
+                             for _, part in upserts], ordered=False)
+    except BulkWriteError as error:
+        for write_error in error.details['writeErrors']:
+            line, part = upserts[write_error['index']]
+            failed_positions.add(write_error['index'])
+            errors.append({'row': line, 'serial_number': part.serial_number, 'status_code': 400,
+                           'detail': write_error['errmsg']})
+
+    changes = [(existing_parts.get(part.serial_number), part.model_dump())
+               for position, (_, part) in enumerate(upserts) if position not in failed_positions]
+    report.inserted += sum(1 for before, _ in changes if before is None)
+    report.updated += sum(1 for before, _ in changes if before is not None)
+    notify_parts_changed(db, changes)
+    return errors
+
+
+def import_parts_from_csv(db, file: BinaryIO, chunk_size: int, dry_run: bool) -> PartImportReport:
+    """Imports the file chunk by chunk, so memory use depends on the chunk size and not on the file size.
+
+    Rejected rows are stored in the import_errors collection, they expire after a day. A file that becomes unreadable
+    part way is imported up to that point, and the rest of it is reported as one error.
+    """
+    report = PartImportReport(import_id=uuid.uuid4().hex, dry_run=dry_run)
+    created_at = datetime.now(timezone.utc)
+    rows = read_csv_rows(file)
+    while True:
+        chunk = []
+        unreadable_error = None
+        try:
+            chunk.extend(islice(rows, chunk_size))
+        except UnreadableCsvError as error:
+            unreadable_error = error
+        errors = import_parts_chunk(db, chunk, dry_run, report) if chunk else []
+        if unreadable_error is not None:
+            errors.append({'row': unreadable_error.line, 'serial_number': None, 'status_code': 400,
+                           'detail': unreadable_error.detail})
+        if errors:
+            report.failed += len(errors)
+            db.import_errors.insert_many([{**error, 'import_id': report.import_id, 'created_at': created_at}
+                                          for error in errors])
+        if unreadable_error is not None or len(chunk) < chunk_size:
+            return report
+
+
+def find_import_errors(db, import_id: str):
+    return db.import_errors.find({'import_id': import_id}, {'_id': 0, 'import_id': 0, 'created_at': 0}).sort('row', 1)
@@ -1,6 +1,12 @@
+from typing import Dict, Iterable, List, Optional, Set
+
 from fastapi import HTTPException
+from pymongo import ReturnDocument
+from pymongo.errors import BulkWriteError
 
 from app.models.part import Part
+from app.service.category_cache import category_cache
+from app.utils.responses import PART_PROJECTION
 
 
 def ensure_that_part_does_not_exist(db, serial_number: str):
@@ -10,8 +16,8 @@ def ensure_that_part_does_not_exist(db, serial_number: str):
 
 
 def handle_no_parent_category(db, category: str):
-    category = db.categories.find_one({'name': category})
-    if category is None or category['parent_name'] == '':
+    category = category_cache.get(db, category)
+    if category is None or category.parent_name == '':
         raise HTTPException(status_code=400, detail="Incorrect category, part can't be created")
 
 
@@ -20,3 +26,98 @@ def find_part_or_throw_not_found(db, serial_number: str) -> Part:
     if not existing_part:
         raise HTTPException(status_code=404, detail="Part not found")
     return existing_part
+
+
+def find_categories_accepting_parts(db, categories: Iterable[str]) -> Set[str]:
+    # parts can't be assigned to base categories, so only categories with a parent are returned
+    found_categories = category_cache.get_many(db, list(categories))
+    return {name for name, category in found_categories.items() if category is not None and category.parent_name != ''}
+
+
+def find_existing_serial_numbers(db, serial_numbers: Iterable[str]) -> Set[str]:
+    existing_parts = db.parts.find({'serial_number': {'$in': list(serial_numbers)}}, {'_id': 0, 'serial_number': 1})
+    return {part['serial_number'] for part in existing_parts}
+
+
+def insert_parts_in_chunks(db, parts: List[dict], chunk_size: int) -> Dict[int, dict]:
+    """Inserts parts with unordered insert_many and returns the write errors keyed by position in the parts list."""
+    errors = {}
+    for chunk_start in range(0, len(parts), chunk_size):
+        chunk = parts[chunk_start:chunk_start + chunk_size]
+        try:
+            db.parts.insert_many(chunk, ordered=False)
+        except BulkWriteError as error:
+            for write_error in error.details['writeErrors']:
+                errors[chunk_start + write_error['index']] = write_error
+    return errors
+
+
+LOCATION_FIELDS = {'room', 'bookcase', 'shelf', 'cuvette', 'column', 'row'}
+PART_FIELDS = {'serial_number', 'name', 'description', 'category', 'quantity', 'price', 'location'}
+
+
+def part_field_path(field: str) -> str:
+    return f'location.{field}' if field in LOCATION_FIELDS else field
+
+
+def add_range_condition(query: dict, field: str, minimum=None, maximum=None):
+    condition = {}
+    if minimum is not None:
+        condition['$gte'] = minimum
+    if maximum is not None:
+        condition['$lte'] = maximum
+    if not condition:
+        return
+    if field in query:
+        # an exact match on the same field is kept next to the range
+        condition['$eq'] = query[field]
+    query[field] = condition
+
+
+def build_part_projection(fields: Optional[str]) -> Optional[dict]:
+    if fields is None:
+        return None
+    projection = {'_id': 0}
+    for field in (field.strip() for field in fields.split(',') if field.strip()):
+        if field not in PART_FIELDS and field.removeprefix('location.') not in LOCATION_FIELDS:
+            raise HTTPException(status_code=400, detail=f"Unknown part field: {field}")
+        # location fields are accepted as 'room' or as 'location.room', they are stored in the location subdocument
+        projection[part_field_path(field) if field in LOCATION_FIELDS else field] = 1
+    if 'location' in projection:
+        # a projection of the whole location and one of its fields is a path collision for Mongo
+        projection = {field: value for field, value in projection.items() if not field.startswith('location.')}
+    return projection
+
+
+def project_part(part: dict, projection: Optional[dict]) -> dict:
+    """Applies a projection of build_part_projection to a part that was read whole, i.e. from the part cache."""
+    if projection is None:
+        return part
+    projected_part = {}
+    for field in projection:
+        if field == '_id':
+            continue
+        if field.startswith('location.'):
+            if 'location' not in projection:
+                location_field = field.removeprefix('location.')
+                projected_part.setdefault('location', {})[location_field] = part['location'][location_field]
+        else:
+            projected_part[field] = part[field]
+    return projected_part
+
+
+def apply_stock_movement(db, serial_number: str, delta: int) -> dict:
+    """Atomically adds delta to the quantity of the part, unless it would drop below zero.
+
+    Returns the updated part, the check and the update are a single conditional findAndModify.
+    """
+    query = {'serial_number': serial_number}
+    if delta < 0:
+        query['quantity'] = {'$gte': -delta}
+    updated_part = db.parts.find_one_and_update(query, {'$inc': {'quantity': delta}}, projection=PART_PROJECTION,
+                                                return_document=ReturnDocument.AFTER)
+    if updated_part is None:
+        # the extra round trip only tells apart the reasons of a rejected movement
+        find_part_or_throw_not_found(db, serial_number)
+        raise HTTPException(status_code=409, detail="Insufficient quantity of the part")
+    return updated_part
@@ -0,0 +1,130 @@
+from threading import Lock
+from typing import List, Optional
+
+from fastapi import HTTPException
+from pymongo.errors import OperationFailure
+
+from app import config
+from app.models.part import TextSearchPart
+from app.utils.inverted_index import InvertedIndex
+
+INDEX_NOT_FOUND_ERROR = 27
+TEXT_FIELD_WEIGHTS = {'name': 10, 'description': 1}
+FILTER_FIELDS = {
+    'category': 'category',
+    'room': 'location.room',
+    'bookcase': 'location.bookcase',
+    'shelf': 'location.shelf',
+    'cuvette': 'location.cuvette',
+}
+# part fields held by the in-process index
+INDEXED_FIELDS = ['serial_number', 'name', 'description', 'category', 'location']
+
+
+class PartTextIndex:
+    """In-process fallback for the Mongo text index, used with TEXT_SEARCH_BACKEND=memory (also for fuzzy search) and
+    where the text index is missing.
+
+    Every write to an indexed field counts up the generation, and a build whose scan overlapped one scans again.
+    """
+
+    def __init__(self):
+        self._index: Optional[InvertedIndex] = None
+        self._generation = 0
+        self._lock = Lock()
+        self._build_lock = Lock()
+
+    def get(self, db) -> InvertedIndex:
+        index = self._index
+        if index is not None:
+            return index
+        with self._build_lock:
+            while True:
+                with self._lock:
+                    if self._index is not None:
+                        return self._index
+                    generation = self._generation
+                index = InvertedIndex(TEXT_FIELD_WEIGHTS)
+                projection = {'_id': 0, **dict.fromkeys(INDEXED_FIELDS, 1)}
+                for part in db.parts.find({}, projection):
+                    self.add_part(index, part)
+                with self._lock:
+                    if self._generation == generation:
+                        self._index = index
+                        return index
+
+    @staticmethod
+    def add_part(index: InvertedIndex, part: dict):
+        location = part.get('location', {})
+        stored = {'category': part['category'], 'room': location.get('room'), 'bookcase': location.get('bookcase'),
+                  'shelf': location.get('shelf'), 'cuvette': location.get('cuvette')}
+        index.add(part['serial_number'], part, stored)
+
+    def apply_changes(self, changes: list):
+        # stock movements and price updates don't change what is indexed
+        changed = [(before, after) for before, after in changes if before is None or after is None or
+                   any(before.get(field) != after.get(field) for field in INDEXED_FIELDS)]
+        if not changed:
+            return
+        with self._lock:
+            self._generation += 1
+            index = self._index
+            if index is None:
+                return
+            for before, after in changed:
+                if before is not None:
+                    index.remove(before['serial_number'])
+                if after is not None:
+                    self.add_part(index, after)
+
+    def invalidate(self):
+        with self._lock:
+            self._index = None
+            self._generation += 1
+
+
+part_text_index = PartTextIndex()
+
+
+def build_text_search_filters(searched_parameters: TextSearchPart) -> dict:
+    return {field: getattr(searched_parameters, parameter) for parameter, field in FILTER_FIELDS.items()
+            if getattr(searched_parameters, parameter) is not None}
+
+
+def search_parts_with_text_index(db, searched_parameters: TextSearchPart) -> List[dict]:
+    query = {'$text': {'$search': searched_parameters.q}, **build_text_search_filters(searched_parameters)}
+    found_parts = (db.parts.find(query, {'_id': 0, 'score': {'$meta': 'textScore'}})
+                   .sort([('score', {'$meta': 'textScore'})])
+                   .skip(searched_parameters.skip)
+                   .limit(searched_parameters.limit)
+                   .max_time_ms(config.TEXT_SEARCH_MAX_TIME_MS))
+    return list(found_parts)
+
+
+def search_parts_with_memory_index(db, searched_parameters: TextSearchPart) -> List[dict]:
+    filters = {parameter: getattr(searched_parameters, parameter) for parameter in FILTER_FIELDS
+               if getattr(searched_parameters, parameter) is not None}
+    ranked = part_text_index.get(db).search(
+        searched_parameters.q, fuzzy=searched_parameters.fuzzy,
+        predicate=lambda stored: all(stored[parameter] == value for parameter, value in filters.items()),
+        skip=searched_parameters.skip, limit=searched_parameters.limit)
+
+    scores = dict(ranked)
+    found_parts = {part['serial_number']: part
+                   for part in db.parts.find({'serial_number': {'$in': list(scores)}}, {'_id': 0})}
+    return [{**found_parts[serial_number], 'score': score} for serial_number, score in ranked
+            if serial_number in found_parts]
+
+
+def search_parts_by_text(db, searched_parameters: TextSearchPart) -> List[dict]:
+    # the in-process index holds every part, it is only built at startup when configured and never inside a request
+    if searched_parameters.fuzzy and config.TEXT_SEARCH_BACKEND != 'memory':
+        raise HTTPException(status_code=400, detail="Fuzzy search requires TEXT_SEARCH_BACKEND=memory")
+    if config.TEXT_SEARCH_BACKEND == 'memory':
+        return search_parts_with_memory_index(db, searched_parameters)
+    try:
+        return search_parts_with_text_index(db, searched_parameters)
+    except OperationFailure as error:
+        if error.code != INDEX_NOT_FOUND_ERROR:
+            raise
+        return search_parts_with_memory_index(db, searched_parameters)
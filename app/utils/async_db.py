@@ -0,0 +1,37 @@
+from typing import List
+
+from starlette.routing import BaseRoute, Router
+
+from app import config
+
+try:
+    from motor.motor_asyncio import AsyncIOMotorClient
+except ImportError:  # optional, only needed for DB_ASYNC
+    AsyncIOMotorClient = None
+
+
+def create_async_client(event_listeners: list):
+    """Motor client with the same pool and timeout settings as the sync MongoClient."""
+    if AsyncIOMotorClient is None:
+        raise RuntimeError("DB_ASYNC requires the motor package")
+    return AsyncIOMotorClient(config.DB_URI, event_listeners=event_listeners, **config.mongo_client_options())
+
+
+def route_key(route: BaseRoute) -> tuple:
+    return getattr(route, 'path', None), frozenset(getattr(route, 'methods', None) or ())
+
+
+def replace_routes(router: Router, replacements: List[BaseRoute]) -> List[BaseRoute]:
+    """Puts every replacement in place of the route with the same path and methods, and returns the replaced routes.
+
+    The routes keep their position, so i.e. GET /parts/changes is still matched before GET /parts/{serial_number}.
+    Passing the returned routes back restores the original ones.
+    """
+    replacements_by_key = {route_key(route): route for route in replacements}
+    replaced = []
+    for position, route in enumerate(router.routes):
+        replacement = replacements_by_key.get(route_key(route))
+        if replacement is not None:
+            replaced.append(route)
+            router.routes[position] = replacement
+    return replaced
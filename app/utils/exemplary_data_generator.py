@@ -1,3 +1,53 @@
+"""Exemplary parts and categories: fixed test parts, and a seeded generator of synthetic warehouses.
+
+The generator is deterministic for a given seed and streams documents, so millions of parts are written in
+bounded memory. Run it against DB_URI/DB_NAME with:
+
+    python -m app.utils.exemplary_data_generator --parts 1000000 --depth 3 --fan-out 8 --seed 1 --drop
+"""
+import argparse
+import math
+import random
+from dataclasses import dataclass
+from itertools import accumulate, islice
+from typing import Iterable, Iterator, List
+
+from pymongo import MongoClient
+
+from app import config
+from app.service.analytics_service import rebuild_running_category_totals
+from app.utils.indexes import ensure_indexes
+
+ROOT_CATEGORIES = ['Electronics', 'Mechanics', 'Pneumatics', 'Fasteners', 'Tools', 'Optics', 'Cables', 'Sensors']
+
+# component kind -> (name variants, median price)
+COMPONENTS = {
+    'Resistor': (['0.25W', '1W', 'SMD 0603', 'SMD 1206', 'precision'], 0.05),
+    'Capacitor': (['ceramic', 'electrolytic', 'tantalum', 'film', 'SMD 0805'], 0.2),
+    'Transistor': (['NPN', 'PNP', 'MOSFET N', 'MOSFET P', 'IGBT'], 0.8),
+    'Diode': (['rectifier', 'Zener', 'Schottky', 'LED red', 'LED green'], 0.1),
+    'Relay': (['5V', '12V', '24V', 'solid state', 'reed'], 4.5),
+    'Bearing': (['608ZZ', '6001', '6204', 'needle', 'thrust'], 3.0),
+    'Screw': (['M3x10', 'M4x16', 'M5x20', 'M6x30', 'wood 4x40'], 0.03),
+    'Valve': (['solenoid', 'check', 'ball', 'needle', 'pressure relief'], 25.0),
+    'Sensor': (['temperature', 'pressure', 'proximity', 'humidity', 'hall effect'], 12.0),
+    'Motor': (['stepper NEMA17', 'DC 12V', 'servo', 'brushless', 'gear'], 35.0),
+    'Cable': (['USB-C', 'RJ45 cat6', 'power 3x1.5', 'coaxial', 'ribbon'], 6.0),
+    'Lens': (['convex', 'concave', 'cylindrical', 'aspheric', 'fresnel'], 18.0),
+}
+COMPONENT_KINDS = list(COMPONENTS)
+
+ROOMS = ['A', 'B', 'C', 'D', 'E']
+# most stock sits in the main rooms
+ROOM_WEIGHTS = list(accumulate([40, 25, 15, 12, 8]))
+BOOKCASES = 20
+SHELVES = 8
+CUVETTES = 12
+CUVETTE_COLUMNS = 10
+CUVETTE_ROWS = 10
+OUT_OF_STOCK_RATE = 0.05
+
+
 def generate_part_data(serial_number: str, category: str):
     return {
         "serial_number": serial_number,
@@ -15,21 +65,140 @@ def generate_part_data(serial_number: str, category: str):
             "row": 13}}
 
 
+@dataclass
+class WarehouseSpec:
+    parts: int
+    # levels of categories below the base ones, parts are stored in every category but the base ones
+    depth: int = 2
+    fan_out: int = 4
+    roots: int = len(ROOT_CATEGORIES)
+    seed: int = 0
+
+
+def serial_number(number: int) -> str:
+    return f'SN{number:09d}'
+
+
+def generate_categories(spec: WarehouseSpec) -> Iterator[dict]:
+    """Category documents breadth first, so every parent is written before its children."""
+    level = []
+    for root_number in range(spec.roots):
+        name = ROOT_CATEGORIES[root_number % len(ROOT_CATEGORIES)]
+        if root_number >= len(ROOT_CATEGORIES):
+            # '#' keeps i.e. 'Electronics #2' apart from 'Electronics 2', the second child of 'Electronics'
+            name = f'{name} #{root_number // len(ROOT_CATEGORIES) + 1}'
+        category = {'name': name, 'parent_name': '', 'ancestors': []}
+        level.append(category)
+        yield category
+
+    for _ in range(spec.depth):
+        next_level = []
+        for parent in level:
+            for number in range(1, spec.fan_out + 1):
+                # i.e. 'Electronics 2' below 'Electronics', then 'Electronics 2.1' below it
+                separator = '.' if parent['parent_name'] else ' '
+                category = {'name': f"{parent['name']}{separator}{number}",
+                            'parent_name': parent['name'],
+                            'ancestors': parent['ancestors'] + [parent['name']]}
+                next_level.append(category)
+                yield category
+        level = next_level
+
+
+def generate_parts(spec: WarehouseSpec, part_categories: List[str]) -> Iterator[dict]:
+    rng = random.Random(spec.seed)
+    # a few categories hold most of the parts, as in a real warehouse (Zipf distribution)
+    category_weights = list(accumulate(1 / rank for rank in range(1, len(part_categories) + 1)))
+    shuffled_categories = list(part_categories)
+    rng.shuffle(shuffled_categories)
+
+    for number in range(spec.parts):
+        kind = rng.choice(COMPONENT_KINDS)
+        variants, median_price = COMPONENTS[kind]
+        variant = rng.choice(variants)
+        quantity = 0 if rng.random() < OUT_OF_STOCK_RATE else min(int(rng.paretovariate(1.2) * 5), 100000)
+        yield {
+            'serial_number': serial_number(number),
+            'name': f'{kind} {variant}',
+            'description': f'{variant} {kind.lower()}, batch {rng.randint(1, 500)}',
+            'category': rng.choices(shuffled_categories, cum_weights=category_weights)[0],
+            'quantity': quantity,
+            'price': round(rng.lognormvariate(math.log(median_price), 0.6), 2),
+            'location': {
+                'room': rng.choices(ROOMS, cum_weights=ROOM_WEIGHTS)[0],
+                'bookcase': str(rng.randint(1, BOOKCASES)),
+                'shelf': str(rng.randint(1, SHELVES)),
+                'cuvette': str(rng.randint(1, CUVETTES)),
+                'column': rng.randint(1, CUVETTE_COLUMNS),
+                'row': rng.randint(1, CUVETTE_ROWS)}}
+
+
+def insert_in_batches(collection, documents: Iterable[dict], batch_size: int) -> int:
+    # only one batch of documents is held in memory at a time
+    documents = iter(documents)
+    inserted = 0
+    while batch := list(islice(documents, batch_size)):
+        collection.insert_many(batch, ordered=False)
+        inserted += len(batch)
+    return inserted
+
+
+def seed_warehouse(db, spec: WarehouseSpec, batch_size: int = config.BULK_INSERT_CHUNK_SIZE) -> dict:
+    part_categories = []
+
+    def categories():
+        for category in generate_categories(spec):
+            if category['parent_name'] != '':
+                part_categories.append(category['name'])
+            yield category
+
+    categories_count = insert_in_batches(db.categories, categories(), batch_size)
+    if not part_categories:
+        return {'categories': categories_count, 'parts': 0}
+    parts_count = insert_in_batches(db.parts, generate_parts(spec, part_categories), batch_size)
+    return {'categories': categories_count, 'parts': parts_count}
+
+
 def init_db_with_exemplary_data_if_not_exists(db):
-    demo_config = list(db.demo_config.find())
-    if len(demo_config) > 0 and demo_config[0]['has_inserted_demo_examples']:
+    demo_config = db.demo_config.find_one()
+    if demo_config is not None and demo_config['has_inserted_demo_examples']:
         return
 
-    db.categories.insert_one({'name': 'DemoMainCategory', 'parent_name': ''})
-    db.categories.insert_one({'name': 'DemoSubCategoryA', 'parent_name': 'DemoMainCategory'})
-    db.categories.insert_one({'name': 'DemoSubCategoryB', 'parent_name': 'DemoMainCategory'})
+    # a database filled before the flag existed is left as it is
+    if config.SEED_PARTS > 0 and not db.categories.estimated_document_count():
+        seed_warehouse(db, WarehouseSpec(parts=config.SEED_PARTS, depth=config.SEED_CATEGORY_DEPTH,
+                                         fan_out=config.SEED_CATEGORY_FAN_OUT, seed=config.SEED_RANDOM_SEED))
+
+    db.demo_config.insert_one({'has_inserted_demo_examples': True})
 
-    db.parts.insert_one(generate_part_data('sn1', 'DemoSubCategoryA'))
-    db.parts.insert_one(generate_part_data('sn2', 'DemoSubCategoryA'))
-    db.parts.insert_one(generate_part_data('sn3', 'DemoSubCategoryA'))
 
-    db.parts.insert_one(generate_part_data('sn4', 'DemoSubCategoryB'))
-    db.parts.insert_one(generate_part_data('sn5', 'DemoSubCategoryB'))
-    db.parts.insert_one(generate_part_data('sn6', 'DemoSubCategoryB'))
+def main():
+    parser = argparse.ArgumentParser(description="Seed DB_URI/DB_NAME with a synthetic warehouse.")
+    parser.add_argument('--parts', type=int, default=100000)
+    parser.add_argument('--depth', type=int, default=2)
+    parser.add_argument('--fan-out', type=int, default=4)
+    parser.add_argument('--roots', type=int, default=len(ROOT_CATEGORIES))
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--batch-size', type=int, default=10000)
+    parser.add_argument('--drop', action='store_true', help='drop the existing parts and categories first')
+    args = parser.parse_args()
 
-    db.demo_config.insert_one({'has_inserted_demo_examples': True})
+    client = MongoClient(config.DB_URI, **config.mongo_client_options())
+    db = client[config.DB_NAME]
+    if args.drop:
+        for collection_name in ('parts', 'categories', 'category_totals'):
+            db.drop_collection(collection_name)
+    elif db.parts.estimated_document_count() or db.categories.estimated_document_count():
+        parser.error(f'{config.DB_NAME} already has parts or categories, pass --drop to replace them')
+
+    ensure_indexes(db)
+    spec = WarehouseSpec(parts=args.parts, depth=args.depth, fan_out=args.fan_out, roots=args.roots, seed=args.seed)
+    print(f"inserted {seed_warehouse(db, spec, args.batch_size)} into {config.DB_NAME}")
+    if config.VALUATION_RUNNING_TOTALS:
+        rebuild_running_category_totals(db)
+    db.demo_config.update_one({}, {'$set': {'has_inserted_demo_examples': True}}, upsert=True)
+    client.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,162 @@
+import csv
+import io
+import zlib
+from typing import Iterable, Iterator, List, Tuple
+
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+
+from app.utils.indexes import LOCATION_FIELDS
+from app.utils.streaming import iterate_ndjson
+
+try:
+    import zstandard
+except ImportError:  # optional, only needed for compression=zstd
+    zstandard = None
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # optional, only needed for format=parquet
+    pyarrow = None
+
+# documents fetched from the server per round trip, only one batch is held in memory
+EXPORT_BATCH_SIZE = 1000
+# bytes of encoded rows gathered before they are compressed and sent
+EXPORT_CHUNK_SIZE = 64 * 1024
+PARQUET_ROW_GROUP_SIZE = 10000
+
+# exported columns with their types, nested fields are flattened into dotted columns
+PART_COLUMNS: List[Tuple[str, str]] = [('serial_number', 'string'), ('name', 'string'), ('description', 'string'),
+                                       ('category', 'string'), ('quantity', 'int'), ('price', 'float')] + [
+    (field, 'int' if field in ('location.column', 'location.row') else 'string') for field in LOCATION_FIELDS]
+CATEGORY_COLUMNS: List[Tuple[str, str]] = [('name', 'string'), ('parent_name', 'string')]
+
+MEDIA_TYPES = {'csv': 'text/csv', 'ndjson': 'application/x-ndjson', 'parquet': 'application/vnd.apache.parquet'}
+COMPRESSION_MEDIA_TYPES = {'gzip': 'application/gzip', 'zstd': 'application/zstd'}
+COMPRESSION_EXTENSIONS = {'none': '', 'gzip': '.gz', 'zstd': '.zst'}
+
+
+def column_value(document: dict, column: str):
+    value = document
+    for key in column.split('.'):
+        value = value.get(key) if isinstance(value, dict) else None
+    return value
+
+
+def csv_chunks(documents: Iterable[dict], columns: List[Tuple[str, str]]) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow([column for column, _ in columns])
+    for document in documents:
+        writer.writerow([column_value(document, column) for column, _ in columns])
+        if buffer.tell() >= EXPORT_CHUNK_SIZE:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode()
+
+
+def ndjson_chunks(documents: Iterable[dict]) -> Iterator[bytes]:
+    lines = []
+    size = 0
+    for line in iterate_ndjson(documents):
+        lines.append(line)
+        size += len(line)
+        if size >= EXPORT_CHUNK_SIZE:
+            yield b''.join(lines)
+            lines, size = [], 0
+    yield b''.join(lines)
+
+
+class DrainableSink:
+    """Write-only file collecting what the parquet writer wrote since it was last drained."""
+
+    def __init__(self):
+        self.closed = False
+        self._chunks: List[bytes] = []
+        self._position = 0
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def parquet_chunks(documents: Iterable[dict], columns: List[Tuple[str, str]], compression: str) -> Iterator[bytes]:
+    types = {'string': pyarrow.string(), 'int': pyarrow.int64(), 'float': pyarrow.float64()}
+    schema = pyarrow.schema([(column, types[column_type]) for column, column_type in columns])
+    sink = DrainableSink()
+    # parquet compresses every column chunk itself, the file is not compressed again
+    writer = pyarrow.parquet.ParquetWriter(sink, schema, compression=compression)
+
+    def write_row_group(rows: List[dict]):
+        writer.write_table(pyarrow.Table.from_pydict(
+            {column: [column_value(row, column) for row in rows] for column, _ in columns}, schema=schema))
+
+    rows = []
+    for document in documents:
+        rows.append(document)
+        if len(rows) == PARQUET_ROW_GROUP_SIZE:
+            write_row_group(rows)
+            rows = []
+            yield sink.drain()
+    if rows:
+        write_row_group(rows)
+    writer.close()
+    yield sink.drain()
+
+
+def compress(chunks: Iterable[bytes], compression: str) -> Iterator[bytes]:
+    if compression == 'none':
+        yield from chunks
+        return
+
+    # wbits=31 writes the gzip header and trailer
+    compressor = zlib.compressobj(wbits=31) if compression == 'gzip' else zstandard.ZstdCompressor().compressobj()
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def ensure_export_supported(export_format: str, compression: str):
+    if export_format == 'parquet' and pyarrow is None:
+        raise HTTPException(status_code=400, detail="Parquet export requires the pyarrow package")
+    if export_format != 'parquet' and compression == 'zstd' and zstandard is None:
+        raise HTTPException(status_code=400, detail="zstd compression requires the zstandard package")
+
+
+def export_response(cursor, columns: List[Tuple[str, str]], export_format: str, compression: str,
+                    name: str) -> StreamingResponse:
+    """Streams the documents of the cursor, encoded and compressed batch by batch."""
+    ensure_export_supported(export_format, compression)
+    documents = cursor.batch_size(EXPORT_BATCH_SIZE)
+
+    if export_format == 'parquet':
+        body = parquet_chunks(documents, columns, compression)
+        media_type, filename = MEDIA_TYPES['parquet'], f'{name}.parquet'
+    else:
+        chunks = csv_chunks(documents, columns) if export_format == 'csv' else ndjson_chunks(documents)
+        body = compress(chunks, compression)
+        media_type = COMPRESSION_MEDIA_TYPES.get(compression, MEDIA_TYPES[export_format])
+        filename = f'{name}.{export_format}{COMPRESSION_EXTENSIONS[compression]}'
+
+    # the sync generators are iterated in the threadpool, so the blocking cursor doesn't stall the event loop
+    return StreamingResponse(body, media_type=media_type,
+                             headers={'Content-Disposition': f'attachment; filename="{filename}"'})
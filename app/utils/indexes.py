@@ -0,0 +1,101 @@
+from collections import Counter
+from threading import Lock
+from typing import Dict, List, Tuple
+
+from pymongo import ASCENDING, TEXT, IndexModel
+
+LOCATION_FIELDS = ['location.room', 'location.bookcase', 'location.shelf', 'location.cuvette',
+                   'location.column', 'location.row']
+
+# declarative catalog of indexes, keyed by collection name
+INDEX_CATALOG: Dict[str, List[IndexModel]] = {
+    'parts': [
+        IndexModel([('serial_number', ASCENDING)], name='serial_number_unique', unique=True),
+        IndexModel([('category', ASCENDING)], name='category'),
+        IndexModel([(field, ASCENDING) for field in LOCATION_FIELDS], name='location'),
+        IndexModel([('name', TEXT), ('description', TEXT)], name='name_description_text',
+                   weights={'name': 10, 'description': 1}),
+    ],
+    'categories': [
+        IndexModel([('name', ASCENDING)], name='name_unique', unique=True),
+        IndexModel([('parent_name', ASCENDING)], name='parent_name'),
+        IndexModel([('ancestors', ASCENDING)], name='ancestors'),
+    ],
+    # rejected rows of CSV imports, kept for a day
+    'import_errors': [
+        IndexModel([('import_id', ASCENDING), ('row', ASCENDING)], name='import_id_row'),
+        IndexModel([('created_at', ASCENDING)], name='created_at_ttl', expireAfterSeconds=24 * 60 * 60),
+    ],
+    # change log of part and category writes, kept for a week
+    'changes': [
+        IndexModel([('seq', ASCENDING)], name='seq_unique', unique=True),
+        IndexModel([('recorded_at', ASCENDING)], name='recorded_at_ttl', expireAfterSeconds=7 * 24 * 60 * 60),
+    ],
+    'category_totals': [
+        IndexModel([('category', ASCENDING)], name='category_unique', unique=True),
+    ],
+}
+
+
+def ensure_indexes(db):
+    # create_indexes is a no-op for indexes that already exist with the same specification
+    for collection_name, indexes in INDEX_CATALOG.items():
+        db[collection_name].create_indexes(indexes)
+
+
+def index_key_fields(index: IndexModel) -> List[str]:
+    # text indexes can't serve equality matches, so they have no usable key fields
+    if any(direction == TEXT for direction in index.document['key'].values()):
+        return []
+    return [field for field, _ in index.document['key'].items()]
+
+
+class IndexAdvisor:
+    """Records the shapes of issued queries and reports those not served by an index from the catalog."""
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self._shapes: Counter = Counter()
+        self._lock = Lock()
+
+    def record(self, collection_name: str, query: dict):
+        if not self.enabled:
+            return
+        shape = (collection_name, tuple(sorted(query.keys())))
+        with self._lock:
+            self._shapes[shape] += 1
+
+    def reset(self):
+        with self._lock:
+            self._shapes.clear()
+
+    def report(self) -> List[dict]:
+        with self._lock:
+            shapes: List[Tuple[Tuple[str, tuple], int]] = self._shapes.most_common()
+        return [self._describe_shape(collection_name, fields, count) for (collection_name, fields), count in shapes]
+
+    @staticmethod
+    def _describe_shape(collection_name: str, fields: tuple, count: int) -> dict:
+        best_index = None
+        best_prefix: List[str] = []
+        for index in INDEX_CATALOG.get(collection_name, []):
+            # only the leading fields of an index that are all constrained by the query can be used for seeking
+            prefix = []
+            for field in index_key_fields(index):
+                if field not in fields:
+                    break
+                prefix.append(field)
+            if len(prefix) > len(best_prefix):
+                best_index, best_prefix = index.document['name'], prefix
+
+        return {
+            'collection': collection_name,
+            'fields': list(fields),
+            'count': count,
+            'index': best_index,
+            'unindexed_fields': [field for field in fields if field not in best_prefix],
+            'covered': len(fields) > 0 and len(best_prefix) == len(fields),
+        }
+
+
+index_advisor = IndexAdvisor()
@@ -0,0 +1,94 @@
+import heapq
+import math
+import re
+from collections import defaultdict
+from threading import RLock
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+TOKEN_PATTERN = re.compile(r'\w+')
+FUZZY_MATCH_WEIGHT = 0.5
+
+
+def tokenize(text: str) -> List[str]:
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+def within_one_edit(first: str, second: str) -> bool:
+    # bounded Levenshtein distance check, linear in the length of the tokens
+    if abs(len(first) - len(second)) > 1:
+        return False
+    if len(first) > len(second):
+        first, second = second, first
+    position = 0
+    while position < len(first) and first[position] == second[position]:
+        position += 1
+    if len(first) == len(second):
+        return first[position + 1:] == second[position + 1:]
+    return first[position:] == second[position + 1:]
+
+
+class InvertedIndex:
+    """Token -> document postings over weighted text fields, ranked with tf-idf.
+
+    Fuzzy search also matches tokens within one edit of a query token, with a lower weight.
+    """
+
+    def __init__(self, field_weights: Dict[str, float]):
+        self.field_weights = field_weights
+        self._postings: Dict[str, Dict[str, float]] = defaultdict(dict)
+        self._tokens_by_key: Dict[str, Set[str]] = {}
+        # tokens by their length, fuzzy matches are only looked for among tokens at most one character longer or shorter
+        self._tokens_by_length: Dict[int, Set[str]] = defaultdict(set)
+        self._stored: Dict[str, dict] = {}
+        self._lock = RLock()
+
+    def __len__(self):
+        return len(self._stored)
+
+    def add(self, key: str, document: dict, stored: Optional[dict] = None):
+        with self._lock:
+            self.remove(key)
+            term_weights: Dict[str, float] = defaultdict(float)
+            for field, weight in self.field_weights.items():
+                for token in tokenize(str(document.get(field, ''))):
+                    term_weights[token] += weight
+            for token, term_weight in term_weights.items():
+                self._postings[token][key] = term_weight
+                self._tokens_by_length[len(token)].add(token)
+            self._tokens_by_key[key] = set(term_weights)
+            self._stored[key] = stored or {}
+
+    def remove(self, key: str):
+        with self._lock:
+            for token in self._tokens_by_key.pop(key, ()):
+                postings = self._postings[token]
+                postings.pop(key, None)
+                if not postings:
+                    del self._postings[token]
+                    self._tokens_by_length[len(token)].discard(token)
+            self._stored.pop(key, None)
+
+    def _matching_tokens(self, query_token: str, fuzzy: bool) -> List[Tuple[str, float]]:
+        matches = [(query_token, 1.0)] if query_token in self._postings else []
+        if fuzzy:
+            candidates = [token for length in (len(query_token) - 1, len(query_token), len(query_token) + 1)
+                          for token in self._tokens_by_length.get(length, ())]
+            matches += [(token, FUZZY_MATCH_WEIGHT) for token in candidates
+                        if token != query_token and within_one_edit(query_token, token)]
+        return matches
+
+    def search(self, query: str, fuzzy: bool = False, predicate: Optional[Callable[[dict], bool]] = None,
+               skip: int = 0, limit: int = 20) -> List[Tuple[str, float]]:
+        with self._lock:
+            scores: Dict[str, float] = defaultdict(float)
+            documents_count = len(self._stored)
+            for query_token in set(tokenize(query)):
+                for token, match_weight in self._matching_tokens(query_token, fuzzy):
+                    postings = self._postings[token]
+                    inverse_document_frequency = math.log(1 + documents_count / len(postings))
+                    for key, term_weight in postings.items():
+                        scores[key] += match_weight * term_weight * inverse_document_frequency
+
+            if predicate is not None:
+                scores = {key: score for key, score in scores.items() if predicate(self._stored[key])}
+            return heapq.nlargest(skip + limit, scores.items(), key=lambda item: (item[1], item[0]))[skip:]
@@ -0,0 +1,218 @@
+from bisect import bisect_left
+from contextvars import ContextVar
+from threading import Lock
+from time import perf_counter
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from pymongo import monitoring
+
+PROMETHEUS_MEDIA_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+OPERATIONS_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 500)
+
+# Mongo operations issued while serving the current request, None outside of an instrumented request.
+# Sync handlers run in a threadpool with a copy of the context, so they increment the same counter.
+request_operations: ContextVar[Optional[List[int]]] = ContextVar('request_operations', default=None)
+
+
+def format_labels(label_names: Sequence[str], labels: Tuple[str, ...], extra: str = '') -> str:
+    pairs = [f'{name}="{escape_label_value(value)}"' for name, value in zip(label_names, labels)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def escape_label_value(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str]):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = label_names
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = Lock()
+
+    def inc(self, labels: Tuple[str, ...], amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, labels: Tuple[str, ...]) -> float:
+        return self._values.get(labels, 0)
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+    def render(self) -> Iterator[str]:
+        yield f'# HELP {self.name} {self.documentation}'
+        yield f'# TYPE {self.name} counter'
+        with self._lock:
+            values = sorted(self._values.items())
+        for labels, value in values:
+            yield f'{self.name}{format_labels(self.label_names, labels)} {value}'
+
+
+class Histogram:
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str], buckets: Sequence[float]):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = label_names
+        self.buckets = tuple(buckets)
+        # labels -> [count per bucket (the last one is +Inf), sum, count]
+        self._series: Dict[Tuple[str, ...], list] = {}
+        self._lock = Lock()
+
+    def observe(self, labels: Tuple[str, ...], value: float):
+        bucket = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][bucket] += 1
+            series[1] += value
+            series[2] += 1
+
+    def count(self, labels: Tuple[str, ...]) -> int:
+        series = self._series.get(labels)
+        return series[2] if series else 0
+
+    def total(self, labels: Tuple[str, ...]) -> float:
+        series = self._series.get(labels)
+        return series[1] if series else 0.0
+
+    def clear(self):
+        with self._lock:
+            self._series.clear()
+
+    def render(self) -> Iterator[str]:
+        yield f'# HELP {self.name} {self.documentation}'
+        yield f'# TYPE {self.name} histogram'
+        with self._lock:
+            series = sorted((labels, [list(bucket_counts), total, count])
+                            for labels, (bucket_counts, total, count) in self._series.items())
+        for labels, (bucket_counts, total, count) in series:
+            cumulative = 0
+            for upper_bound, bucket_count in zip(self.buckets + ('+Inf',), bucket_counts):
+                cumulative += bucket_count
+                bucket_labels = format_labels(self.label_names, labels, f'le="{upper_bound}"')
+                yield f'{self.name}_bucket{bucket_labels} {cumulative}'
+            yield f'{self.name}_sum{format_labels(self.label_names, labels)} {total}'
+            yield f'{self.name}_count{format_labels(self.label_names, labels)} {count}'
+
+
+class Metrics:
+    """Request and Mongo command metrics, rendered in the Prometheus text format.
+
+    Nothing is recorded while disabled, the middleware then only checks the flag.
+    """
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self.request_duration = Histogram('http_request_duration_seconds', 'Latency of HTTP requests by route.',
+                                          ('method', 'route', 'status'), LATENCY_BUCKETS)
+        self.request_operations = Histogram('http_request_mongo_operations', 'Mongo operations issued per request.',
+                                            ('method', 'route'), OPERATIONS_BUCKETS)
+        self.command_duration = Histogram('mongo_command_duration_seconds', 'Latency of Mongo commands.',
+                                          ('collection', 'command'), LATENCY_BUCKETS)
+        self.command_failures = Counter('mongo_command_failures_total', 'Failed Mongo commands.',
+                                        ('collection', 'command'))
+
+    def all(self) -> list:
+        return [self.request_duration, self.request_operations, self.command_duration, self.command_failures]
+
+    def reset(self):
+        for metric in self.all():
+            metric.clear()
+
+    def render(self) -> str:
+        return '\n'.join(line for metric in self.all() for line in metric.render()) + '\n'
+
+
+def route_label(scope: dict) -> str:
+    # the route template, i.e. '/parts/{serial_number}', keeps the number of series bounded
+    route = scope.get('route')
+    return getattr(route, 'path_format', None) or getattr(route, 'path', None) or 'unmatched'
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording the latency and the number of Mongo operations of every HTTP request."""
+
+    def __init__(self, app, metrics: Metrics):
+        self.app = app
+        self.metrics = metrics
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or not self.metrics.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        status = ['500']
+
+        async def send_with_status(message):
+            if message['type'] == 'http.response.start':
+                status[0] = str(message['status'])
+            await send(message)
+
+        operations = [0]
+        token = request_operations.set(operations)
+        started = perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            duration = perf_counter() - started
+            request_operations.reset(token)
+            route = route_label(scope)
+            self.metrics.request_duration.observe((scope['method'], route, status[0]), duration)
+            self.metrics.request_operations.observe((scope['method'], route), operations[0])
+
+
+def command_collection(event) -> str:
+    # getMore names the collection in a separate field, database commands have none
+    target = event.command.get(event.command_name)
+    if not isinstance(target, str):
+        target = event.command.get('collection')
+    return target if isinstance(target, str) else ''
+
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    """Records the latency of every Mongo command and counts it against the request that issued it.
+
+    It has to be passed to the MongoClient as an event listener.
+    """
+
+    def __init__(self, metrics: Metrics):
+        self.metrics = metrics
+        self._collections: Dict[tuple, str] = {}
+        self._lock = Lock()
+
+    def started(self, event):
+        if not self.metrics.enabled:
+            return
+        operations = request_operations.get()
+        if operations is not None:
+            operations[0] += 1
+        with self._lock:
+            self._collections[(event.connection_id, event.request_id)] = command_collection(event)
+
+    def _finished(self, event) -> Optional[tuple]:
+        with self._lock:
+            collection = self._collections.pop((event.connection_id, event.request_id), None)
+        if collection is None:
+            return None
+        self.metrics.command_duration.observe((collection, event.command_name), event.duration_micros / 1e6)
+        return collection, event.command_name
+
+    def succeeded(self, event):
+        self._finished(event)
+
+    def failed(self, event):
+        labels = self._finished(event)
+        if labels is not None:
+            self.metrics.command_failures.inc(labels)
+
+
+metrics = Metrics()
+mongo_command_metrics = MongoCommandMetrics(metrics)
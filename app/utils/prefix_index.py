@@ -0,0 +1,77 @@
+from bisect import bisect_left, insort
+from threading import Lock
+from typing import Dict, Iterable, List, Tuple
+
+
+def normalize(value: str) -> str:
+    return value.casefold()
+
+
+class PrefixIndex:
+    """Distinct values in a sorted array, completed by bisecting to the first one with the prefix.
+
+    A completion costs O(log n + limit). Values are matched case-insensitively and counted, so a value shared by
+    several documents stays until the last of them is removed. Once more than max_entries distinct values are
+    added, the entries are dropped and the index is marked as overflowed, so its memory stays bounded.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self.overflowed = False
+        # (normalized value, value), sorted
+        self._entries: List[Tuple[str, str]] = []
+        self._counts: Dict[str, int] = {}
+        self._lock = Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def add(self, value: str):
+        with self._lock:
+            if self.overflowed:
+                return
+            count = self._counts.get(value, 0)
+            if count == 0:
+                if len(self._entries) == self.max_entries:
+                    self._overflow()
+                    return
+                insort(self._entries, (normalize(value), value))
+            self._counts[value] = count + 1
+
+    def add_all(self, values: Iterable[str]):
+        """Adds many values with a single sort, instead of inserting them one by one."""
+        with self._lock:
+            if self.overflowed:
+                return
+            for value in values:
+                if value not in self._counts and len(self._counts) == self.max_entries:
+                    self._overflow()
+                    return
+                self._counts[value] = self._counts.get(value, 0) + 1
+            self._entries = sorted((normalize(value), value) for value in self._counts)
+
+    def remove(self, value: str):
+        with self._lock:
+            count = self._counts.get(value, 0)
+            if count > 1:
+                self._counts[value] = count - 1
+            elif count == 1:
+                del self._counts[value]
+                entry = (normalize(value), value)
+                del self._entries[bisect_left(self._entries, entry)]
+
+    def complete(self, prefix: str, limit: int) -> List[str]:
+        prefix = normalize(prefix)
+        with self._lock:
+            position = bisect_left(self._entries, (prefix,))
+            matches = []
+            for key, value in self._entries[position:position + limit]:
+                if not key.startswith(prefix):
+                    break
+                matches.append(value)
+            return matches
+
+    def _overflow(self):
+        self.overflowed = True
+        self._entries = []
+        self._counts = {}
@@ -0,0 +1,29 @@
+from typing import Optional
+
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson comes with fastapi[all]
+    orjson = None
+
+# documents read with these projections were validated on write, so they are returned without revalidation
+PART_PROJECTION = {'_id': 0, 'serial_number': 1, 'name': 1, 'description': 1, 'category': 1, 'quantity': 1,
+                   'price': 1, 'location': 1}
+CATEGORY_PROJECTION = {'_id': 0, 'name': 1, 'parent_name': 1}
+
+
+class FastJSONResponse(JSONResponse):
+    """Serializes plain documents with orjson when it is available, bypassing jsonable_encoder."""
+
+    def render(self, content) -> bytes:
+        if orjson is None:
+            return super().render(content)
+        return orjson.dumps(content)
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if if_none_match is None:
+        return False
+    candidates = {candidate.strip().removeprefix('W/') for candidate in if_none_match.split(',')}
+    return '*' in candidates or etag in candidates
@@ -0,0 +1,176 @@
+import json
+import time
+from collections import deque
+from dataclasses import dataclass
+from threading import Lock
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from pymongo import monitoring
+from pymongo.errors import PyMongoError
+
+# commands whose plan can be explained, with the field holding their query
+EXPLAINABLE_COMMANDS = {'find': 'filter', 'aggregate': 'pipeline', 'count': 'query', 'distinct': 'query',
+                        'findAndModify': 'query', 'update': 'updates', 'delete': 'deletes'}
+# session, transaction and cluster fields are added by the driver and can't be sent again with explain
+DRIVER_FIELDS = {'lsid', 'txnNumber', 'autocommit', 'startTransaction', 'readConcern', 'writeConcern'}
+
+
+def query_shape(value: Any) -> Any:
+    """The query with every value replaced by '?', so queries differing only in values have the same shape."""
+    if isinstance(value, dict):
+        return {key: query_shape(item) for key, item in value.items()}
+    if isinstance(value, list) and any(isinstance(item, dict) for item in value):
+        return [query_shape(item) for item in value]
+    return '?'
+
+
+def command_shape(command_name: str, command: dict) -> str:
+    query = command.get(EXPLAINABLE_COMMANDS[command_name])
+    if command_name in ('update', 'delete'):
+        query = [statement.get('q') for statement in query or []]
+    shape = {'query': query_shape(query)}
+    if 'sort' in command:
+        shape['sort'] = list(command['sort'])
+    return json.dumps(shape, sort_keys=True, default=str)
+
+
+def plan_stages(plan: dict) -> List[dict]:
+    # the winning plan is a tree of stages, i.e. FETCH over IXSCAN
+    stages = [plan]
+    for child_field in ('inputStage', 'inputStages', 'queryPlan'):
+        children = plan.get(child_field) or []
+        if isinstance(children, dict):
+            children = [children]
+        for child in children:
+            stages += plan_stages(child)
+    return stages
+
+
+def summarize_plan(explain: dict) -> dict:
+    planner = explain.get('queryPlanner')
+    if planner is None:
+        # aggregations explain every stage of their pipeline, the query stage comes first
+        planner = next((stage['$cursor']['queryPlanner'] for stage in explain.get('stages', []) if '$cursor' in stage),
+                       {})
+    stages = plan_stages(planner.get('winningPlan', {}))
+    return {
+        'stages': [stage['stage'] for stage in stages if 'stage' in stage],
+        'indexes': sorted({stage['indexName'] for stage in stages if 'indexName' in stage}),
+        'collscan': any(stage.get('stage') == 'COLLSCAN' for stage in stages),
+    }
+
+
+@dataclass
+class SlowQuery:
+    collection: str
+    command_name: str
+    shape: str
+    duration_ms: float
+    recorded_at: float
+    database: str
+    command: dict
+
+
+class SlowQueryLog(monitoring.CommandListener):
+    """Keeps the last Mongo commands slower than the threshold in a ring buffer, and reports their shapes.
+
+    Plans are explained when the report is built, not while recording, so recording adds no database round trips.
+    It has to be passed to the MongoClient as an event listener.
+    """
+
+    def __init__(self, enabled: bool = False, threshold_ms: int = 100, size: int = 1000):
+        self.enabled = enabled
+        self.threshold_ms = threshold_ms
+        self._entries: Deque[SlowQuery] = deque(maxlen=size)
+        self._started: Dict[tuple, dict] = {}
+        # shape key -> plan summary, shapes are explained once
+        self._plans: Dict[tuple, dict] = {}
+        self._lock = Lock()
+
+    def configure(self, enabled: bool, threshold_ms: int, size: int):
+        with self._lock:
+            self.enabled = enabled
+            self.threshold_ms = threshold_ms
+            self._entries = deque(self._entries, maxlen=size)
+
+    def started(self, event):
+        if not self.enabled or event.command_name not in EXPLAINABLE_COMMANDS:
+            return
+        with self._lock:
+            self._started[(event.connection_id, event.request_id)] = event.command
+
+    def succeeded(self, event):
+        self._finished(event)
+
+    def failed(self, event):
+        self._finished(event)
+
+    def _finished(self, event):
+        with self._lock:
+            command = self._started.pop((event.connection_id, event.request_id), None)
+        duration_ms = event.duration_micros / 1000
+        if command is None or duration_ms < self.threshold_ms:
+            return
+        collection = command.get(event.command_name)
+        self._entries.append(SlowQuery(
+            # database level aggregations have no collection
+            collection=collection if isinstance(collection, str) else '',
+            command_name=event.command_name,
+            shape=command_shape(event.command_name, command),
+            duration_ms=duration_ms,
+            recorded_at=time.time(),
+            database=event.database_name,
+            command={key: value for key, value in command.items()
+                     if key not in DRIVER_FIELDS and not key.startswith('$')}))
+
+    def reset(self):
+        with self._lock:
+            self._entries.clear()
+            self._plans.clear()
+
+    def report(self, client, limit: int = 20) -> List[dict]:
+        """Shapes ordered by their total time, with the plan of their latest occurrence."""
+        with self._lock:
+            entries = list(self._entries)
+
+        shapes: Dict[Tuple[str, str, str], dict] = {}
+        for entry in entries:
+            key = (entry.collection, entry.command_name, entry.shape)
+            shape = shapes.setdefault(key, {
+                'collection': entry.collection,
+                'command': entry.command_name,
+                'shape': json.loads(entry.shape),
+                'count': 0,
+                'total_ms': 0.0,
+                'max_ms': 0.0,
+                'latest': entry,
+            })
+            shape['count'] += 1
+            shape['total_ms'] += entry.duration_ms
+            shape['max_ms'] = max(shape['max_ms'], entry.duration_ms)
+            shape['latest'] = entry
+
+        top = sorted(shapes.items(), key=lambda item: item[1]['total_ms'], reverse=True)[:limit]
+        report = []
+        for key, shape in top:
+            latest = shape.pop('latest')
+            shape['mean_ms'] = shape['total_ms'] / shape['count']
+            shape['plan'] = self._plan(client, key, latest)
+            report.append(shape)
+        return report
+
+    def _plan(self, client, key: tuple, entry: SlowQuery) -> Optional[dict]:
+        with self._lock:
+            if key in self._plans:
+                return self._plans[key]
+        try:
+            explain = client[entry.database].command({'explain': entry.command, 'verbosity': 'queryPlanner'})
+            plan = summarize_plan(explain)
+        except PyMongoError as error:
+            return {'error': str(error)}
+        with self._lock:
+            self._plans[key] = plan
+        return plan
+
+
+slow_query_log = SlowQueryLog()
@@ -0,0 +1,66 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock, Thread
+from time import perf_counter
+from typing import Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+StartupStep = Tuple[str, Callable[[], object]]
+
+
+def warm_up_connection_pool(client, connections: int):
+    # concurrent pings hold that many connections at once, so they are all open before the first request
+    connections = max(connections, 1)
+    with ThreadPoolExecutor(max_workers=connections, thread_name_prefix='pool-warm-up') as executor:
+        list(executor.map(lambda _: client.admin.command('ping'), range(connections)))
+
+
+class StartupState:
+    """Progress of the startup steps run in the background, reported by GET /health/ready."""
+
+    def __init__(self):
+        self.ready = False
+        self.error: Optional[str] = None
+        self.steps: Dict[str, float] = {}
+        self._lock = Lock()
+
+    def reset(self):
+        with self._lock:
+            self.ready = False
+            self.error = None
+            self.steps = {}
+
+    def run(self, steps: List[StartupStep]):
+        self.reset()
+        for name, step in steps:
+            started = perf_counter()
+            try:
+                step()
+            except Exception as error:
+                # the app keeps serving /health/live, but never reports ready
+                logger.exception("Startup step %s failed", name)
+                with self._lock:
+                    self.error = f'{name}: {error}'
+                return
+            with self._lock:
+                self.steps[name] = round(perf_counter() - started, 4)
+        with self._lock:
+            self.ready = True
+        logger.info("Ready in %.2fs", sum(self.steps.values()))
+
+    def start(self, steps: List[StartupStep]) -> Thread:
+        worker = Thread(target=self.run, args=(steps,), name='startup', daemon=True)
+        worker.start()
+        return worker
+
+    def report(self) -> dict:
+        with self._lock:
+            return {
+                'status': 'ready' if self.ready else 'failed' if self.error else 'starting',
+                'error': self.error,
+                'steps_seconds': dict(self.steps),
+            }
+
+
+startup_state = StartupState()
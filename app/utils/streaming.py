@@ -0,0 +1,46 @@
+import json
+from typing import AsyncIterable, AsyncIterator, Iterable, Iterator, List, Optional
+
+from fastapi import Request, Response
+from fastapi.responses import StreamingResponse
+
+NDJSON_MEDIA_TYPE = 'application/x-ndjson'
+NEXT_PAGE_HEADER = 'X-Next-After'
+MAX_PAGE_SIZE = 1000
+
+
+def wants_ndjson(request: Request) -> bool:
+    return NDJSON_MEDIA_TYPE in request.headers.get('accept', '')
+
+
+def keyset_page(collection, sort_key: str, after: Optional[str], limit: Optional[int], projection: dict):
+    # documents ordered by a uniquely indexed key, resumed after the last key of the previous page
+    query = {sort_key: {'$gt': after}} if after is not None else {}
+    cursor = collection.find(query, projection).sort(sort_key, 1)
+    if limit is not None:
+        cursor = cursor.limit(limit)
+    return cursor
+
+
+def set_next_page_header(response: Response, page: List[dict], sort_key: str, limit: Optional[int]):
+    if limit is not None and len(page) == limit:
+        response.headers[NEXT_PAGE_HEADER] = page[-1][sort_key]
+
+
+def iterate_ndjson(documents: Iterable[dict]) -> Iterator[bytes]:
+    # the cursor is consumed lazily, so only its current batch is held in memory
+    for document in documents:
+        yield json.dumps(document, default=str).encode() + b'\n'
+
+
+async def iterate_ndjson_async(documents: AsyncIterable[dict]) -> AsyncIterator[bytes]:
+    async for document in documents:
+        yield json.dumps(document, default=str).encode() + b'\n'
+
+
+def ndjson_response(documents: Iterable[dict]) -> StreamingResponse:
+    return StreamingResponse(iterate_ndjson(documents), media_type=NDJSON_MEDIA_TYPE)
+
+
+def ndjson_response_async(documents: AsyncIterable[dict]) -> StreamingResponse:
+    return StreamingResponse(iterate_ndjson_async(documents), media_type=NDJSON_MEDIA_TYPE)
@@ -0,0 +1,23 @@
+from typing import Callable, TypeVar
+
+from pymongo.client_session import ClientSession
+from pymongo.topology_description import TOPOLOGY_TYPE
+
+T = TypeVar('T')
+
+TRANSACTIONAL_TOPOLOGIES = (TOPOLOGY_TYPE.ReplicaSetWithPrimary, TOPOLOGY_TYPE.Sharded)
+
+
+def supports_transactions(client) -> bool:
+    # the topology is unknown until the client talks to the deployment for the first time
+    if client.topology_description.topology_type == TOPOLOGY_TYPE.Unknown:
+        client.admin.command('ping')
+    return client.topology_description.topology_type in TRANSACTIONAL_TOPOLOGIES
+
+
+def run_in_transaction(db, callback: Callable[[ClientSession], T]) -> T:
+    """Runs callback(session) in a multi-document transaction, or with no session on a standalone mongod."""
+    if not supports_transactions(db.client):
+        return callback(None)
+    with db.client.start_session() as session:
+        return session.with_transaction(callback)
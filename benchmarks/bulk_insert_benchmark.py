@@ -0,0 +1,55 @@
+"""Parts/second of POST /parts/bulk vs looping on POST /parts/.
+
+Run against a mongod configured through DB_URI/DB_NAME:
+
+    python -m benchmarks.bulk_insert_benchmark --parts 5000
+"""
+import argparse
+import time
+
+from fastapi.testclient import TestClient
+from pymongo import MongoClient
+
+from app import config
+from app.main import app
+from app.utils.exemplary_data_generator import generate_part_data
+
+CATEGORY = 'bench_bulk_subcategory'
+
+
+def reset(db):
+    db.parts.delete_many({'category': CATEGORY})
+    db.categories.delete_many({'name': {'$in': ['bench_bulk_category', CATEGORY]}})
+    db.categories.insert_many([{'name': 'bench_bulk_category', 'parent_name': ''},
+                               {'name': CATEGORY, 'parent_name': 'bench_bulk_category'}])
+
+
+def parts(prefix: str, count: int):
+    return [generate_part_data(f'{prefix}{number}', CATEGORY) for number in range(count)]
+
+
+def main(count: int):
+    app.mongodb_client = MongoClient(config.DB_URI, **config.mongo_client_options())
+    app.database = app.mongodb_client[config.DB_NAME]
+    client = TestClient(app)
+
+    reset(app.database)
+    started = time.perf_counter()
+    for part in parts('bench_single_sn', count):
+        client.post('/parts/', json=part).raise_for_status()
+    single = count / (time.perf_counter() - started)
+
+    reset(app.database)
+    started = time.perf_counter()
+    client.post('/parts/bulk', json=parts('bench_bulk_sn', count)).raise_for_status()
+    bulk = count / (time.perf_counter() - started)
+
+    reset(app.database)
+    print(f'POST /parts/     {single:12.1f} parts/s')
+    print(f'POST /parts/bulk {bulk:12.1f} parts/s ({bulk / single:.1f}x)')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--parts', type=int, default=5000)
+    main(parser.parse_args().parts)
@@ -0,0 +1,340 @@
+"""Latency percentiles, throughput and Mongo operations per request of every part and category route.
+
+Seeds a dataset of --parts parts under a wide or a deep category tree into a dedicated database (--db-name, it is
+dropped first), then drives each route with --concurrency concurrent requests. Requests go through the ASGI app in
+process, or to a running server given as --base-url (started with DB_NAME set to the same database).
+Results are written as JSON, and compared route by route with an earlier run given as --baseline:
+
+    python -m benchmarks.routes_benchmark --parts 100000 --tree deep --concurrency 50
+    python -m benchmarks.routes_benchmark --no-seed --baseline benchmark_results/routes-4c9e428.json
+    python -m benchmarks.routes_benchmark --backend mongomock --parts 10000
+
+--backend mongod uses DB_URI, --backend mongomock an in-memory stand-in (pip install mongomock). mongomock is not
+thread-safe, so handlers run one at a time and Mongo operations aren't counted; use it to compare the work done by
+the handlers, not for concurrency.
+"""
+import argparse
+import asyncio
+import datetime
+import json
+import os
+import platform
+import random
+import subprocess
+import time
+from dataclasses import dataclass
+from threading import Lock
+from typing import Callable, List, Optional, Tuple
+
+import httpx
+from anyio import to_thread
+from pymongo import MongoClient, monitoring
+
+from app import config
+from app.main import app
+from app.service.category_cache import category_cache
+from app.service.part_cache import part_cache
+from app.service.text_search_service import part_text_index
+from app.utils.exemplary_data_generator import (
+    COMPONENT_KINDS,
+    ROOMS,
+    WarehouseSpec,
+    generate_parts,
+    seed_warehouse,
+    serial_number
+)
+from app.utils.indexes import ensure_indexes
+
+SEED_BATCH_SIZE = 10000
+ROOT_CATEGORIES = 8
+
+# (method, url, request keyword arguments) of the n-th request of a route
+RequestFactory = Callable[[int], Tuple[str, str, dict]]
+
+
+class CommandCounter(monitoring.CommandListener):
+    def __init__(self):
+        self.count = 0
+        self._lock = Lock()
+
+    def started(self, event):
+        with self._lock:
+            self.count += 1
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+
+@dataclass
+class Dataset:
+    parts: int
+    tree: str
+    roots: List[str]
+    categories: List[str]
+    # categories accepting parts, i.e. all except the base ones
+    part_categories: List[str]
+
+
+def seed(client: MongoClient, db_name: str, parts: int, tree: str, categories: int, random_seed: int) -> Dataset:
+    client.drop_database(db_name)
+    db = client[db_name]
+    ensure_indexes(db)
+
+    # wide: every category is a direct child of a base one, deep: every base category heads a single chain
+    below_root = max(categories // ROOT_CATEGORIES - 1, 1)
+    spec = WarehouseSpec(parts=parts, depth=1 if tree == 'wide' else below_root,
+                         fan_out=below_root if tree == 'wide' else 1, roots=ROOT_CATEGORIES, seed=random_seed)
+    started = time.perf_counter()
+    seeded = seed_warehouse(db, spec, SEED_BATCH_SIZE)
+    print(f"seeded {seeded['parts']} parts and {seeded['categories']} categories "
+          f"in {time.perf_counter() - started:.1f}s")
+
+    db.benchmark_dataset.insert_one({'parts': parts, 'tree': tree})
+    return load_dataset(db)
+
+
+def load_dataset(db) -> Dataset:
+    dataset = db.benchmark_dataset.find_one()
+    if dataset is None:
+        raise SystemExit(f'{db.name} was not seeded by this benchmark, run it without --no-seed first')
+    # categories created by the benchmark itself are left out
+    categories = list(db.categories.find({'name': {'$not': {'$regex': '^bench_'}}}, {'name': 1, 'parent_name': 1}))
+    return Dataset(dataset['parts'], dataset['tree'],
+                   [category['name'] for category in categories if category['parent_name'] == ''],
+                   [category['name'] for category in categories],
+                   [category['name'] for category in categories if category['parent_name'] != ''])
+
+
+def route_workloads(dataset: Dataset, run_id: str, seed_value: int) -> List[Tuple[str, RequestFactory]]:
+    """Requests of every part and category route, in an order where writes find what earlier routes created."""
+    rng = random.Random(seed_value)
+
+    def existing_serial_number() -> str:
+        return serial_number(rng.randrange(dataset.parts))
+
+    def new_part(number: int, prefix: str = 'single') -> dict:
+        document = next(generate_parts(WarehouseSpec(parts=1, seed=seed_value + number), dataset.part_categories))
+        return {**document, 'serial_number': f'bench_{prefix}_{run_id}_{number}',
+                'category': rng.choice(dataset.part_categories)}
+
+    new_category = 'bench_new_{run_id}_{number}'.format
+    renamed_category = 'bench_renamed_{run_id}_{number}'.format
+
+    return [
+        ('GET /parts/{serial_number}', lambda n: ('GET', f'/parts/{existing_serial_number()}', {})),
+        ('GET /parts/', lambda n: ('GET', '/parts/', {'params': {'after': existing_serial_number(), 'limit': 100}})),
+        ('GET /parts/search/', lambda n: ('GET', '/parts/search/', {'params': {
+            'category': rng.choice(dataset.part_categories), 'room': rng.choice(ROOMS),
+            'sort_by': 'price', 'limit': 50}})),
+        ('GET /parts/search/ include_descendants', lambda n: ('GET', '/parts/search/', {'params': {
+            'category': rng.choice(dataset.categories), 'include_descendants': True, 'limit': 50}})),
+        ('GET /parts/search/text', lambda n: ('GET', '/parts/search/text', {'params': {
+            'q': rng.choice(COMPONENT_KINDS), 'limit': 20}})),
+        ('POST /parts/', lambda n: ('POST', '/parts/', {'json': new_part(n)})),
+        ('PUT /parts/{serial_number}', lambda n: ('PUT', f'/parts/{existing_serial_number()}', {
+            'json': {'description': f'updated by run {run_id}'}})),
+        ('POST /parts/{serial_number}/movements', lambda n: ('POST', f'/parts/{existing_serial_number()}/movements',
+                                                             {'json': {'delta': 1}})),
+        ('POST /parts/movements', lambda n: ('POST', '/parts/movements', {
+            'json': [{'serial_number': existing_serial_number(), 'delta': 1} for _ in range(10)]})),
+        ('POST /parts/bulk', lambda n: ('POST', '/parts/bulk', {
+            'json': [new_part(n * 100 + item, 'bulk') for item in range(100)]})),
+        ('DELETE /parts/{serial_number}', lambda n: ('DELETE', f'/parts/bench_single_{run_id}_{n}', {})),
+        ('GET /categories/{category}', lambda n: ('GET', f'/categories/{rng.choice(dataset.categories)}', {})),
+        ('GET /categories/{category}/tree', lambda n: ('GET', f'/categories/{rng.choice(dataset.roots)}/tree', {})),
+        ('GET /categories/', lambda n: ('GET', '/categories/', {'params': {
+            'after': rng.choice(dataset.categories), 'limit': 100}})),
+        ('POST /categories/', lambda n: ('POST', '/categories/', {'json': {
+            'name': new_category(run_id=run_id, number=n), 'parent_name': rng.choice(dataset.categories)}})),
+        ('PUT /categories/{category}', lambda n: ('PUT', f'/categories/{new_category(run_id=run_id, number=n)}', {
+            'json': {'name': renamed_category(run_id=run_id, number=n)}})),
+        ('DELETE /categories/{category}', lambda n: ('DELETE',
+                                                     f'/categories/{renamed_category(run_id=run_id, number=n)}', {})),
+    ]
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    # nearest-rank percentile
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, max(0, round(fraction * len(sorted_values)) - 1))]
+
+
+class OperationCounter:
+    """Mongo operations issued while driving a route: from a command listener in process, or from the server
+    opcounters when requests go to another process."""
+
+    def __init__(self, listener: Optional[CommandCounter], db=None):
+        self.listener = listener
+        self.db = db
+
+    def read(self) -> Optional[int]:
+        if self.listener is not None:
+            return self.listener.count
+        if self.db is not None:
+            # the serverStatus command itself is counted once
+            return sum(self.db.command('serverStatus')['opcounters'].values()) - 1
+        return None
+
+
+async def drive_route(client: httpx.AsyncClient, factory: RequestFactory, requests: int, concurrency: int,
+                      operations: OperationCounter) -> dict:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    errors = 0
+
+    async def one(number: int):
+        nonlocal errors
+        method, url, kwargs = factory(number)
+        async with semaphore:
+            started = time.perf_counter()
+            response = await client.request(method, url, **kwargs)
+            latencies.append(time.perf_counter() - started)
+        if response.status_code >= 400:
+            errors += 1
+
+    operations_before = operations.read()
+    started = time.perf_counter()
+    await asyncio.gather(*(one(number) for number in range(requests)))
+    duration = time.perf_counter() - started
+    operations_after = operations.read()
+
+    latencies.sort()
+    return {
+        'requests': requests,
+        'errors': errors,
+        'duration_s': round(duration, 4),
+        'throughput_rps': round(requests / duration, 1),
+        'latency_ms': {name: round(percentile(latencies, fraction) * 1000, 3)
+                       for name, fraction in (('p50', 0.50), ('p95', 0.95), ('p99', 0.99), ('max', 1.0))},
+        'mongo_ops_per_request': (round((operations_after - operations_before) / requests, 2)
+                                  if operations_before is not None else None),
+    }
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def connect(args) -> Tuple[MongoClient, Optional[CommandCounter]]:
+    if args.backend == 'mongomock':
+        try:
+            import mongomock
+        except ImportError:
+            raise SystemExit('--backend mongomock requires the mongomock package')
+        return mongomock.MongoClient(), None
+
+    listener = None if args.base_url else CommandCounter()
+    listeners = [listener] if listener else []
+    return MongoClient(config.DB_URI, event_listeners=listeners, **config.mongo_client_options()), listener
+
+
+async def run(args) -> dict:
+    mongo_client, listener = connect(args)
+    if args.seed:
+        dataset = seed(mongo_client, args.db_name, args.parts, args.tree, args.categories, args.random_seed)
+    else:
+        dataset = load_dataset(mongo_client[args.db_name])
+
+    if args.base_url:
+        transport_options = {'base_url': args.base_url}
+        operations = OperationCounter(None, mongo_client.admin)
+    else:
+        app.mongodb_client = mongo_client
+        app.database = mongo_client[args.db_name]
+        category_cache.invalidate()
+        part_text_index.invalidate()
+        part_cache.clear()
+        if args.backend == 'mongomock':
+            to_thread.current_default_thread_limiter().total_tokens = 1
+            config.TEXT_SEARCH_BACKEND = 'memory'
+        else:
+            to_thread.current_default_thread_limiter().total_tokens = config.THREADPOOL_SIZE
+        transport_options = {'transport': httpx.ASGITransport(app=app), 'base_url': 'http://bench'}
+        operations = OperationCounter(listener)
+
+    run_id = str(int(time.time()))
+    routes = {}
+    async with httpx.AsyncClient(timeout=None, **transport_options) as client:
+        for route, factory in route_workloads(dataset, run_id, args.random_seed):
+            if args.routes and not any(selected in route for selected in args.routes):
+                continue
+            routes[route] = await drive_route(client, factory, args.requests, args.concurrency, operations)
+            print_route(route, routes[route])
+
+    mongo_client.close()
+    return {
+        'commit': git_commit(),
+        'started_at': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        'python': platform.python_version(),
+        'parameters': {
+            'backend': args.backend,
+            'mode': 'server' if args.base_url else 'in-process',
+            'parts': dataset.parts,
+            'tree': dataset.tree,
+            'categories': len(dataset.categories),
+            'requests': args.requests,
+            'concurrency': args.concurrency,
+        },
+        'routes': routes,
+    }
+
+
+def print_route(route: str, result: dict, baseline: Optional[dict] = None):
+    latency = result['latency_ms']
+    line = (f'{route:42} {result["throughput_rps"]:9.1f} req/s  p50 {latency["p50"]:8.2f}  p95 {latency["p95"]:8.2f}'
+            f'  p99 {latency["p99"]:8.2f} ms  ops/req {result["mongo_ops_per_request"]}  errors {result["errors"]}')
+    if baseline:
+        line += (f'  | vs baseline: throughput {change(baseline["throughput_rps"], result["throughput_rps"])}'
+                 f', p95 {change(baseline["latency_ms"]["p95"], latency["p95"])}')
+    print(line)
+
+
+def change(before: float, after: float) -> str:
+    return f'{(after - before) / before * 100:+.1f}%' if before else 'n/a'
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--backend', choices=['mongod', 'mongomock'], default='mongod')
+    parser.add_argument('--db-name', default='warehouse_benchmark')
+    parser.add_argument('--parts', type=int, default=10000, help='i.e. 10000, 100000 or 1000000')
+    parser.add_argument('--tree', choices=['wide', 'deep'], default='wide')
+    parser.add_argument('--categories', type=int, default=1000)
+    parser.add_argument('--no-seed', dest='seed', action='store_false', help='reuse the dataset of an earlier run')
+    parser.add_argument('--requests', type=int, default=1000, help='requests per route')
+    parser.add_argument('--concurrency', type=int, default=50)
+    parser.add_argument('--routes', nargs='*', help='only routes containing one of these strings')
+    parser.add_argument('--base-url', help='drive a running server instead of the app in process')
+    parser.add_argument('--random-seed', type=int, default=42)
+    parser.add_argument('--output', help='defaults to benchmark_results/routes-<commit>.json')
+    parser.add_argument('--baseline', help='results of an earlier run to compare with')
+    args = parser.parse_args()
+    if args.base_url and args.backend == 'mongomock':
+        parser.error('--base-url requires --backend mongod, the in-memory database is not shared with the server')
+
+    results = asyncio.run(run(args))
+
+    output = args.output or os.path.join('benchmark_results', f'routes-{results["commit"] or "unknown"}.json')
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    with open(output, 'w') as file:
+        json.dump(results, file, indent=2)
+    print(f'results written to {output}')
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)['routes']
+        print(f'\ncompared with {args.baseline}:')
+        for route, result in results['routes'].items():
+            print_route(route, result, baseline.get(route))
+
+
+if __name__ == '__main__':
+    main()
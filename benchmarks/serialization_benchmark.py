@@ -0,0 +1,55 @@
+"""Per-document cost of encoding a list response, before and after the fast read path. Needs no database.
+
+    python -m benchmarks.serialization_benchmark --documents 20000
+"""
+import argparse
+import json
+import time
+from typing import List
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+
+from app.models.part import Part
+from app.utils.exemplary_data_generator import generate_part_data
+from app.utils.responses import FastJSONResponse
+
+PARTS_ADAPTER = TypeAdapter(List[Part])
+
+
+def validated_response(documents: List[dict]) -> bytes:
+    # what GET /parts/ did: build Part objects, encode them, then FastAPI validates and encodes the return value again
+    parts_list = [Part(**document) for document in documents]
+    content = jsonable_encoder(parts_list, exclude=['_id'])
+    content = jsonable_encoder(PARTS_ADAPTER.validate_python(content))
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode()
+
+
+def fast_response(documents: List[dict]) -> bytes:
+    return FastJSONResponse(documents).body
+
+
+def measure(encode, documents: List[dict], repeats: int) -> float:
+    best = float('inf')
+    for _ in range(repeats):
+        started = time.perf_counter()
+        encode(documents)
+        best = min(best, time.perf_counter() - started)
+    return best / len(documents) * 1e6
+
+
+def main(documents_count: int, repeats: int):
+    documents = [generate_part_data(f'sn{number}', 'DemoSubCategoryA') for number in range(documents_count)]
+
+    before = measure(validated_response, documents, repeats)
+    after = measure(fast_response, documents, repeats)
+    print(f'validated path: {before:8.2f} us/document')
+    print(f'fast path:      {after:8.2f} us/document ({before / after:.1f}x)')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--documents', type=int, default=20000)
+    parser.add_argument('--repeats', type=int, default=5)
+    args = parser.parse_args()
+    main(args.documents, args.repeats)
@@ -0,0 +1,52 @@
+"""Import time of app.main, and time until the app serves requests and until it reports ready.
+
+Startup runs against a mongod configured through DB_URI/DB_NAME:
+
+    python -m benchmarks.startup_benchmark --runs 5
+"""
+import argparse
+import asyncio
+import statistics
+import subprocess
+import sys
+import time
+
+IMPORT_SNIPPET = "import time; started = time.perf_counter(); import app.main; print(time.perf_counter() - started)"
+
+
+def import_seconds(runs: int) -> float:
+    # a fresh interpreter per run, so nothing is already imported
+    return statistics.median(float(subprocess.run([sys.executable, '-c', IMPORT_SNIPPET], capture_output=True,
+                                                  text=True, check=True).stdout) for _ in range(runs))
+
+
+async def startup_seconds(timeout: float):
+    from app.main import app
+    from app.utils.startup import startup_state
+
+    started = time.perf_counter()
+    async with app.router.lifespan_context(app):
+        serving = time.perf_counter() - started
+        while not startup_state.ready and startup_state.error is None and time.perf_counter() - started < timeout:
+            await asyncio.sleep(0.005)
+        ready = time.perf_counter() - started
+        report = startup_state.report()
+    return serving, ready, report
+
+
+def main(runs: int, timeout: float):
+    print(f'import app.main              {import_seconds(runs) * 1000:10.1f} ms (median of {runs})')
+
+    serving, ready, report = asyncio.run(startup_seconds(timeout))
+    print(f'lifespan start to serving    {serving * 1000:10.1f} ms')
+    print(f'lifespan start to ready      {ready * 1000:10.1f} ms ({report["status"]})')
+    for step, seconds in report['steps_seconds'].items():
+        print(f'  {step:28}{seconds * 1000:10.1f} ms')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--timeout', type=float, default=60)
+    args = parser.parse_args()
+    main(args.runs, args.timeout)
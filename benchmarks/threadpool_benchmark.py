@@ -0,0 +1,97 @@
+"""Requests/second of the sync handlers with the default threadpool and MongoClient pool vs the tuned ones, and of
+the async handlers on Motor (DB_ASYNC) with the default threadpool.
+
+Run against a mongod configured through DB_URI/DB_NAME, the async variant is skipped without the motor package:
+
+    python -m benchmarks.threadpool_benchmark --requests 5000 --concurrency 200
+"""
+import argparse
+import asyncio
+import time
+
+import httpx
+from anyio import to_thread
+from pymongo import MongoClient
+
+from app import config
+from app.main import app
+from app.routes.async_read_route import router as async_read_route
+from app.utils.async_db import AsyncIOMotorClient, create_async_client, replace_routes
+from app.utils.exemplary_data_generator import generate_part_data
+
+DEFAULT_THREADPOOL_SIZE = 40
+SERIAL_NUMBERS = [f'bench_sn{number}' for number in range(100)]
+
+
+def seed(db):
+    db.categories.delete_many({'name': {'$in': ['bench_category', 'bench_subcategory']}})
+    db.parts.delete_many({'serial_number': {'$in': SERIAL_NUMBERS}})
+    db.categories.insert_many([{'name': 'bench_category', 'parent_name': ''},
+                               {'name': 'bench_subcategory', 'parent_name': 'bench_category'}])
+    db.parts.insert_many([generate_part_data(serial_number, 'bench_subcategory') for serial_number in SERIAL_NUMBERS])
+
+
+async def drive(total_requests: int, concurrency: int) -> float:
+    semaphore = asyncio.Semaphore(concurrency)
+    transport = httpx.ASGITransport(app=app)
+
+    async with httpx.AsyncClient(transport=transport, base_url='http://bench') as client:
+        async def one(number: int):
+            async with semaphore:
+                # list pages aren't cached, so every request waits on Mongo
+                response = await client.get('/parts/', params={
+                    'after': SERIAL_NUMBERS[number % len(SERIAL_NUMBERS)], 'limit': 10})
+                response.raise_for_status()
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one(number) for number in range(total_requests)))
+        return total_requests / (time.perf_counter() - started)
+
+
+async def run_variant(client_options: dict, threadpool_size: int, total_requests: int, concurrency: int) -> float:
+    app.mongodb_client = MongoClient(config.DB_URI, **client_options)
+    app.database = app.mongodb_client[config.DB_NAME]
+    to_thread.current_default_thread_limiter().total_tokens = threadpool_size
+    try:
+        await drive(min(total_requests, 200), concurrency)  # warm-up
+        return await drive(total_requests, concurrency)
+    finally:
+        app.mongodb_client.close()
+
+
+async def run_async_variant(total_requests: int, concurrency: int) -> float:
+    # the Motor client is created in the running event loop, the sync client still serves the other routes
+    app.mongodb_client = MongoClient(config.DB_URI, **config.mongo_client_options())
+    app.database = app.mongodb_client[config.DB_NAME]
+    app.async_mongodb_client = create_async_client([])
+    app.async_database = app.async_mongodb_client[config.DB_NAME]
+    replaced_routes = replace_routes(app.router, async_read_route.routes)
+    to_thread.current_default_thread_limiter().total_tokens = DEFAULT_THREADPOOL_SIZE
+    try:
+        await drive(min(total_requests, 200), concurrency)  # warm-up
+        return await drive(total_requests, concurrency)
+    finally:
+        replace_routes(app.router, replaced_routes)
+        app.async_mongodb_client.close()
+        app.mongodb_client.close()
+
+
+async def main(total_requests: int, concurrency: int):
+    seed(MongoClient(config.DB_URI)[config.DB_NAME])
+
+    baseline = await run_variant({}, DEFAULT_THREADPOOL_SIZE, total_requests, concurrency)
+    tuned = await run_variant(config.mongo_client_options(), config.THREADPOOL_SIZE, total_requests, concurrency)
+
+    print(f'default threadpool ({DEFAULT_THREADPOOL_SIZE}) and client options: {baseline:10.1f} req/s')
+    print(f'tuned threadpool ({config.THREADPOOL_SIZE}) and pool size ({config.DB_MAX_POOL_SIZE}): {tuned:10.1f} req/s')
+    if AsyncIOMotorClient is not None:
+        async_handlers = await run_async_variant(total_requests, concurrency)
+        print(f'async handlers on Motor, pool size ({config.DB_MAX_POOL_SIZE}): {async_handlers:10.1f} req/s')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--requests', type=int, default=5000)
+    parser.add_argument('--concurrency', type=int, default=200)
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.concurrency))
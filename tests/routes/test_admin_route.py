@@ -0,0 +1,157 @@
+import json
+import os
+from http import HTTPStatus
+from unittest import TestCase
+
+from fastapi.testclient import TestClient
+from pymongo import MongoClient
+
+from app.main import app
+from app.service.category_cache import category_cache
+from app.service.part_cache import part_cache
+from app.service.text_search_service import part_text_index
+from app.utils.exemplary_data_generator import generate_part_data
+from app.utils.indexes import ensure_indexes, index_advisor
+from app.utils.slow_queries import slow_query_log
+
+client = TestClient(app)
+
+
+class TestAdminRoute(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        app.mongodb_client = MongoClient(os.getenv("TEST_DB_URI"), event_listeners=[slow_query_log])
+        app.database = app.mongodb_client[os.getenv("TEST_DB_NAME")]
+
+    @classmethod
+    def setUp(cls):
+        app.mongodb_client.drop_database(os.getenv("TEST_DB_NAME"))
+        category_cache.invalidate()
+        part_text_index.invalidate()
+        part_cache.clear()
+        index_advisor.reset()
+        slow_query_log.reset()
+
+    @classmethod
+    def tearDownClass(cls):
+        index_advisor.enabled = False
+        slow_query_log.configure(enabled=False, threshold_ms=100, size=1000)
+        app.mongodb_client.drop_database(os.getenv("TEST_DB_NAME"))
+        app.mongodb_client.close()
+
+    def test_ensure_indexes_is_idempotent(self):
+        ensure_indexes(app.database)
+        ensure_indexes(app.database)
+
+        part_indexes = app.database.parts.index_information()
+        category_indexes = app.database.categories.index_information()
+        assert part_indexes['serial_number_unique']['unique']
+        assert 'location' in part_indexes
+        assert category_indexes['name_unique']['unique']
+        assert 'parent_name' in category_indexes
+
+    def test_index_advisor_reports_search_shapes(self):
+        index_advisor.enabled = True
+
+        client.get("/parts/search/", params={'category': 'subcategory_A'})
+        client.get("/parts/search/", params={'name': 'test_name', 'room': 'room_A'})
+
+        response = client.get("/admin/index-advisor")
+        assert response.status_code == HTTPStatus.OK
+
+        shapes = {tuple(shape['fields']): shape for shape in response.json()['shapes']}
+        assert shapes[('category',)]['covered']
+        assert shapes[('location.room', 'name')]['index'] == 'location'
+        assert shapes[('location.room', 'name')]['unindexed_fields'] == ['name']
+        assert not shapes[('location.room', 'name')]['covered']
+
+    def test_category_cache_serves_part_validation(self):
+        client.post("/categories/", json={
+            'name': 'category_A',
+            'parent_name': ''
+        })
+
+        client.post("/categories/", json={
+            'name': 'subcategory_A',
+            'parent_name': 'category_A'
+        })
+
+        hits_before = client.get("/admin/category-cache").json()['hits']
+        response = client.post("/parts/", json=generate_part_data(serial_number='1', category='subcategory_A'))
+        assert response.status_code == HTTPStatus.CREATED
+
+        stats = client.get("/admin/category-cache").json()
+        assert stats['loaded']
+        assert stats['size'] == 2
+        assert stats['hits'] == hits_before + 1
+
+    def test_category_cache_picks_up_categories_written_by_other_workers(self):
+        client.post("/categories/", json={
+            'name': 'category_A',
+            'parent_name': ''
+        })
+        app.database.categories.insert_one({'name': 'subcategory_A', 'parent_name': 'category_A'})
+
+        response = client.post("/parts/", json=generate_part_data(serial_number='1', category='subcategory_A'))
+        assert response.status_code == HTTPStatus.CREATED
+
+        app.database.categories.delete_one({'name': 'subcategory_A'})
+        rebuilt = client.post("/admin/category-cache/rebuild")
+        assert rebuilt.status_code == HTTPStatus.OK
+        assert rebuilt.json()['size'] == 1
+
+    def test_part_cache_stats(self):
+        client.post("/categories/", json={
+            'name': 'category_A',
+            'parent_name': ''
+        })
+
+        client.post("/categories/", json={
+            'name': 'subcategory_A',
+            'parent_name': 'category_A'
+        })
+
+        client.post("/parts/", json=generate_part_data(serial_number='1', category='subcategory_A'))
+        client.get("/parts/1")
+        client.get("/parts/1")
+        client.get("/parts/1")
+
+        stats = client.get("/admin/part-cache").json()
+        assert stats['size'] == 1
+        assert stats['hit_ratio'] > 0.5
+
+        assert client.delete("/admin/part-cache").status_code == HTTPStatus.NO_CONTENT
+        assert client.get("/admin/part-cache").json()['size'] == 0
+
+    def test_slow_query_log_reports_shapes_by_total_time(self):
+        slow_query_log.configure(enabled=True, threshold_ms=0, size=100)
+
+        client.get("/parts/search/", params={'name': 'name_A'})
+        client.get("/parts/search/", params={'name': 'name_B'})
+        client.get("/parts/1")
+
+        response = client.get("/admin/slow-queries")
+        assert response.status_code == HTTPStatus.OK
+        assert response.json()['threshold_ms'] == 0
+
+        shapes = {json.dumps(shape['shape'], sort_keys=True): shape for shape in response.json()['shapes']
+                  if shape['collection'] == 'parts' and shape['command'] == 'find'}
+        # no index starts with the name
+        by_name = shapes['{"query": {"name": "?"}}']
+        assert by_name['count'] == 2
+        assert by_name['total_ms'] >= by_name['max_ms']
+        assert by_name['plan']['collscan']
+
+        by_serial_number = shapes['{"query": {"serial_number": "?"}}']
+        assert not by_serial_number['plan']['collscan']
+        assert by_serial_number['plan']['indexes'] == ['serial_number_unique']
+
+        assert client.delete("/admin/slow-queries").status_code == HTTPStatus.NO_CONTENT
+        assert client.get("/admin/slow-queries").json()['shapes'] == []
+
+    def test_slow_query_log_skips_fast_queries(self):
+        slow_query_log.configure(enabled=True, threshold_ms=60000, size=100)
+
+        client.get("/parts/search/", params={'category': 'subcategory_A'})
+
+        assert client.get("/admin/slow-queries").json()['shapes'] == []
@@ -0,0 +1,119 @@
+import os
+from http import HTTPStatus
+from unittest import TestCase
+from unittest.mock import patch
+
+from fastapi.testclient import TestClient
+from pymongo import MongoClient
+
+from app import config
+from app.main import app
+from app.service.category_cache import category_cache
+from app.service.part_cache import part_cache
+from app.service.text_search_service import part_text_index
+from app.utils.exemplary_data_generator import generate_part_data
+from app.utils.indexes import ensure_indexes
+
+client = TestClient(app)
+
+
+class TestAnalyticsRoute(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        app.mongodb_client = MongoClient(os.getenv("TEST_DB_URI"))
+        app.database = app.mongodb_client[os.getenv("TEST_DB_NAME")]
+
+    @classmethod
+    def setUp(cls):
+        app.mongodb_client.drop_database(os.getenv("TEST_DB_NAME"))
+        category_cache.invalidate()
+        part_text_index.invalidate()
+        part_cache.clear()
+
+    @classmethod
+    def tearDownClass(cls):
+        app.mongodb_client.drop_database(os.getenv("TEST_DB_NAME"))
+        app.mongodb_client.close()
+
+    def create_parts(self):
+        client.post("/categories/", json={
+            'name': 'category_A',
+            'parent_name': ''
+        })
+
+        client.post("/categories/", json={
+            'name': 'subcategory_A1',
+            'parent_name': 'category_A'
+        })
+
+        client.post("/categories/", json={
+            'name': 'sub_subcategory_A1',
+            'parent_name': 'subcategory_A1'
+        })
+
+        client.post("/parts/", json={**generate_part_data(serial_number='1', category='subcategory_A1'),
+                                     'quantity': 2, 'price': 10.0})
+        client.post("/parts/", json={**generate_part_data(serial_number='2', category='sub_subcategory_A1'),
+                                     'quantity': 3, 'price': 5.5})
+
+    def assert_valuation(self, source: str, expected_value: float):
+        response = client.get("/analytics/valuation", params={'source': source})
+        assert response.status_code == HTTPStatus.OK
+
+        report = response.json()
+        categories = {category['name']: category for category in report['categories']}
+        assert report['value'] == expected_value
+        assert categories['category_A']['value'] == 0
+        assert categories['category_A']['total_value'] == expected_value
+        assert categories['sub_subcategory_A1']['units'] == 3
+        return categories
+
+    def test_valuation_rolls_up_category_tree(self):
+        self.create_parts()
+
+        categories = self.assert_valuation('aggregate', 36.5)
+        assert categories['subcategory_A1']['value'] == 20.0
+        assert categories['subcategory_A1']['total_units'] == 5
+        assert categories['subcategory_A1']['total_parts'] == 2
+
+    def test_running_totals_follow_part_writes(self):
+        with patch.object(config, 'VALUATION_RUNNING_TOTALS', True):
+            self.create_parts()
+            self.assert_valuation('running', 36.5)
+
+            client.post("/parts/1/movements", json={'delta': -1})
+            client.put("/parts/2", json={'price': 6.0})
+            self.assert_valuation('running', 28.0)
+
+            client.delete("/parts/1")
+            self.assert_valuation('running', 18.0)
+            self.assert_valuation('aggregate', 18.0)
+
+            app.database.category_totals.drop()
+            assert client.post("/analytics/valuation/rebuild").status_code == HTTPStatus.NO_CONTENT
+            self.assert_valuation('running', 18.0)
+
+    def test_running_totals_follow_rename_to_deleted_category(self):
+        ensure_indexes(app.database)
+        with patch.object(config, 'VALUATION_RUNNING_TOTALS', True):
+            client.post("/categories/", json={'name': 'category_A', 'parent_name': ''})
+            client.post("/categories/", json={'name': 'subcategory_X', 'parent_name': 'category_A'})
+            client.post("/categories/", json={'name': 'subcategory_Y', 'parent_name': 'category_A'})
+            client.post("/parts/", json={**generate_part_data(serial_number='1', category='subcategory_X'),
+                                         'quantity': 2, 'price': 10.0})
+
+            # subcategory_X keeps a zeroed totals row after its only part moves out and it is deleted
+            client.put("/parts/1", json={'category': 'subcategory_Y'})
+            assert client.delete("/categories/subcategory_X").status_code == HTTPStatus.NO_CONTENT
+
+            response = client.put("/categories/subcategory_Y", json={'name': 'subcategory_X'})
+            assert response.status_code == HTTPStatus.OK
+            report = client.get("/analytics/valuation", params={'source': 'running'}).json()
+            categories = {category['name']: category for category in report['categories']}
+            assert categories['subcategory_X']['value'] == 20.0
+            assert categories['category_A']['total_value'] == 20.0
+            assert app.database.category_totals.count_documents({'category': 'subcategory_Y'}) == 0
+
+    def test_running_totals_disabled(self):
+        response = client.get("/analytics/valuation", params={'source': 'running'})
+        assert response.status_code == HTTPStatus.BAD_REQUEST
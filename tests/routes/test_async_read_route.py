@@ -0,0 +1,83 @@
+import os
+import time
+from http import HTTPStatus
+from unittest import TestCase, mock, skipIf
+
+from fastapi.testclient import TestClient
+
+from app import config
+from app.main import app
+from app.service.category_cache import category_cache
+from app.service.part_cache import part_cache
+from app.service.text_search_service import part_text_index
+from app.utils.async_db import AsyncIOMotorClient
+from app.utils.exemplary_data_generator import generate_part_data
+from app.utils.startup import startup_state
+
+
+@skipIf(AsyncIOMotorClient is None, "DB_ASYNC requires the motor package")
+class TestAsyncReadRoute(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.patches = [mock.patch.object(config, 'DB_ASYNC', True),
+                       mock.patch.object(config, 'DB_URI', os.getenv("TEST_DB_URI")),
+                       mock.patch.object(config, 'DB_NAME', os.getenv("TEST_DB_NAME"))]
+        for patch in cls.patches:
+            patch.start()
+        # the lifespan runs once, so the Motor client stays bound to the event loop of this client
+        cls.client = TestClient(app)
+        cls.client.__enter__()
+        while not startup_state.ready and startup_state.error is None:
+            time.sleep(0.05)
+
+    @classmethod
+    def setUp(cls):
+        app.mongodb_client.drop_database(os.getenv("TEST_DB_NAME"))
+        category_cache.invalidate()
+        part_text_index.invalidate()
+        part_cache.clear()
+
+    @classmethod
+    def tearDownClass(cls):
+        app.mongodb_client.drop_database(os.getenv("TEST_DB_NAME"))
+        cls.client.__exit__(None, None, None)
+        for patch in cls.patches:
+            patch.stop()
+
+    def test_read_routes_are_served_by_async_handlers(self):
+        client = self.client
+        client.post("/categories/", json={
+            'name': 'category_A',
+            'parent_name': ''
+        })
+        client.post("/categories/", json={
+            'name': 'subcategory_A1',
+            'parent_name': 'category_A'
+        })
+        client.post("/parts/", json=generate_part_data('1', 'subcategory_A1'))
+        client.post("/parts/", json=generate_part_data('2', 'subcategory_A1'))
+
+        # POST /parts/ shares the path and stays synchronous
+        get_parts = next(route for route in app.router.routes
+                         if route.path == '/parts/' and 'GET' in getattr(route, 'methods', ()))
+        assert get_parts.endpoint.__module__ == 'app.routes.async_read_route'
+        response = client.get("/parts/1")
+        assert response.json() == generate_part_data('1', 'subcategory_A1')
+        assert client.get("/parts/1", headers={'If-None-Match': response.headers['etag']}).status_code == \
+            HTTPStatus.NOT_MODIFIED
+        assert client.get("/parts/3").status_code == HTTPStatus.NOT_FOUND
+
+        response = client.get("/parts/", params={'limit': 1})
+        assert [part['serial_number'] for part in response.json()] == ['1']
+        assert response.headers['x-next-after'] == '1'
+        response = client.get("/parts/", headers={'Accept': 'application/x-ndjson'})
+        assert len(response.text.splitlines()) == 2
+
+        response = client.post("/parts/batch-get", json={'serial_numbers': ['2', '3'], 'fields': 'quantity'})
+        assert response.json() == [{'serial_number': '2', 'found': True, 'part': {'quantity': 10}},
+                                   {'serial_number': '3', 'found': False, 'part': None}]
+
+        assert client.get("/categories/subcategory_A1").json() == {'name': 'subcategory_A1', 'parent_name': 'category_A'}
+        assert [category['name'] for category in client.get("/categories/").json()] == ['category_A', 'subcategory_A1']
+        # routes between them keep their order
+        assert client.get("/parts/changes").status_code == HTTPStatus.OK
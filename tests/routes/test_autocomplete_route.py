@@ -0,0 +1,130 @@
+import os
+from http import HTTPStatus
+from unittest import TestCase, mock
+
+from fastapi.testclient import TestClient
+from pymongo import MongoClient
+
+from app import config
+from app.main import app
+from app.service import autocomplete_service
+from app.service.autocomplete_service import autocomplete_index
+from app.service.category_cache import category_cache
+from app.service.part_cache import part_cache
+from app.service.text_search_service import part_text_index
+from app.utils.exemplary_data_generator import generate_part_data
+from app.utils.prefix_index import PrefixIndex
+
+client = TestClient(app)
+
+
+class TestAutocompleteRoute(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        app.mongodb_client = MongoClient(os.getenv("TEST_DB_URI"))
+        app.database = app.mongodb_client[os.getenv("TEST_DB_NAME")]
+
+    @classmethod
+    def setUp(cls):
+        app.mongodb_client.drop_database(os.getenv("TEST_DB_NAME"))
+        category_cache.invalidate()
+        part_text_index.invalidate()
+        part_cache.clear()
+        autocomplete_index.invalidate()
+        client.post("/categories/", json={
+            'name': 'category_A',
+            'parent_name': ''
+        })
+        client.post("/categories/", json={
+            'name': 'subcategory_A1',
+            'parent_name': 'category_A'
+        })
+
+    @classmethod
+    def tearDownClass(cls):
+        app.mongodb_client.drop_database(os.getenv("TEST_DB_NAME"))
+        app.mongodb_client.close()
+
+    def add_part(self, serial_number: str, name: str):
+        part = generate_part_data(serial_number, 'subcategory_A1')
+        part['name'] = name
+        client.post("/parts/", json=part)
+
+    def test_autocomplete_part_names_and_serial_numbers(self):
+        self.add_part('SN-100', 'Bolt M4')
+        self.add_part('SN-101', 'bolt M5')
+        self.add_part('SN-200', 'Bolt M4')
+        self.add_part('SN-300', 'Nut M4')
+
+        response = client.get("/autocomplete", params={'field': 'name', 'prefix': 'BOL'})
+        assert response.status_code == HTTPStatus.OK
+        # distinct values, ignoring case
+        assert response.json() == ['Bolt M4', 'bolt M5']
+        assert client.get("/autocomplete", params={'field': 'serial_number', 'prefix': 'SN-1'}).json() == [
+            'SN-100', 'SN-101']
+        assert client.get("/autocomplete", params={'field': 'serial_number', 'prefix': 'SN', 'limit': 1}).json() == [
+            'SN-100']
+
+    def test_autocomplete_is_kept_current_by_writes(self):
+        self.add_part('SN-100', 'Bolt M4')
+        self.add_part('SN-200', 'Bolt M4')
+        assert client.get("/autocomplete", params={'field': 'name', 'prefix': 'b'}).json() == ['Bolt M4']
+
+        client.put("/parts/SN-100", json={'name': 'Washer'})
+        assert client.get("/autocomplete", params={'field': 'name', 'prefix': 'b'}).json() == ['Bolt M4']
+        client.delete("/parts/SN-200")
+        assert client.get("/autocomplete", params={'field': 'name', 'prefix': 'b'}).json() == []
+        assert client.get("/autocomplete", params={'field': 'name', 'prefix': 'w'}).json() == ['Washer']
+        assert client.get("/autocomplete", params={'field': 'serial_number', 'prefix': 'SN'}).json() == ['SN-100']
+
+        assert client.get("/autocomplete", params={'field': 'category', 'prefix': 'sub'}).json() == ['subcategory_A1']
+        client.put("/categories/subcategory_A1", json={'name': 'subcategory_B1'})
+        client.post("/categories/", json={
+            'name': 'subcategory_A2',
+            'parent_name': 'category_A'
+        })
+        assert client.get("/autocomplete", params={'field': 'category', 'prefix': 'sub'}).json() == [
+            'subcategory_A2', 'subcategory_B1']
+
+    def test_autocomplete_from_database_when_index_overflows(self):
+        self.add_part('SN-100', 'Bolt M4')
+        self.add_part('SN-200', 'Nut M4')
+
+        with mock.patch.object(config, 'AUTOCOMPLETE_MAX_ENTRIES', 1):
+            assert client.get("/autocomplete", params={'field': 'name', 'prefix': 'n'}).json() == ['Nut M4']
+        assert client.get("/admin/autocomplete").json()['name'] == {'entries': 0, 'overflowed': True}
+
+    def test_autocomplete_serial_numbers_from_index_when_index_overflows(self):
+        self.add_part('SN-100', 'Bolt M4')
+        self.add_part('SN-101', 'Bolt M5')
+        self.add_part('SN-200', 'Nut M4')
+
+        with mock.patch.object(config, 'AUTOCOMPLETE_MAX_ENTRIES', 1):
+            assert client.get("/autocomplete", params={'field': 'serial_number', 'prefix': 'SN-1'}).json() == [
+                'SN-100', 'SN-101']
+        assert client.get("/admin/autocomplete").json()['serial_number'] == {'entries': 0, 'overflowed': True}
+        assert client.get("/autocomplete", params={'field': 'serial_number', 'prefix': 'SN', 'limit': 1}).json() == [
+            'SN-100']
+        # the index is searched case-sensitively
+        assert client.get("/autocomplete", params={'field': 'serial_number', 'prefix': 'sn'}).json() == []
+
+    def test_autocomplete_build_sees_writes_during_the_scan(self):
+        self.add_part('SN-100', 'Bolt M4')
+        self.add_part('SN-200', 'Nut M4')
+        scanned = []
+
+        class RacingPrefixIndex(PrefixIndex):
+            def add_all(self, values):
+                super().add_all(values)
+                scanned.append(len(self))
+                if len(scanned) == 1:
+                    # deleted after the scan read it, before the index is registered
+                    client.delete("/parts/SN-200")
+
+        with mock.patch.object(autocomplete_service, 'PrefixIndex', RacingPrefixIndex):
+            assert autocomplete_index.get(app.database, 'name').complete('n', 10) == []
+        assert scanned == [2, 1]
+
+    def test_reject_unknown_autocomplete_field(self):
+        response = client.get("/autocomplete", params={'field': 'description', 'prefix': 'b'})
+        assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
@@ -1,31 +1,67 @@
+import json
 import os
 from http import HTTPStatus
-from unittest import TestCase
+from unittest import TestCase, mock
 
 from fastapi.testclient import TestClient
-from pymongo import MongoClient
+from pymongo import MongoClient, monitoring
 
 from app.main import app
+from app.service.category_cache import category_cache
+from app.service.part_cache import part_cache
+from app.service.text_search_service import part_text_index
 from app.utils.exemplary_data_generator import generate_part_data
+from app.utils.indexes import ensure_indexes
 
 client = TestClient(app)
 
 
+class CommandCounter(monitoring.CommandListener):
+    def __init__(self):
+        self.commands = []
+
+    def started(self, event):
+        self.commands.append(event.command_name)
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+
+command_counter = CommandCounter()
+
+
 class TestCategoryRoute(TestCase):
     @classmethod
     def setUpClass(cls):
-        app.mongodb_client = MongoClient(os.getenv("TEST_DB_URI"))
+        app.mongodb_client = MongoClient(os.getenv("TEST_DB_URI"), event_listeners=[command_counter])
         app.database = app.mongodb_client[os.getenv("TEST_DB_NAME")]
 
     @classmethod
     def setUp(cls):
         app.mongodb_client.drop_database(os.getenv("TEST_DB_NAME"))
+        category_cache.invalidate()
+        part_text_index.invalidate()
+        part_cache.clear()
 
     @classmethod
     def tearDownClass(cls):
         app.mongodb_client.drop_database(os.getenv("TEST_DB_NAME"))
         app.mongodb_client.close()
 
+    def test_add_category_racing_with_the_same_name(self):
+        ensure_indexes(app.database)
+        category = {'name': 'category_A', 'parent_name': ''}
+        assert client.post("/categories/", json=category).status_code == HTTPStatus.CREATED
+
+        # the other request passed the existence check before this one inserted the category
+        with mock.patch('app.routes.category_route.ensure_that_category_does_not_exist'):
+            response = client.post("/categories/", json=category)
+        assert response.status_code == HTTPStatus.CONFLICT
+        assert app.database.categories.count_documents({}) == 1
+
     def test_add_categories(self):
         response = client.post("/categories/", json={
             'name': 'category_A',
@@ -264,3 +300,264 @@ class TestCategoryRoute(TestCase):
         assert result.status_code == HTTPStatus.NO_CONTENT
         response = client.get("/categories/subcategory_A")
         assert response.json()['parent_name'] == ''
+
+    def test_get_all_categories_paginated(self):
+        client.post("/categories/", json={
+            'name': 'category_A',
+            'parent_name': ''
+        })
+
+        client.post("/categories/", json={
+            'name': 'category_B',
+            'parent_name': ''
+        })
+
+        client.post("/categories/", json={
+            'name': 'category_C',
+            'parent_name': ''
+        })
+
+        first_page = client.get("/categories/", params={'limit': 2})
+        assert first_page.status_code == HTTPStatus.OK
+        assert [category['name'] for category in first_page.json()] == ['category_A', 'category_B']
+
+        second_page = client.get("/categories/", params={'after': first_page.headers['X-Next-After'], 'limit': 2})
+        assert [category['name'] for category in second_page.json()] == ['category_C']
+
+    def test_get_all_categories_as_ndjson(self):
+        client.post("/categories/", json={
+            'name': 'category_A',
+            'parent_name': ''
+        })
+
+        response = client.get("/categories/", headers={'Accept': 'application/x-ndjson'})
+        assert response.status_code == HTTPStatus.OK
+        assert response.headers['content-type'] == 'application/x-ndjson'
+        assert [json.loads(line)['name'] for line in response.text.splitlines()] == ['category_A']
+
+    def test_get_category_tree(self):
+        client.post("/categories/", json={
+            'name': 'category_A',
+            'parent_name': ''
+        })
+
+        client.post("/categories/", json={
+            'name': 'subcategory',
+            'parent_name': 'category_A'
+        })
+
+        client.post("/categories/", json={
+            'name': 'sub_subcategory',
+            'parent_name': 'subcategory'
+        })
+
+        response = client.get("/categories/category_A/tree")
+        assert response.status_code == HTTPStatus.OK
+        assert response.json() == {
+            'name': 'category_A',
+            'parent_name': '',
+            'children': [{
+                'name': 'subcategory',
+                'parent_name': 'category_A',
+                'children': [{'name': 'sub_subcategory', 'parent_name': 'subcategory', 'children': []}]
+            }]
+        }
+
+        assert client.get("/categories/category_Z/tree").status_code == HTTPStatus.NOT_FOUND
+
+    def test_ancestors_follow_rename_move_and_delete(self):
+        client.post("/categories/", json={
+            'name': 'category_A',
+            'parent_name': ''
+        })
+
+        client.post("/categories/", json={
+            'name': 'category_B',
+            'parent_name': ''
+        })
+
+        client.post("/categories/", json={
+            'name': 'subcategory',
+            'parent_name': 'category_A'
+        })
+
+        client.post("/categories/", json={
+            'name': 'sub_subcategory',
+            'parent_name': 'subcategory'
+        })
+
+        def ancestors(name):
+            return app.database.categories.find_one({'name': name})['ancestors']
+
+        assert ancestors('sub_subcategory') == ['category_A', 'subcategory']
+
+        client.put("/categories/subcategory", json={'name': 'subcategory_renamed'})
+        assert ancestors('sub_subcategory') == ['category_A', 'subcategory_renamed']
+
+        client.put("/categories/subcategory_renamed", json={'parent_name': 'category_B'})
+        assert ancestors('subcategory_renamed') == ['category_B']
+        assert ancestors('sub_subcategory') == ['category_B', 'subcategory_renamed']
+
+        client.delete("/categories/subcategory_renamed")
+        assert ancestors('sub_subcategory') == ['category_B']
+        assert client.get("/categories/sub_subcategory").json()['parent_name'] == 'category_B'
+
+    def test_delete_category_with_children_written_by_another_worker(self):
+        client.post("/categories/", json={
+            'name': 'category_A',
+            'parent_name': ''
+        })
+
+        client.post("/categories/", json={
+            'name': 'subcategory',
+            'parent_name': 'category_A'
+        })
+        # children inserted by another worker are missing from the category cache of this one
+        app.database.categories.insert_many([
+            {'name': 'child_1', 'parent_name': 'subcategory', 'ancestors': ['category_A', 'subcategory']},
+            {'name': 'child_2', 'parent_name': 'subcategory', 'ancestors': ['category_A', 'subcategory']}])
+        app.database.parts.insert_one(generate_part_data(serial_number='1', category='child_2'))
+
+        response = client.delete("/categories/subcategory")
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+
+        app.database.parts.delete_one({'serial_number': '1'})
+        assert client.delete("/categories/subcategory").status_code == HTTPStatus.NO_CONTENT
+        assert client.get("/categories/child_1").json()['parent_name'] == 'category_A'
+
+    def test_store_path_written_by_another_worker(self):
+        client.post("/categories/", json={
+            'name': 'category_A',
+            'parent_name': ''
+        })
+
+        client.post("/categories/", json={
+            'name': 'category_B',
+            'parent_name': ''
+        })
+
+        client.post("/categories/", json={
+            'name': 'subcategory',
+            'parent_name': 'category_A'
+        })
+
+        # moved by another worker, the category cache of this one still has the old parent
+        app.database.categories.update_one({'name': 'subcategory'},
+                                           {'$set': {'parent_name': 'category_B', 'ancestors': ['category_B']}})
+
+        client.post("/categories/", json={
+            'name': 'sub_subcategory',
+            'parent_name': 'subcategory'
+        })
+        assert app.database.categories.find_one({'name': 'sub_subcategory'})['ancestors'] == ['category_B', 'subcategory']
+
+    def test_reject_moving_category_under_its_child(self):
+        client.post("/categories/", json={
+            'name': 'category_A',
+            'parent_name': ''
+        })
+
+        client.post("/categories/", json={
+            'name': 'subcategory',
+            'parent_name': 'category_A'
+        })
+
+        response = client.put("/categories/category_A", json={'parent_name': 'subcategory'})
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+
+    def insert_wide_category(self, children_count: int):
+        client.post("/categories/", json={
+            'name': 'category_A',
+            'parent_name': ''
+        })
+
+        client.post("/categories/", json={
+            'name': 'subcategory',
+            'parent_name': 'category_A'
+        })
+
+        app.database.categories.insert_many([
+            {'name': f'child_{number}', 'parent_name': 'subcategory', 'ancestors': ['category_A', 'subcategory']}
+            for number in range(children_count)])
+        command_counter.commands.clear()
+
+    def test_rename_category_with_thousands_of_children_in_constant_round_trips(self):
+        self.insert_wide_category(children_count=3000)
+
+        response = client.put("/categories/subcategory", json={'name': 'subcategory_renamed'})
+        assert response.status_code == HTTPStatus.OK
+        # 4 of them log the changes, 1 reads the children
+        assert len(command_counter.commands) <= 13
+
+        assert app.database.categories.count_documents({'parent_name': 'subcategory_renamed'}) == 3000
+        assert app.database.categories.count_documents({'ancestors': 'subcategory_renamed'}) == 3000
+        assert app.database.categories.count_documents({'parent_name': 'subcategory'}) == 0
+
+    def test_delete_category_with_thousands_of_children_in_constant_round_trips(self):
+        self.insert_wide_category(children_count=3000)
+
+        response = client.delete("/categories/subcategory")
+        assert response.status_code == HTTPStatus.NO_CONTENT
+        # 4 of them log the changes, 1 reads the children
+        assert len(command_counter.commands) <= 13
+
+        assert app.database.categories.count_documents({'parent_name': 'category_A'}) == 3000
+        assert app.database.categories.count_documents({'ancestors': 'subcategory'}) == 0
+
+    def test_rename_category_updates_children_and_parts(self):
+        client.post("/categories/", json={
+            'name': 'category_A',
+            'parent_name': ''
+        })
+
+        client.post("/categories/", json={
+            'name': 'subcategory',
+            'parent_name': 'category_A'
+        })
+
+        part_data = generate_part_data(serial_number='111', category='subcategory')
+        client.post("/parts/", json=part_data)
+
+        response = client.put("/categories/category_A", json={'name': 'category_B'})
+        assert response.status_code == HTTPStatus.OK
+        assert client.get("/categories/subcategory").json()['parent_name'] == 'category_B'
+
+        client.put("/categories/subcategory", json={'name': 'subcategory_renamed'})
+        assert client.get("/parts/111").json()['category'] == 'subcategory_renamed'
+
+    def test_reject_rename_to_existing_category(self):
+        client.post("/categories/", json={
+            'name': 'category_A',
+            'parent_name': ''
+        })
+
+        client.post("/categories/", json={
+            'name': 'category_B',
+            'parent_name': ''
+        })
+
+        response = client.put("/categories/category_A", json={'name': 'category_B'})
+        assert response.status_code == HTTPStatus.CONFLICT
+
+    def test_category_changes_of_rename_and_delete(self):
+        client.post("/categories/", json={
+            'name': 'category_A',
+            'parent_name': ''
+        })
+        client.post("/categories/", json={
+            'name': 'subcategory_A1',
+            'parent_name': 'category_A'
+        })
+        since = client.get("/categories/changes").json()['next_since']
+
+        client.put("/categories/category_A", json={'name': 'category_B'})
+        changes = client.get("/categories/changes", params={'since': since}).json()['changes']
+        assert [(change['key'], change['deleted']) for change in changes] == [
+            ('category_B', False), ('category_A', True), ('subcategory_A1', False)]
+        assert changes[2]['document'] == {'name': 'subcategory_A1', 'parent_name': 'category_B'}
+
+        client.delete("/categories/category_B")
+        changes = client.get("/categories/changes", params={'since': changes[-1]['seq']}).json()['changes']
+        assert [(change['key'], change['deleted']) for change in changes] == [
+            ('category_B', True), ('subcategory_A1', False)]
+        assert changes[1]['document']['parent_name'] == ''
@@ -0,0 +1,95 @@
+import os
+from unittest import TestCase, mock
+
+from fastapi.testclient import TestClient
+from pymongo import MongoClient
+from starlette.websockets import WebSocketDisconnect
+
+from app import config
+from app.main import app
+from app.service.category_cache import category_cache
+from app.service.part_cache import part_cache
+from app.service.part_events import part_event_broker
+from app.service.text_search_service import part_text_index
+from app.utils.exemplary_data_generator import generate_part_data
+
+client = TestClient(app)
+
+
+class TestEventRoute(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        app.mongodb_client = MongoClient(os.getenv("TEST_DB_URI"))
+        app.database = app.mongodb_client[os.getenv("TEST_DB_NAME")]
+
+    @classmethod
+    def setUp(cls):
+        app.mongodb_client.drop_database(os.getenv("TEST_DB_NAME"))
+        category_cache.invalidate()
+        part_text_index.invalidate()
+        part_cache.clear()
+        client.post("/categories/", json={
+            'name': 'category_A',
+            'parent_name': ''
+        })
+        client.post("/categories/", json={
+            'name': 'subcategory_A1',
+            'parent_name': 'category_A'
+        })
+        client.post("/categories/", json={
+            'name': 'subcategory_A2',
+            'parent_name': 'category_A'
+        })
+
+    @classmethod
+    def tearDownClass(cls):
+        app.mongodb_client.drop_database(os.getenv("TEST_DB_NAME"))
+        app.mongodb_client.close()
+
+    def test_push_coalesced_changes_of_subscribed_category(self):
+        with mock.patch.object(config, 'PART_EVENTS_COALESCE_MS', 500), \
+                client.websocket_connect("/parts/events?category=subcategory_A1") as websocket:
+            client.post("/parts/", json=generate_part_data('1', 'subcategory_A2'))
+            client.post("/parts/", json=generate_part_data('2', 'subcategory_A1'))
+            client.put("/parts/2", json={'quantity': 5})
+            client.put("/parts/2", json={'quantity': 7})
+
+            events = websocket.receive_json()
+            assert [(event['event'], event['serial_number']) for event in events] == [('part_changed', '2')]
+            assert events[0]['part']['quantity'] == 7
+
+            client.delete("/parts/2")
+            assert websocket.receive_json() == [{'event': 'part_deleted', 'serial_number': '2', 'part': None}]
+        assert part_event_broker.subscriptions() == 0
+
+    def test_push_changes_of_location_prefix_and_serial_numbers(self):
+        part = generate_part_data('1', 'subcategory_A1')
+        part['location']['room'] = 'room_A'
+        with mock.patch.object(config, 'PART_EVENTS_COALESCE_MS', 0), \
+                client.websocket_connect("/parts/events?room=room_A&serial_number=1&serial_number=2") as websocket:
+            client.post("/parts/", json=generate_part_data('2', 'subcategory_A1'))
+            client.post("/parts/", json=part)
+            assert [event['serial_number'] for event in websocket.receive_json()] == ['1']
+
+    def test_overflow_when_client_falls_behind(self):
+        with mock.patch.object(config, 'PART_EVENTS_COALESCE_MS', 300), \
+                mock.patch.object(config, 'PART_EVENTS_MAX_PENDING', 2), \
+                client.websocket_connect("/parts/events") as websocket:
+            client.post("/parts/bulk", json=[generate_part_data(str(number), 'subcategory_A1') for number in range(3)])
+            assert websocket.receive_json() == [{'event': 'overflow'}]
+
+    def test_follow_renamed_category(self):
+        with mock.patch.object(config, 'PART_EVENTS_COALESCE_MS', 0), \
+                client.websocket_connect("/parts/events?category=subcategory_A1") as websocket:
+            client.put("/categories/subcategory_A1", json={'name': 'subcategory_B1'})
+            assert websocket.receive_json() == [
+                {'event': 'category_renamed', 'category': 'subcategory_A1', 'new_name': 'subcategory_B1'}]
+
+            client.post("/parts/", json=generate_part_data('1', 'subcategory_B1'))
+            assert websocket.receive_json()[0]['serial_number'] == '1'
+
+    def test_reject_location_prefix_with_gap(self):
+        with self.assertRaises(WebSocketDisconnect) as raised:
+            with client.websocket_connect("/parts/events?room=room_A&shelf=shelf_A"):
+                pass
+        assert raised.exception.code == 1008
@@ -0,0 +1,111 @@
+import csv
+import gzip
+import io
+import json
+import os
+from http import HTTPStatus
+from unittest import TestCase, mock, skipUnless
+
+from fastapi.testclient import TestClient
+from pymongo import MongoClient
+
+from app.main import app
+from app.service.category_cache import category_cache
+from app.service.part_cache import part_cache
+from app.service.text_search_service import part_text_index
+from app.utils import export
+from app.utils.exemplary_data_generator import generate_part_data
+
+client = TestClient(app)
+
+
+class TestExportRoute(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        app.mongodb_client = MongoClient(os.getenv("TEST_DB_URI"))
+        app.database = app.mongodb_client[os.getenv("TEST_DB_NAME")]
+
+    @classmethod
+    def setUp(cls):
+        app.mongodb_client.drop_database(os.getenv("TEST_DB_NAME"))
+        category_cache.invalidate()
+        part_text_index.invalidate()
+        part_cache.clear()
+
+        client.post("/categories/", json={
+            'name': 'category_A',
+            'parent_name': ''
+        })
+
+        client.post("/categories/", json={
+            'name': 'subcategory_A1',
+            'parent_name': 'category_A'
+        })
+
+        client.post("/parts/bulk", json=[generate_part_data(serial_number=str(number), category='subcategory_A1')
+                                         for number in range(10, 40)])
+
+    @classmethod
+    def tearDownClass(cls):
+        app.mongodb_client.drop_database(os.getenv("TEST_DB_NAME"))
+        app.mongodb_client.close()
+
+    def test_export_parts_as_gzipped_csv(self):
+        # small chunks, so the export is written and compressed in several pieces
+        with mock.patch.object(export, 'EXPORT_CHUNK_SIZE', 256):
+            response = client.get("/export/parts")
+        assert response.status_code == HTTPStatus.OK
+        assert response.headers['content-type'] == 'application/gzip'
+        assert 'filename="parts.csv.gz"' in response.headers['content-disposition']
+
+        rows = list(csv.DictReader(io.StringIO(gzip.decompress(response.content).decode())))
+        assert len(rows) == 30
+        assert [row['serial_number'] for row in rows] == [str(number) for number in range(10, 40)]
+        assert rows[0] == {
+            'serial_number': '10', 'name': 'test_name', 'description': 'test_description',
+            'category': 'subcategory_A1', 'quantity': '10', 'price': '19.99',
+            'location.room': 'test_room', 'location.bookcase': 'test_bookcase', 'location.shelf': 'test_shelf',
+            'location.cuvette': 'test_cuvette', 'location.column': '7', 'location.row': '13'}
+
+    def test_export_parts_as_ndjson(self):
+        response = client.get("/export/parts", params={'format': 'ndjson', 'compression': 'none'})
+        assert response.status_code == HTTPStatus.OK
+        assert 'filename="parts.ndjson"' in response.headers['content-disposition']
+
+        parts = [json.loads(line) for line in response.text.splitlines()]
+        assert parts[0] == generate_part_data(serial_number='10', category='subcategory_A1')
+        assert len(parts) == 30
+
+    def test_export_categories_as_csv(self):
+        response = client.get("/export/categories", params={'compression': 'none'})
+        assert response.status_code == HTTPStatus.OK
+        assert response.text.splitlines() == ['name,parent_name', 'category_A,', 'subcategory_A1,category_A']
+
+    def test_reject_unknown_export_format(self):
+        response = client.get("/export/parts", params={'format': 'xml'})
+        assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
+
+    @skipUnless(export.zstandard, "zstandard is not installed")
+    def test_export_parts_as_zstd_csv(self):
+        response = client.get("/export/parts", params={'compression': 'zstd'})
+        assert response.status_code == HTTPStatus.OK
+        content = export.zstandard.ZstdDecompressor().decompressobj().decompress(response.content).decode()
+        assert len(content.splitlines()) == 31
+
+    def test_reject_zstd_without_zstandard(self):
+        with mock.patch.object(export, 'zstandard', None):
+            response = client.get("/export/parts", params={'compression': 'zstd'})
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+
+    @skipUnless(export.pyarrow, "pyarrow is not installed")
+    def test_export_parts_as_parquet(self):
+        with mock.patch.object(export, 'PARQUET_ROW_GROUP_SIZE', 7):
+            response = client.get("/export/parts", params={'format': 'parquet', 'compression': 'zstd'})
+        assert response.status_code == HTTPStatus.OK
+
+        parquet_file = export.pyarrow.parquet.ParquetFile(io.BytesIO(response.content))
+        assert parquet_file.metadata.num_row_groups == 5
+        table = parquet_file.read()
+        assert table.num_rows == 30
+        assert table.column('location.row').to_pylist() == [13] * 30
+        assert table.column('serial_number').to_pylist()[:2] == ['10', '11']
@@ -0,0 +1,67 @@
+import os
+from http import HTTPStatus
+from unittest import TestCase
+
+from fastapi.testclient import TestClient
+from pymongo import MongoClient
+
+from app.main import app, database_startup_steps
+from app.service.category_cache import category_cache
+from app.service.part_cache import part_cache
+from app.service.text_search_service import part_text_index
+from app.utils.startup import startup_state
+
+client = TestClient(app)
+
+
+def failing_step():
+    raise RuntimeError("unreachable")
+
+
+class TestHealthRoute(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        app.mongodb_client = MongoClient(os.getenv("TEST_DB_URI"))
+        app.database = app.mongodb_client[os.getenv("TEST_DB_NAME")]
+
+    @classmethod
+    def setUp(cls):
+        app.mongodb_client.drop_database(os.getenv("TEST_DB_NAME"))
+        category_cache.invalidate()
+        part_text_index.invalidate()
+        part_cache.clear()
+        startup_state.reset()
+
+    @classmethod
+    def tearDownClass(cls):
+        startup_state.reset()
+        category_cache.invalidate()
+        app.mongodb_client.drop_database(os.getenv("TEST_DB_NAME"))
+        app.mongodb_client.close()
+
+    def test_live_before_startup_finishes(self):
+        response = client.get("/health/live")
+        assert response.status_code == HTTPStatus.OK
+
+        response = client.get("/health/ready")
+        assert response.status_code == HTTPStatus.SERVICE_UNAVAILABLE
+        assert response.json()['status'] == 'starting'
+
+    def test_ready_after_database_startup_steps(self):
+        startup_state.run(database_startup_steps(app.mongodb_client, app.database))
+
+        response = client.get("/health/ready")
+        assert response.status_code == HTTPStatus.OK
+        assert response.json()['status'] == 'ready'
+        assert {'warm_up_connection_pool', 'ensure_indexes', 'seed_exemplary_data',
+                'rebuild_category_cache'} <= set(response.json()['steps_seconds'])
+        assert app.database.demo_config.find_one()['has_inserted_demo_examples']
+        assert category_cache.stats()['loaded']
+
+    def test_not_ready_when_startup_step_fails(self):
+        startup_state.run([('first', lambda: None), ('second', failing_step), ('third', lambda: None)])
+
+        response = client.get("/health/ready")
+        assert response.status_code == HTTPStatus.SERVICE_UNAVAILABLE
+        assert response.json() == {'status': 'failed', 'error': 'second: unreachable',
+                                   'steps_seconds': {'first': response.json()['steps_seconds']['first']}}
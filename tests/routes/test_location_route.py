@@ -0,0 +1,114 @@
+import os
+from http import HTTPStatus
+from unittest import TestCase
+
+from fastapi.testclient import TestClient
+from pymongo import MongoClient
+
+from app.main import app
+from app.service.category_cache import category_cache
+from app.service.part_cache import part_cache
+from app.service.text_search_service import part_text_index
+from app.utils.exemplary_data_generator import generate_part_data
+
+client = TestClient(app)
+
+CUVETTE = {'room': 'test_room', 'bookcase': 'test_bookcase', 'shelf': 'test_shelf', 'cuvette': 'test_cuvette'}
+
+
+def generate_part_at(serial_number: str, column: int, row: int, **location):
+    part_data = generate_part_data(serial_number=serial_number, category='subcategory_A1')
+    part_data['location'] = {**part_data['location'], 'column': column, 'row': row, **location}
+    return part_data
+
+
+class TestLocationRoute(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        app.mongodb_client = MongoClient(os.getenv("TEST_DB_URI"))
+        app.database = app.mongodb_client[os.getenv("TEST_DB_NAME")]
+
+    @classmethod
+    def setUp(cls):
+        app.mongodb_client.drop_database(os.getenv("TEST_DB_NAME"))
+        category_cache.invalidate()
+        part_text_index.invalidate()
+        part_cache.clear()
+
+        client.post("/categories/", json={
+            'name': 'category_A',
+            'parent_name': ''
+        })
+
+        client.post("/categories/", json={
+            'name': 'subcategory_A1',
+            'parent_name': 'category_A'
+        })
+
+    @classmethod
+    def tearDownClass(cls):
+        app.mongodb_client.drop_database(os.getenv("TEST_DB_NAME"))
+        app.mongodb_client.close()
+
+    def test_get_location_contents(self):
+        client.post("/parts/", json=generate_part_at('1', 2, 1))
+        client.post("/parts/", json=generate_part_at('2', 1, 1))
+        client.post("/parts/", json=generate_part_at('3', 1, 1, shelf='other_shelf'))
+
+        response = client.get("/locations/contents", params={'room': 'test_room', 'bookcase': 'test_bookcase'})
+        assert response.status_code == HTTPStatus.OK
+        assert [part['serial_number'] for part in response.json()] == ['3', '2', '1']
+
+        response = client.get("/locations/contents", params={**CUVETTE, 'column': 1})
+        assert [part['serial_number'] for part in response.json()] == ['2']
+
+    def test_reject_location_contents_with_gap(self):
+        response = client.get("/locations/contents", params={'room': 'test_room', 'shelf': 'test_shelf'})
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+
+        assert client.get("/locations/contents").status_code == HTTPStatus.BAD_REQUEST
+
+    def test_get_cuvette_grid(self):
+        client.post("/parts/", json=generate_part_at('1', 1, 1))
+        client.post("/parts/", json=generate_part_at('2', 1, 1))
+        client.post("/parts/", json=generate_part_at('3', 3, 2))
+
+        response = client.get("/locations/grid", params={**CUVETTE, 'columns': 3, 'rows': 2})
+        assert response.status_code == HTTPStatus.OK
+        assert response.json() == {
+            'columns': 3,
+            'rows': 2,
+            'occupied_cells': 2,
+            'free_cells': 4,
+            'cells': [[2, 0, 0], [0, 0, 1]]
+        }
+
+    def test_bound_grid_sized_from_stored_cells(self):
+        client.post("/parts/", json=generate_part_at('1', 1, 1))
+        client.post("/parts/", json=generate_part_at('2', 10 ** 6, 10 ** 6))
+        client.post("/parts/", json=generate_part_at('3', 0, -1))
+
+        response = client.get("/locations/grid", params=CUVETTE)
+        assert response.status_code == HTTPStatus.OK
+        assert (response.json()['columns'], response.json()['rows']) == (1000, 1000)
+        assert response.json()['occupied_cells'] == 1
+
+        app.database.parts.delete_many({'serial_number': {'$in': ['1', '2']}})
+        response = client.get("/locations/grid", params=CUVETTE)
+        assert (response.json()['columns'], response.json()['rows'], response.json()['occupied_cells']) == (1, 1, 0)
+
+    def test_find_nearest_free_cell(self):
+        client.post("/parts/", json=generate_part_at('1', 2, 2))
+        client.post("/parts/", json=generate_part_at('2', 2, 1))
+        client.post("/parts/", json=generate_part_at('3', 1, 2))
+
+        response = client.get("/locations/free-cell", params={**CUVETTE, 'columns': 3, 'rows': 3, 'column': 2, 'row': 2})
+        assert response.status_code == HTTPStatus.OK
+        assert response.json() == {'column': 3, 'row': 2, 'distance': 1}
+
+        response = client.get("/locations/free-cell", params={**CUVETTE, 'columns': 2, 'rows': 1})
+        assert response.json() == {'column': 1, 'row': 1, 'distance': 0}
+
+        client.post("/parts/", json=generate_part_at('4', 1, 1))
+        response = client.get("/locations/free-cell", params={**CUVETTE, 'columns': 2, 'rows': 2})
+        assert response.status_code == HTTPStatus.NOT_FOUND
@@ -0,0 +1,75 @@
+import os
+from http import HTTPStatus
+from unittest import TestCase
+
+from fastapi.testclient import TestClient
+from pymongo import MongoClient
+
+from app.main import app
+from app.service.category_cache import category_cache
+from app.service.part_cache import part_cache
+from app.service.text_search_service import part_text_index
+from app.utils.exemplary_data_generator import generate_part_data
+from app.utils.metrics import metrics, mongo_command_metrics
+
+client = TestClient(app)
+
+
+class TestMetricsRoute(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        app.mongodb_client = MongoClient(os.getenv("TEST_DB_URI"), event_listeners=[mongo_command_metrics])
+        app.database = app.mongodb_client[os.getenv("TEST_DB_NAME")]
+
+    @classmethod
+    def setUp(cls):
+        app.mongodb_client.drop_database(os.getenv("TEST_DB_NAME"))
+        category_cache.invalidate()
+        part_text_index.invalidate()
+        part_cache.clear()
+        metrics.reset()
+        metrics.enabled = True
+
+    @classmethod
+    def tearDownClass(cls):
+        metrics.enabled = False
+        app.mongodb_client.drop_database(os.getenv("TEST_DB_NAME"))
+        app.mongodb_client.close()
+
+    def test_metrics_are_not_exposed_when_disabled(self):
+        metrics.enabled = False
+        assert client.get("/parts/").status_code == HTTPStatus.OK
+        assert client.get("/metrics").status_code == HTTPStatus.NOT_FOUND
+        assert metrics.request_duration.count(('GET', '/parts/', '200')) == 0
+
+    def test_record_request_latency_by_route(self):
+        client.get("/categories/category_A")
+        client.get("/categories/category_B")
+        client.get("/not-a-route")
+
+        assert metrics.request_duration.count(('GET', '/categories/{category}', '404')) == 2
+        assert metrics.request_duration.count(('GET', 'unmatched', '404')) == 1
+
+        response = client.get("/metrics")
+        assert response.status_code == HTTPStatus.OK
+        assert response.headers['content-type'].startswith('text/plain')
+        assert '# TYPE http_request_duration_seconds histogram' in response.text
+        assert ('http_request_duration_seconds_count{method="GET",route="/categories/{category}",status="404"} 2'
+                in response.text)
+        assert ('http_request_duration_seconds_bucket{method="GET",route="/categories/{category}",status="404",'
+                'le="+Inf"} 2' in response.text)
+
+    def test_count_mongo_operations_per_request(self):
+        client.post("/categories/", json={'name': 'category_A', 'parent_name': ''})
+        client.post("/categories/", json={'name': 'subcategory_A1', 'parent_name': 'category_A'})
+        client.post("/parts/", json=generate_part_data('1', 'subcategory_A1'))
+        metrics.reset()
+
+        client.get("/parts/1")
+        # served from the part cache
+        client.get("/parts/1")
+
+        assert metrics.request_operations.count(('GET', '/parts/{serial_number}')) == 2
+        assert metrics.request_operations.total(('GET', '/parts/{serial_number}')) == 1
+        assert metrics.command_duration.count(('parts', 'find')) == 1
+        assert 'mongo_command_duration_seconds_count{collection="parts",command="find"} 1' in client.get("/metrics").text
@@ -1,12 +1,21 @@
+import json
 import os
+from concurrent.futures import ThreadPoolExecutor
 from http import HTTPStatus
-from unittest import TestCase
+from unittest import TestCase, mock
 
+from fastapi import HTTPException
 from fastapi.testclient import TestClient
 from pymongo import MongoClient
 
+from app import config
 from app.main import app
+from app.service.category_cache import category_cache
+from app.service.part_cache import part_cache
+from app.service.part_service import apply_stock_movement
+from app.service.text_search_service import PartTextIndex, part_text_index
 from app.utils.exemplary_data_generator import generate_part_data
+from app.utils.indexes import ensure_indexes
 
 client = TestClient(app)
 
@@ -20,6 +29,9 @@ class TestPartRoute(TestCase):
     @classmethod
     def setUp(cls):
         app.mongodb_client.drop_database(os.getenv("TEST_DB_NAME"))
+        category_cache.invalidate()
+        part_text_index.invalidate()
+        part_cache.clear()
 
     @classmethod
     def tearDownClass(cls):
@@ -47,6 +59,25 @@ class TestPartRoute(TestCase):
         second_response = client.post("/parts/", json=part_data)
         assert second_response.status_code == HTTPStatus.CONFLICT
 
+    def test_add_part_racing_with_the_same_serial_number(self):
+        ensure_indexes(app.database)
+        client.post("/categories/", json={
+            'name': 'category_A',
+            'parent_name': ''
+        })
+        client.post("/categories/", json={
+            'name': 'subcategory_A',
+            'parent_name': 'category_A'
+        })
+        part_data = generate_part_data(serial_number='#1', category='subcategory_A')
+        assert client.post("/parts/", json=part_data).status_code == HTTPStatus.CREATED
+
+        # the other request passed the existence check before this one inserted the part
+        with mock.patch('app.routes.part_route.ensure_that_part_does_not_exist'):
+            response = client.post("/parts/", json=part_data)
+        assert response.status_code == HTTPStatus.CONFLICT
+        assert app.database.parts.count_documents({}) == 1
+
     def test_prevent_adding_part_with_base_category(self):
         # create base category category_A
         client.post("/categories/", json={
@@ -81,6 +112,25 @@ class TestPartRoute(TestCase):
         assert response.status_code == HTTPStatus.OK
         assert response.json()['name'] == 'new name'
 
+    def test_update_part_location_partially(self):
+        client.post("/categories/", json={
+            'name': 'category_A',
+            'parent_name': ''
+        })
+        client.post("/categories/", json={
+            'name': 'subcategory_A',
+            'parent_name': 'category_A'
+        })
+
+        part_data = generate_part_data(serial_number='111', category='subcategory_A')
+        client.post("/parts/", json=part_data)
+
+        response = client.put("/parts/111", json={'location': {'room': 'room_B'}})
+        assert response.status_code == HTTPStatus.OK
+
+        stored_part = app.database.parts.find_one({'serial_number': '111'})
+        assert stored_part['location'] == {**part_data['location'], 'room': 'room_B'}
+
     def test_prevent_to_update_category_to_base_category(self):
         # create base category category_A
         client.post("/categories/", json={
@@ -239,3 +289,541 @@ class TestPartRoute(TestCase):
 
         assert response.status_code == HTTPStatus.OK
         assert response.json() == []
+
+    def test_get_parts_paginated(self):
+        client.post("/categories/", json={
+            'name': 'category_A',
+            'parent_name': ''
+        })
+
+        client.post("/categories/", json={
+            'name': 'subcategory_A1',
+            'parent_name': 'category_A'
+        })
+
+        for serial_number in ['1', '2', '3']:
+            client.post("/parts/", json=generate_part_data(serial_number=serial_number, category='subcategory_A1'))
+
+        first_page = client.get("/parts/", params={'limit': 2})
+        assert first_page.status_code == HTTPStatus.OK
+        assert [part['serial_number'] for part in first_page.json()] == ['1', '2']
+        assert first_page.headers['X-Next-After'] == '2'
+
+        second_page = client.get("/parts/", params={'after': '2', 'limit': 2})
+        assert [part['serial_number'] for part in second_page.json()] == ['3']
+        assert 'X-Next-After' not in second_page.headers
+
+    def test_get_parts_as_ndjson(self):
+        client.post("/categories/", json={
+            'name': 'category_A',
+            'parent_name': ''
+        })
+
+        client.post("/categories/", json={
+            'name': 'subcategory_A1',
+            'parent_name': 'category_A'
+        })
+
+        for serial_number in ['1', '2']:
+            client.post("/parts/", json=generate_part_data(serial_number=serial_number, category='subcategory_A1'))
+
+        response = client.get("/parts/", headers={'Accept': 'application/x-ndjson'})
+        assert response.status_code == HTTPStatus.OK
+        assert response.headers['content-type'] == 'application/x-ndjson'
+
+        lines = [json.loads(line) for line in response.text.splitlines()]
+        assert [part['serial_number'] for part in lines] == ['1', '2']
+        assert '_id' not in lines[0]
+
+    def test_add_parts_bulk(self):
+        client.post("/categories/", json={
+            'name': 'category_A',
+            'parent_name': ''
+        })
+
+        client.post("/categories/", json={
+            'name': 'subcategory_A1',
+            'parent_name': 'category_A'
+        })
+
+        client.post("/parts/", json=generate_part_data(serial_number='existing', category='subcategory_A1'))
+
+        invalid_part = generate_part_data(serial_number='4', category='subcategory_A1')
+        del invalid_part['price']
+
+        response = client.post("/parts/bulk", json=[
+            generate_part_data(serial_number='1', category='subcategory_A1'),
+            generate_part_data(serial_number='2', category='category_A'),
+            generate_part_data(serial_number='existing', category='subcategory_A1'),
+            invalid_part,
+            generate_part_data(serial_number='1', category='subcategory_A1'),
+            generate_part_data(serial_number='5', category='subcategory_A1'),
+        ])
+        assert response.status_code == HTTPStatus.OK
+
+        status_codes = [result['status_code'] for result in response.json()]
+        assert status_codes == [HTTPStatus.CREATED, HTTPStatus.BAD_REQUEST, HTTPStatus.CONFLICT,
+                                HTTPStatus.UNPROCESSABLE_ENTITY, HTTPStatus.CONFLICT, HTTPStatus.CREATED]
+
+        assert client.get("/parts/1").status_code == HTTPStatus.OK
+        assert client.get("/parts/5").json()['category'] == 'subcategory_A1'
+        assert len(client.get("/parts/").json()) == 3
+
+    def test_add_parts_bulk_with_serial_number_of_wrong_type(self):
+        client.post("/categories/", json={
+            'name': 'category_A',
+            'parent_name': ''
+        })
+
+        client.post("/categories/", json={
+            'name': 'subcategory_A1',
+            'parent_name': 'category_A'
+        })
+
+        response = client.post("/parts/bulk", json=[
+            generate_part_data(serial_number=5, category='subcategory_A1'),
+            generate_part_data(serial_number='6', category='subcategory_A1'),
+        ])
+        assert response.status_code == HTTPStatus.OK
+        assert [(result['serial_number'], result['status_code']) for result in response.json()] == [
+            (None, HTTPStatus.UNPROCESSABLE_ENTITY), ('6', HTTPStatus.CREATED)]
+
+    def test_search_including_descendant_categories(self):
+        client.post("/categories/", json={
+            'name': 'category_A',
+            'parent_name': ''
+        })
+
+        client.post("/categories/", json={
+            'name': 'subcategory_A1',
+            'parent_name': 'category_A'
+        })
+
+        client.post("/categories/", json={
+            'name': 'sub_subcategory_A1',
+            'parent_name': 'subcategory_A1'
+        })
+
+        client.post("/categories/", json={
+            'name': 'subcategory_A2',
+            'parent_name': 'category_A'
+        })
+
+        client.post("/parts/", json=generate_part_data(serial_number='1', category='subcategory_A1'))
+        client.post("/parts/", json=generate_part_data(serial_number='2', category='sub_subcategory_A1'))
+        client.post("/parts/", json=generate_part_data(serial_number='3', category='subcategory_A2'))
+
+        response = client.get("/parts/search/", params={'category': 'subcategory_A1', 'include_descendants': True})
+        assert response.status_code == HTTPStatus.OK
+        assert sorted(part['serial_number'] for part in response.json()) == ['1', '2']
+
+        response = client.get("/parts/search/", params={'category': 'subcategory_A1'})
+        assert [part['serial_number'] for part in response.json()] == ['1']
+
+    def test_text_search_ranks_and_filters_parts(self):
+        client.post("/categories/", json={
+            'name': 'category_A',
+            'parent_name': ''
+        })
+
+        client.post("/categories/", json={
+            'name': 'subcategory_A1',
+            'parent_name': 'category_A'
+        })
+
+        client.post("/categories/", json={
+            'name': 'subcategory_A2',
+            'parent_name': 'category_A'
+        })
+
+        client.post("/parts/", json={**generate_part_data(serial_number='1', category='subcategory_A1'),
+                                     'name': 'hex bolt', 'description': 'steel bolt M8'})
+        client.post("/parts/", json={**generate_part_data(serial_number='2', category='subcategory_A1'),
+                                     'name': 'washer', 'description': 'washer for bolt M8'})
+        client.post("/parts/", json={**generate_part_data(serial_number='3', category='subcategory_A2'),
+                                     'name': 'bolt', 'description': 'brass bolt'})
+
+        response = client.get("/parts/search/text", params={'q': 'bolt'})
+        assert response.status_code == HTTPStatus.OK
+        found_parts = response.json()
+        assert {part['serial_number'] for part in found_parts} == {'1', '2', '3'}
+        assert found_parts[-1]['serial_number'] == '2'
+        assert found_parts[0]['score'] > found_parts[-1]['score']
+
+        response = client.get("/parts/search/text", params={'q': 'bolt', 'category': 'subcategory_A2'})
+        assert [part['serial_number'] for part in response.json()] == ['3']
+
+        response = client.get("/parts/search/text", params={'q': 'bolt', 'limit': 1, 'skip': 2})
+        assert [part['serial_number'] for part in response.json()] == ['2']
+
+    def test_fuzzy_text_search_follows_writes(self):
+        client.post("/categories/", json={
+            'name': 'category_A',
+            'parent_name': ''
+        })
+
+        client.post("/categories/", json={
+            'name': 'subcategory_A1',
+            'parent_name': 'category_A'
+        })
+
+        client.post("/parts/", json={**generate_part_data(serial_number='1', category='subcategory_A1'),
+                                     'name': 'washer'})
+
+        response = client.get("/parts/search/text", params={'q': 'washr', 'fuzzy': True})
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+
+        with mock.patch.object(config, 'TEXT_SEARCH_BACKEND', 'memory'):
+            response = client.get("/parts/search/text", params={'q': 'wahser', 'fuzzy': True})
+            assert response.json() == []
+            response = client.get("/parts/search/text", params={'q': 'washr', 'fuzzy': True})
+            assert [part['serial_number'] for part in response.json()] == ['1']
+
+            client.put("/parts/1", json={'name': 'gasket'})
+            response = client.get("/parts/search/text", params={'q': 'washr', 'fuzzy': True})
+            assert response.json() == []
+
+            client.delete("/parts/1")
+            response = client.get("/parts/search/text", params={'q': 'gasket', 'fuzzy': True})
+            assert response.json() == []
+
+    def test_text_index_build_sees_writes_during_the_scan(self):
+        client.post("/categories/", json={
+            'name': 'category_A',
+            'parent_name': ''
+        })
+
+        client.post("/categories/", json={
+            'name': 'subcategory_A1',
+            'parent_name': 'category_A'
+        })
+
+        client.post("/parts/", json={**generate_part_data(serial_number='1', category='subcategory_A1'),
+                                     'name': 'washer'})
+        scanned = []
+        add_part = PartTextIndex.add_part
+
+        def add_part_racing_with_rename(index, part):
+            add_part(index, part)
+            scanned.append(part['name'])
+            if len(scanned) == 1:
+                # renamed after the scan read it, before the index is registered
+                client.put("/parts/1", json={'name': 'gasket'})
+
+        with mock.patch.object(PartTextIndex, 'add_part', staticmethod(add_part_racing_with_rename)):
+            index = part_text_index.get(app.database)
+        assert scanned == ['washer', 'gasket']
+        assert index.search('washer') == []
+
+    def test_search_with_ranges_sort_and_projection(self):
+        client.post("/categories/", json={
+            'name': 'category_A',
+            'parent_name': ''
+        })
+
+        client.post("/categories/", json={
+            'name': 'subcategory_A1',
+            'parent_name': 'category_A'
+        })
+
+        for serial_number, quantity, price in [('1', 2, 30.0), ('2', 4, 10.0), ('3', 8, 20.0), ('4', 1, 5.0)]:
+            client.post("/parts/", json={**generate_part_data(serial_number=serial_number, category='subcategory_A1'),
+                                         'quantity': quantity, 'price': price})
+
+        response = client.get("/parts/search/", params={
+            'quantity_max': 4,
+            'price_min': 6,
+            'room': 'test_room',
+            'sort_by': 'price',
+            'sort_order': 'desc'
+        })
+        assert response.status_code == HTTPStatus.OK
+        assert [part['serial_number'] for part in response.json()] == ['1', '2']
+
+        response = client.get("/parts/search/", params={
+            'sort_by': 'quantity',
+            'limit': 2,
+            'fields': 'serial_number,quantity'
+        })
+        assert response.json() == [{'serial_number': '4', 'quantity': 1}, {'serial_number': '1', 'quantity': 2}]
+
+        response = client.get("/parts/search/", params={'fields': 'serial_number,unknown'})
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+
+    def test_get_part_with_etag(self):
+        client.post("/categories/", json={
+            'name': 'category_A',
+            'parent_name': ''
+        })
+
+        client.post("/categories/", json={
+            'name': 'subcategory_A1',
+            'parent_name': 'category_A'
+        })
+
+        client.post("/parts/", json=generate_part_data(serial_number='1', category='subcategory_A1'))
+
+        response = client.get("/parts/1")
+        assert response.status_code == HTTPStatus.OK
+        etag = response.headers['ETag']
+
+        not_modified = client.get("/parts/1", headers={'If-None-Match': etag})
+        assert not_modified.status_code == HTTPStatus.NOT_MODIFIED
+        assert not_modified.content == b''
+
+        client.put("/parts/1", json={'quantity': 3})
+        modified = client.get("/parts/1", headers={'If-None-Match': etag})
+        assert modified.status_code == HTTPStatus.OK
+        assert modified.json()['quantity'] == 3
+        assert modified.headers['ETag'] != etag
+
+        client.delete("/parts/1")
+        assert client.get("/parts/1").status_code == HTTPStatus.NOT_FOUND
+
+    def test_stock_movements(self):
+        client.post("/categories/", json={
+            'name': 'category_A',
+            'parent_name': ''
+        })
+
+        client.post("/categories/", json={
+            'name': 'subcategory_A1',
+            'parent_name': 'category_A'
+        })
+
+        client.post("/parts/", json={**generate_part_data(serial_number='1', category='subcategory_A1'),
+                                     'quantity': 10})
+
+        response = client.post("/parts/1/movements", json={'delta': -4})
+        assert response.status_code == HTTPStatus.OK
+        assert response.json()['quantity'] == 6
+
+        assert client.post("/parts/1/movements", json={'delta': -7}).status_code == HTTPStatus.CONFLICT
+        assert client.post("/parts/2/movements", json={'delta': 1}).status_code == HTTPStatus.NOT_FOUND
+        assert client.get("/parts/1").json()['quantity'] == 6
+
+        response = client.post("/parts/movements", json=[
+            {'serial_number': '1', 'delta': 5},
+            {'serial_number': '1', 'delta': -20},
+            {'serial_number': '2', 'delta': 1},
+            {'serial_number': '1', 'delta': -11},
+        ])
+        assert response.status_code == HTTPStatus.OK
+        assert [(result['status_code'], result['quantity']) for result in response.json()] == [
+            (HTTPStatus.OK, 11), (HTTPStatus.CONFLICT, None), (HTTPStatus.NOT_FOUND, None), (HTTPStatus.OK, 0)]
+
+    def test_concurrent_stock_movements_do_not_lose_updates(self):
+        app.database.parts.insert_one({**generate_part_data(serial_number='1', category='subcategory_A1'),
+                                       'quantity': 100})
+
+        def pick(_):
+            try:
+                apply_stock_movement(app.database, '1', -1)
+                return True
+            except HTTPException:
+                return False
+
+        with ThreadPoolExecutor(max_workers=32) as executor:
+            picked = list(executor.map(pick, range(300)))
+
+        assert picked.count(True) == 100
+        assert app.database.parts.find_one({'serial_number': '1'})['quantity'] == 0
+
+    def test_import_parts_from_csv(self):
+        client.post("/categories/", json={
+            'name': 'category_A',
+            'parent_name': ''
+        })
+
+        client.post("/categories/", json={
+            'name': 'subcategory_A1',
+            'parent_name': 'category_A'
+        })
+
+        client.post("/parts/", json=generate_part_data(serial_number='1', category='subcategory_A1'))
+
+        csv_file = (
+            "serial_number,name,description,category,quantity,price,room,bookcase,shelf,cuvette,column,row\n"
+            "1,updated_name,test_description,subcategory_A1,5,1.5,room_A,bookcase_A,shelf_A,cuvette_A,1,1\n"
+            "2,test_name,test_description,subcategory_A1,7,2.5,room_A,bookcase_A,shelf_A,cuvette_A,1,2\n"
+            "3,test_name,test_description,subcategory_A1,many,2.5,room_A,bookcase_A,shelf_A,cuvette_A,1,3\n"
+            "4,test_name,test_description,category_A,1,2.5,room_A,bookcase_A,shelf_A,cuvette_A,1,4\n"
+        )
+        response = client.post("/parts/import", files={'file': ('parts.csv', csv_file, 'text/csv')})
+        assert response.status_code == HTTPStatus.OK
+        report = response.json()
+        assert {key: report[key] for key in ('dry_run', 'rows', 'valid', 'inserted', 'updated', 'failed')} == {
+            'dry_run': False, 'rows': 4, 'valid': 2, 'inserted': 1, 'updated': 1, 'failed': 2}
+
+        assert client.get("/parts/1").json()['name'] == 'updated_name'
+        assert client.get("/parts/2").json()['location']['row'] == 2
+        assert client.get("/parts/3").status_code == HTTPStatus.NOT_FOUND
+
+        error_report = client.get(report['error_report'])
+        assert error_report.status_code == HTTPStatus.OK
+        lines = error_report.text.splitlines()
+        assert lines[0] == 'row,serial_number,status_code,detail'
+        assert lines[1].startswith('4,3,422,"quantity: Input should be a valid integer')
+        assert lines[2] == '5,4,400,"Incorrect category, part can\'t be created"'
+
+    def test_import_parts_dry_run_and_chunks(self):
+        client.post("/categories/", json={
+            'name': 'category_A',
+            'parent_name': ''
+        })
+
+        client.post("/categories/", json={
+            'name': 'subcategory_A1',
+            'parent_name': 'category_A'
+        })
+
+        # the location columns as written by GET /export/parts
+        header = ("serial_number,name,description,category,quantity,price,"
+                  "location.room,location.bookcase,location.shelf,location.cuvette,location.column,location.row\n")
+        rows = [f"{number % 3},test_name,test_description,subcategory_A1,{number},1.5,room_A,bookcase_A,shelf_A,"
+                f"cuvette_A,1,1\n" for number in range(7)]
+        csv_file = header + ''.join(rows)
+
+        response = client.post("/parts/import", params={'dry_run': True},
+                               files={'file': ('parts.csv', csv_file, 'text/csv')})
+        assert response.json()['valid'] == 7
+        assert response.json()['error_report'] is None
+        assert app.database.parts.count_documents({}) == 0
+
+        with mock.patch.object(config, 'BULK_INSERT_CHUNK_SIZE', 2):
+            response = client.post("/parts/import", files={'file': ('parts.csv', csv_file, 'text/csv')})
+        assert response.json()['inserted'] == 3
+        assert response.json()['updated'] == 4
+        # the last row of every serial number wins
+        assert [client.get(f"/parts/{number}").json()['quantity'] for number in range(3)] == [6, 4, 5]
+
+    def test_reject_import_with_missing_columns(self):
+        response = client.post("/parts/import", files={'file': ('parts.csv', "serial_number,name\n1,test\n", 'text/csv')})
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+        assert 'category' in response.json()['detail']
+
+    def test_import_parts_from_unreadable_csv(self):
+        client.post("/categories/", json={
+            'name': 'category_A',
+            'parent_name': ''
+        })
+
+        client.post("/categories/", json={
+            'name': 'subcategory_A1',
+            'parent_name': 'category_A'
+        })
+
+        csv_file = (
+            b"serial_number,name,description,category,quantity,price,room,bookcase,shelf,cuvette,column,row\n"
+            b"1,test_name,test_description,subcategory_A1,5,1.5,room_A,bookcase_A,shelf_A,cuvette_A,1,1\n"
+            b"2,test_name,test_description,subcategory_A1,5,1.5,room_A,bookcase_A,shelf_A,cuvette_A,1,2\n"
+            b"3,\xff\xfe,test_description,subcategory_A1,5,1.5,room_A,bookcase_A,shelf_A,cuvette_A,1,3\n"
+        )
+        response = client.post("/parts/import", files={'file': ('parts.csv', csv_file, 'text/csv')})
+        assert response.status_code == HTTPStatus.OK
+        report = response.json()
+        assert report['inserted'] >= 1
+        assert report['failed'] == 1
+        assert client.get("/parts/1").status_code == HTTPStatus.OK
+
+        lines = client.get(report['error_report']).text.splitlines()
+        assert 'Unreadable CSV' in lines[1]
+
+        response = client.post("/parts/import", files={'file': ('parts.csv', b"serial\xff_number\n", 'text/csv')})
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+        assert 'Unreadable CSV header' in response.json()['detail']
+
+    def test_part_changes_since_sequence_number(self):
+        client.post("/categories/", json={
+            'name': 'category_A',
+            'parent_name': ''
+        })
+        client.post("/categories/", json={
+            'name': 'subcategory_A1',
+            'parent_name': 'category_A'
+        })
+        for serial_number in ('1', '2'):
+            client.post("/parts/", json=generate_part_data(serial_number, 'subcategory_A1'))
+
+        response = client.get("/parts/changes")
+        assert response.status_code == HTTPStatus.OK
+        assert [change['key'] for change in response.json()['changes']] == ['1', '2']
+        assert response.json()['changes'][0]['document']['category'] == 'subcategory_A1'
+        assert response.json()['has_more'] is False
+        since = response.json()['next_since']
+
+        client.put("/parts/1", json={'quantity': 3})
+        client.delete("/parts/2")
+
+        response = client.get("/parts/changes", params={'since': since, 'limit': 1})
+        assert [(change['key'], change['deleted']) for change in response.json()['changes']] == [('1', False)]
+        assert response.json()['changes'][0]['document']['quantity'] == 3
+        assert response.json()['has_more'] is True
+
+        response = client.get("/parts/changes", params={'since': response.json()['next_since']})
+        assert response.json()['changes'] == [{'seq': since + 2, 'key': '2', 'deleted': True, 'document': None}]
+        assert client.get("/parts/changes", params={'since': response.json()['next_since']}).json()['changes'] == []
+
+    def test_reject_pruned_part_changes(self):
+        client.post("/categories/", json={
+            'name': 'category_A',
+            'parent_name': ''
+        })
+        client.post("/categories/", json={
+            'name': 'category_B',
+            'parent_name': ''
+        })
+        # changes older than the retention period are removed by the TTL index
+        app.database.changes.delete_one({'seq': 1})
+
+        response = client.get("/parts/changes")
+        assert response.status_code == HTTPStatus.GONE
+        assert client.get("/parts/changes", params={'since': 1}).status_code == HTTPStatus.OK
+
+        # a client downloading everything again resumes from the last change written before its download
+        since = int(response.headers['X-Change-Seq'])
+        assert since == 2
+        assert client.get("/export/parts").headers['X-Change-Seq'] == '2'
+        client.post("/categories/", json={
+            'name': 'subcategory_A1',
+            'parent_name': 'category_A'
+        })
+        client.post("/parts/", json=generate_part_data(serial_number='1', category='subcategory_A1'))
+        changes = client.get("/parts/changes", params={'since': since}).json()['changes']
+        assert [change['key'] for change in changes] == ['1']
+
+    def test_batch_get_parts_in_request_order(self):
+        client.post("/categories/", json={
+            'name': 'category_A',
+            'parent_name': ''
+        })
+        client.post("/categories/", json={
+            'name': 'subcategory_A1',
+            'parent_name': 'category_A'
+        })
+        for serial_number in ('1', '2', '3'):
+            client.post("/parts/", json=generate_part_data(serial_number, 'subcategory_A1'))
+        # part 2 is served from the part cache
+        client.get("/parts/2")
+
+        response = client.post("/parts/batch-get", json={'serial_numbers': ['3', 'missing', '2', '1', '3']})
+        assert response.status_code == HTTPStatus.OK
+        assert [(result['serial_number'], result['found']) for result in response.json()] == [
+            ('3', True), ('missing', False), ('2', True), ('1', True), ('3', True)]
+        assert response.json()[1]['part'] is None
+        assert response.json()[2]['part'] == generate_part_data('2', 'subcategory_A1')
+
+        response = client.post("/parts/batch-get", json={'serial_numbers': ['1', '2'],
+                                                         'fields': 'quantity,location.room'})
+        assert [result['part'] for result in response.json()] == [{'quantity': 10, 'location': {'room': 'test_room'}}] * 2
+        # location fields can be given without their 'location.' prefix
+        response = client.post("/parts/batch-get", json={'serial_numbers': ['1'], 'fields': 'serial_number,room'})
+        assert response.json()[0]['part'] == {'serial_number': '1', 'location': {'room': 'test_room'}}
+        response = client.get("/parts/search/", params={'category': 'subcategory_A1', 'fields': 'serial_number,room'})
+        assert response.json()[0] == {'serial_number': '1', 'location': {'room': 'test_room'}}
+
+    def test_reject_batch_get_with_unknown_field(self):
+        response = client.post("/parts/batch-get", json={'serial_numbers': ['1'], 'fields': 'weight'})
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+        response = client.post("/parts/batch-get", json={'serial_numbers': []})
+        assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY